@@ -18,6 +18,10 @@ export default function ReadingTestPage() {
   const mediaRecorderRef = useRef(null)
   const audioChunksRef = useRef([])
   const recordingIntervalRef = useRef(null)
+  const streamRef = useRef(null)
+  // Socket and recorder callbacks outlive the render that created them, so they
+  // reach the latest calculateResults (recordingTime) through this ref
+  const handlersRef = useRef({})
 
   const passage_6_8 = [
     "The sun is big and yellow. I like to play outside when it is sunny.",
@@ -74,11 +78,17 @@ export default function ReadingTestPage() {
       }
       mediaRecorderRef.current = new MediaRecorder(stream, { mimeType })
       audioChunksRef.current = []
+      streamRef.current = openTranscriptionStream()
       mediaRecorderRef.current.ondataavailable = (event) => {
-        if (event.data.size > 0) audioChunksRef.current.push(event.data)
+        if (event.data.size > 0) {
+          audioChunksRef.current.push(event.data)
+          const ws = streamRef.current
+          if (ws && ws.readyState === WebSocket.OPEN) ws.send(event.data)
+        }
       }
       mediaRecorderRef.current.onstop = () => {
         stream.getTracks().forEach((t) => t.stop())
+        handlersRef.current.finishRecording()
       }
       mediaRecorderRef.current.start(1000)
       setIsRecording(true)
@@ -88,15 +98,68 @@ export default function ReadingTestPage() {
     }
   }
 
+  // Streams the recording to /ws/reading so partial transcripts show while the
+  // child reads; falls back to uploading the whole clip if the socket fails
+  const openTranscriptionStream = () => {
+    try {
+      const ws = new WebSocket("ws://localhost:5000/ws/reading")
+      const fallBack = () => {
+        if (streamRef.current !== ws) return
+        streamRef.current = null
+        // Recording already stopped: upload it the old way
+        if (mediaRecorderRef.current && mediaRecorderRef.current.state === "inactive") {
+          handlersRef.current.sendAudioForTranscription(new Blob(audioChunksRef.current, { type: "audio/webm" }))
+        }
+      }
+      ws.onopen = () => {
+        ws.send(JSON.stringify({ passage: originalPassage, encoding: "webm" }))
+        // Pieces recorded while connecting, including the WebM header
+        audioChunksRef.current.forEach((chunk) => ws.send(chunk))
+      }
+      ws.onmessage = (event) => {
+        const data = JSON.parse(event.data)
+        if (data.type === "partial") {
+          setTranscribedText(data.text)
+        } else if (data.type === "final") {
+          streamRef.current = null
+          ws.close()
+          setTranscribedText(data.text)
+          handlersRef.current.calculateResults(data.text)
+          setCanContinue(true)
+          setIsProcessing(false)
+        } else if (data.type === "error") {
+          fallBack()
+          ws.close()
+        }
+      }
+      ws.onerror = fallBack
+      ws.onclose = fallBack
+      return ws
+    } catch (e) {
+      return null
+    }
+  }
+
+  const finishRecording = () => {
+    const ws = streamRef.current
+    if (ws && ws.readyState === WebSocket.OPEN) {
+      setIsProcessing(true)
+      ws.send(JSON.stringify({ type: "end" }))
+      return
+    }
+    streamRef.current = null
+    if (ws) ws.close()
+    const audioBlob = new Blob(audioChunksRef.current, { type: "audio/webm" })
+    try {
+      sendAudioForTranscription(audioBlob)
+    } catch (e) {}
+  }
+
   const stopRecording = () => {
     if (!mediaRecorderRef.current) return
     mediaRecorderRef.current.stop()
     setIsRecording(false)
     clearInterval(recordingIntervalRef.current)
-    const audioBlob = new Blob(audioChunksRef.current, { type: "audio/webm" })
-    try {
-      sendAudioForTranscription(audioBlob)
-    } catch (e) {}
   }
 
   const sendAudioForTranscription = async (audioBlob) => {
@@ -185,6 +248,8 @@ export default function ReadingTestPage() {
     }
   }
 
+  handlersRef.current = { calculateResults, finishRecording, sendAudioForTranscription }
+
   const toggleDarkMode = () => {
     setIsDarkMode(!isDarkMode)
   }
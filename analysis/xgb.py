@@ -13,7 +13,14 @@ Outputs:
   analysis/xgb_medium_roc_curve.png (if matplotlib available)
   analysis/xgb_medium_model.json
   analysis/xgb_medium_label_encoder.npy
+
+Usage:
+  python xgb.py                               # train the fixed configuration
+  python xgb.py --tune --search random --trials 60 --workers 8
+  python xgb.py --params xgb_tuning_best.json  # train with the tuned parameters
+  python xgb.py --data cohort.csv             # e.g. from export_assessments.py
 """
+import argparse
 import json
 from pathlib import Path
 import numpy as np
@@ -36,61 +43,48 @@ RANDOM_SEED = 42
 root = Path(__file__).resolve().parents[1]
 data_path = root / "dyslexia_screening_dataset_MDA.csv"
 out_dir = root / "analysis"
-out_dir.mkdir(parents=True, exist_ok=True)
-
-df = pd.read_csv(data_path)
 
 feature_cols = [
     "phoneme_score", "pattern_score", "nonsense_score",
     "reading_wpm", "questionnaire_score"
 ]
-X = df[feature_cols].copy()
-y_raw = df["dyslexia_risk"].astype(str).values
-le = LabelEncoder()
-y = le.fit_transform(y_raw)
-class_names = list(le.classes_)
-
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.30, random_state=RANDOM_SEED, stratify=y
-)
 
-clf = xgb.XGBClassifier(
-    objective="multi:softprob",
-    num_class=len(class_names),
-    eval_metric="mlogloss",
-    n_estimators=120,
-    max_depth=3,
-    learning_rate=0.07,
-    subsample=0.85,
-    colsample_bytree=0.85,
-    reg_lambda=1.0,
-    random_state=RANDOM_SEED,
-    tree_method="hist",
-)
+DEFAULT_PARAMS = {
+    "n_estimators": 120,
+    "max_depth": 3,
+    "learning_rate": 0.07,
+    "subsample": 0.85,
+    "colsample_bytree": 0.85,
+    "reg_lambda": 1.0,
+}
 
-clf.fit(X_train, y_train)
+# Booster attribute holding the parameters a saved model was trained with
+# (xgboost's own config isn't saved with the model), read by xgb_refresh.py
+PARAMS_ATTR = "train_params"
 
-y_proba = clf.predict_proba(X_test)
-y_pred = np.argmax(y_proba, axis=1)
 
-acc = accuracy_score(y_test, y_pred)
-report = classification_report(y_test, y_pred, target_names=class_names, output_dict=True, zero_division=0)
-precision_macro, recall_macro, f1_macro, _ = precision_recall_fscore_support(
-    y_test, y_pred, average="macro", zero_division=0
-)
+def load_dataset(path=data_path):
+    """Features, encoded labels and the fitted LabelEncoder for a cohort CSV"""
+    df = pd.read_csv(path)
+    df = df[df["dyslexia_risk"].notna()]
+    X = df[feature_cols].copy()
+    y_raw = df["dyslexia_risk"].astype(str).values
+    le = LabelEncoder()
+    y = le.fit_transform(y_raw)
+    return df, X, y, le
 
-# Weighted averages
-precision_weighted, recall_weighted, f1_weighted, _ = precision_recall_fscore_support(
-    y_test, y_pred, average="weighted", zero_division=0
-)
 
-y_test_bin = label_binarize(y_test, classes=list(range(len(class_names))))
-try:
-    auroc = roc_auc_score(y_test_bin, y_proba, average="macro", multi_class="ovr")
-except Exception:
-    auroc = float("nan")
+def make_classifier(num_class, params=None):
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    return xgb.XGBClassifier(
+        objective="multi:softprob",
+        num_class=num_class,
+        eval_metric="mlogloss",
+        random_state=RANDOM_SEED,
+        tree_method="hist",
+        **params,
+    )
 
-cm = confusion_matrix(y_test, y_pred, labels=list(range(len(class_names))))
 
 # Specificity (macro)
 def compute_specificity(conf_mat: np.ndarray) -> float:
@@ -104,10 +98,51 @@ def compute_specificity(conf_mat: np.ndarray) -> float:
         specificities.append((tn / denom) if denom > 0 else 0.0)
     return float(np.mean(specificities))
 
-specificity_macro = compute_specificity(cm)
 
-if HAS_MPL:
+def evaluate(y_test, y_proba, class_names):
+    """Held-out metrics in the layout of xgb_medium_results_summary.txt"""
+    y_pred = np.argmax(y_proba, axis=1)
+
+    acc = accuracy_score(y_test, y_pred)
+    report = classification_report(y_test, y_pred, labels=list(range(len(class_names))),
+                                   target_names=class_names, output_dict=True, zero_division=0)
+    precision_macro, recall_macro, f1_macro, _ = precision_recall_fscore_support(
+        y_test, y_pred, average="macro", zero_division=0
+    )
+
+    # Weighted averages
+    precision_weighted, recall_weighted, f1_weighted, _ = precision_recall_fscore_support(
+        y_test, y_pred, average="weighted", zero_division=0
+    )
+
+    y_test_bin = label_binarize(y_test, classes=list(range(len(class_names))))
     try:
+        auroc = roc_auc_score(y_test_bin, y_proba, average="macro", multi_class="ovr")
+    except Exception:
+        auroc = float("nan")
+
+    cm = confusion_matrix(y_test, y_pred, labels=list(range(len(class_names))))
+    specificity_macro = compute_specificity(cm)
+
+    metrics = {
+        "AUROC_macro_ovr": float(auroc) if auroc == auroc else None,
+        "Accuracy": float(acc),
+        "Precision_macro": float(precision_macro),
+        "Sensitivity_macro_recall": float(recall_macro),
+        "Specificity_macro": float(specificity_macro),
+        "F1_macro": float(f1_macro),
+        "Precision_weighted": float(precision_weighted),
+        "Sensitivity_weighted_recall": float(recall_weighted),
+        "F1_weighted": float(f1_weighted)
+    }
+    return metrics, report, cm
+
+
+def save_roc_curve(y_test, y_proba, class_names, path):
+    if not HAS_MPL:
+        return
+    try:
+        y_test_bin = label_binarize(y_test, classes=list(range(len(class_names))))
         fig, ax = plt.subplots(figsize=(6, 5))
         for i, name in enumerate(class_names):
             fpr, tpr, _ = roc_curve(y_test_bin[:, i], y_proba[:, i])
@@ -121,42 +156,82 @@ if HAS_MPL:
         ax.set_title('ROC Curves (OvR) - Medium Model')
         ax.legend(loc='lower right', fontsize=8)
         fig.tight_layout()
-        fig.savefig(out_dir / "xgb_medium_roc_curve.png", dpi=150)
+        fig.savefig(path, dpi=150)
         plt.close(fig)
     except Exception:
         pass
 
-# Save artifacts
-clf.save_model(out_dir / "xgb_medium_model.json")
-np.save(out_dir / "xgb_medium_label_encoder.npy", le.classes_)
-
-cm_df = pd.DataFrame(cm, index=[f"Actual_{c}" for c in class_names], columns=[f"Pred_{c}" for c in class_names])
-cm_csv_path = out_dir / "xgb_medium_confusion_matrix.csv"
-cm_df.to_csv(cm_csv_path, index=True)
-
-summary = {
-    "samples_total": int(len(df)),
-    "test_size": 0.30,
-    "classes": class_names,
-    "metrics": {
-        "AUROC_macro_ovr": float(auroc) if auroc == auroc else None,
-        "Accuracy": float(acc),
-        "Precision_macro": float(precision_macro),
-        "Sensitivity_macro_recall": float(recall_macro),
-        "Specificity_macro": float(specificity_macro),
-        "F1_macro": float(f1_macro),
-        "Precision_weighted": float(precision_weighted),
-        "Sensitivity_weighted_recall": float(recall_weighted),
-        "F1_weighted": float(f1_weighted)
-    },
-    "per_class": report,
-    "confusion_matrix_csv": str(cm_csv_path),
-    "roc_curve_png": str(out_dir / "xgb_medium_roc_curve.png") if HAS_MPL else None
-}
-
-with open(out_dir / "xgb_medium_results_summary.txt", "w", encoding="utf-8") as f:
-    f.write(json.dumps(summary, indent=2))
-
-print("=== XGB MEDIUM RESULTS ===")
-print(json.dumps(summary, indent=2))
 
+def train(data=data_path, params=None):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    df, X, y, le = load_dataset(data)
+    class_names = list(le.classes_)
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.30, random_state=RANDOM_SEED, stratify=y
+    )
+
+    clf = make_classifier(len(class_names), params)
+    clf.fit(X_train, y_train)
+    clf.get_booster().set_attr(**{PARAMS_ATTR: json.dumps(dict(DEFAULT_PARAMS, **(params or {})))})
+
+    y_proba = clf.predict_proba(X_test)
+    metrics, report, cm = evaluate(y_test, y_proba, class_names)
+    save_roc_curve(y_test, y_proba, class_names, out_dir / "xgb_medium_roc_curve.png")
+
+    # Save artifacts
+    clf.save_model(out_dir / "xgb_medium_model.json")
+    np.save(out_dir / "xgb_medium_label_encoder.npy", le.classes_)
+
+    cm_df = pd.DataFrame(cm, index=[f"Actual_{c}" for c in class_names], columns=[f"Pred_{c}" for c in class_names])
+    cm_csv_path = out_dir / "xgb_medium_confusion_matrix.csv"
+    cm_df.to_csv(cm_csv_path, index=True)
+
+    summary = {
+        "samples_total": int(len(df)),
+        "test_size": 0.30,
+        "classes": class_names,
+        "metrics": metrics,
+        "per_class": report,
+        "confusion_matrix_csv": str(cm_csv_path),
+        "roc_curve_png": str(out_dir / "xgb_medium_roc_curve.png") if HAS_MPL else None
+    }
+    if params:
+        summary["params"] = dict(DEFAULT_PARAMS, **params)
+
+    with open(out_dir / "xgb_medium_results_summary.txt", "w", encoding="utf-8") as f:
+        f.write(json.dumps(summary, indent=2))
+
+    print("=== XGB MEDIUM RESULTS ===")
+    print(json.dumps(summary, indent=2))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the XGBoost dyslexia risk model")
+    parser.add_argument('--data', type=Path, default=data_path, help='Training CSV')
+    parser.add_argument('--params', type=Path, help='JSON file of XGBClassifier parameters (e.g. xgb_tuning_best.json)')
+    parser.add_argument('--tune', action='store_true', help='Cross-validated hyperparameter search instead of training')
+    parser.add_argument('--search', choices=['grid', 'random'], default='random', help='Search strategy for --tune')
+    parser.add_argument('--trials', type=int, default=40, help='Random-search trials')
+    parser.add_argument('--folds', type=int, default=5, help='Stratified CV folds')
+    parser.add_argument('--workers', type=int, default=None, help='Trial processes (default: all cores)')
+    parser.add_argument('--max-rounds', type=int, default=600, help='Boosting round cap per trial')
+    parser.add_argument('--early-stopping', type=int, default=30, help='Stop a fold after this many rounds without improvement')
+    args = parser.parse_args()
+
+    if args.tune:
+        from xgb_tune import tune
+        tune(args.data, search=args.search, trials=args.trials, folds=args.folds, workers=args.workers,
+             max_rounds=args.max_rounds, early_stopping=args.early_stopping)
+        return
+
+    params = None
+    if args.params:
+        params = json.loads(args.params.read_text(encoding="utf-8"))
+        params = params.get("params", params)
+    train(args.data, params)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Incrementally refresh the XGBoost risk model from newly completed assessments.
+
+Instead of retraining on the full history, the current model
+(``xgb_medium_model.json``, or ``xgb_model.json`` before the first refresh)
+keeps boosting for a few rounds on labelled assessments whose ``completedAt``
+is newer than the stored watermark, so a refresh costs time proportional to
+the new data only. The added rounds use the tree parameters the model was
+trained with (stamped on the booster by xgb.py; for older models, the tuning
+winner in ``xgb_tuning_best.json`` if present, else xgb.py's defaults).
+
+Every candidate is saved as a new version under ``analysis/models/``. It is
+promoted (copied over ``xgb_medium_model.json``, which the API loads) only if,
+on each held-out set, its logloss and macro F1 don't regress past ``--tolerance``
+against the current model. The held-out sets are the 30% test split of the
+original dataset (guards against forgetting) and a slice of the new
+assessments. The watermark advances only on promotion, so rejected data is
+reconsidered with whatever arrives next.
+
+Labels come from ``confirmedRisk`` on the assessment (see export_assessments.py).
+
+Usage:
+  python xgb_refresh.py                  # refresh from MongoDB (MONGO_URI / MONGO_DB)
+  python xgb_refresh.py --data new.csv   # refresh from an exported cohort instead
+  python xgb_refresh.py --dry-run        # evaluate without promoting
+  python xgb_refresh.py --status
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import log_loss
+from sklearn.model_selection import train_test_split
+
+from xgb import DEFAULT_PARAMS, PARAMS_ATTR, RANDOM_SEED, data_path, evaluate, feature_cols, make_classifier, out_dir, root
+
+models_dir = out_dir / "models"
+registry_path = models_dir / "registry.json"
+live_model_path = out_dir / "xgb_medium_model.json"
+live_encoder_path = out_dir / "xgb_medium_label_encoder.npy"
+tuning_path = out_dir / "xgb_tuning_best.json"
+
+REFRESH_ROUNDS = 30
+MIN_NEW_ROWS = 50
+NEW_HOLDOUT_SIZE = 0.20
+
+
+def load_registry():
+    if registry_path.exists():
+        return json.loads(registry_path.read_text(encoding="utf-8"))
+    return {"current": None, "watermark": None, "versions": []}
+
+
+def save_registry(registry):
+    models_dir.mkdir(parents=True, exist_ok=True)
+    tmp = registry_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(registry, indent=2), encoding="utf-8")
+    os.replace(tmp, registry_path)
+
+
+def version_paths(version):
+    return models_dir / f"xgb_medium_model-{version}.json", models_dir / f"xgb_medium_label_encoder-{version}.npy"
+
+
+def bootstrap(registry):
+    """Record the model currently being served as v0000 so it can be restored"""
+    if registry["current"] is not None:
+        return registry
+    model_src = live_model_path if live_model_path.exists() else out_dir / "xgb_model.json"
+    encoder_src = live_encoder_path if live_encoder_path.exists() else out_dir / "label_encoder.npy"
+    model_path, encoder_path = version_paths("v0000")
+    models_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(model_src, model_path)
+    shutil.copyfile(encoder_src, encoder_path)
+    registry["current"] = "v0000"
+    registry["versions"].append({
+        "version": "v0000", "parent": None, "createdAt": datetime.utcnow().isoformat(),
+        "source": model_src.name, "promoted": True,
+    })
+    save_registry(registry)
+    return registry
+
+
+def load_version(version):
+    model_path, encoder_path = version_paths(version)
+    clf = make_classifier(1)
+    clf.load_model(str(model_path))
+    classes = [str(c) for c in np.load(encoder_path, allow_pickle=True)]
+    return clf, classes
+
+
+def trained_params(clf):
+    """Parameters ``clf`` was trained with, and where they came from"""
+    stamped = clf.get_booster().attr(PARAMS_ATTR)
+    if stamped:
+        return json.loads(stamped), "model"
+    if tuning_path.exists():
+        tuned = json.loads(tuning_path.read_text(encoding="utf-8"))
+        return dict(DEFAULT_PARAMS, **tuned.get("params", tuned)), tuning_path.name
+    return dict(DEFAULT_PARAMS), "defaults"
+
+
+def fetch_new_rows(since):
+    """Labelled, completed assessments newer than ``since`` from MongoDB"""
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    sys.path.insert(0, str(root))
+    from config import load_settings
+    from export_assessments import export_query, iter_batches
+
+    load_dotenv(root / ".env")
+    settings = load_settings()
+    client = MongoClient(settings.mongo_uri, serverSelectionTimeoutMS=3000)
+    collection = client[settings.mongo_db].assessments
+    query = export_query(completed_only=True, since=since, labelled_only=True)
+    rows = [row for batch in iter_batches(collection, query, settings.export_batch_size) for row in batch]
+    return pd.DataFrame(rows, columns=["patient_id"] + feature_cols + ["dyslexia_risk", "completedAt"])
+
+
+def encode(df, classes):
+    """Features and label indices, dropping rows whose label the model doesn't know"""
+    known = df["dyslexia_risk"].astype(str).isin(classes)
+    if (~known).any():
+        print(f"⚠️ Skipping {int((~known).sum())} rows with unknown labels")
+    df = df[known]
+    index = {c: i for i, c in enumerate(classes)}
+    return df, df[feature_cols].astype(float), df["dyslexia_risk"].astype(str).map(index).to_numpy()
+
+
+def split(X, y, test_size):
+    counts = np.bincount(y)
+    stratify = y if counts[counts > 0].min() >= 2 else None
+    return train_test_split(X, y, test_size=test_size, random_state=RANDOM_SEED, stratify=stratify)
+
+
+def holdout_metrics(clf, X, y, classes):
+    proba = clf.predict_proba(X)
+    metrics, _, _ = evaluate(y, proba, classes)
+    metrics["logloss"] = float(log_loss(y, proba, labels=list(range(len(classes)))))
+    return metrics
+
+
+def regressions(candidate, current, tolerance):
+    issues = []
+    if candidate["logloss"] > current["logloss"] + tolerance:
+        issues.append(f"logloss {current['logloss']:.4f} -> {candidate['logloss']:.4f}")
+    if candidate["F1_macro"] < current["F1_macro"] - tolerance:
+        issues.append(f"F1_macro {current['F1_macro']:.4f} -> {candidate['F1_macro']:.4f}")
+    return issues
+
+
+def refresh(new_df, rounds=REFRESH_ROUNDS, tolerance=0.01, min_rows=MIN_NEW_ROWS,
+            baseline_data=data_path, dry_run=False):
+    registry = bootstrap(load_registry())
+    parent = registry["current"]
+    current, classes = load_version(parent)
+
+    new_df, X_new, y_new = encode(new_df, classes)
+    if len(new_df) < min_rows:
+        print(f"Only {len(new_df)} new labelled assessments (need {min_rows}); nothing to do")
+        return None
+    X_train, X_hold, y_train, y_hold = split(X_new, y_new, NEW_HOLDOUT_SIZE)
+
+    holdouts = {"new": (X_hold, y_hold)}
+    if baseline_data and Path(baseline_data).exists():
+        _, X_base, y_base = encode(pd.read_csv(baseline_data), classes)
+        # Same split as xgb.py, so this test set was never trained on
+        _, X_base_test, _, y_base_test = train_test_split(
+            X_base, y_base, test_size=0.30, random_state=RANDOM_SEED, stratify=y_base
+        )
+        holdouts["baseline"] = (X_base_test, y_base_test)
+
+    params, params_source = trained_params(current)
+    candidate = make_classifier(len(classes), dict(params, n_estimators=rounds))
+    candidate.fit(X_train, y_train, xgb_model=current.get_booster())
+    candidate.get_booster().set_attr(**{PARAMS_ATTR: json.dumps(params)})
+
+    report, issues = {}, []
+    for name, (X_h, y_h) in holdouts.items():
+        report[name] = {
+            "current": holdout_metrics(current, X_h, y_h, classes),
+            "candidate": holdout_metrics(candidate, X_h, y_h, classes),
+            "rows": int(len(y_h)),
+        }
+        issues += [f"{name}: {m}" for m in regressions(report[name]["candidate"], report[name]["current"], tolerance)]
+
+    version = f"v{len(registry['versions']):04d}"
+    model_path, encoder_path = version_paths(version)
+    candidate.save_model(str(model_path))
+    np.save(encoder_path, np.array(classes, dtype=object))
+
+    completed = pd.to_datetime(new_df["completedAt"], errors="coerce").max() if "completedAt" in new_df else pd.NaT
+    watermark = completed.isoformat() if completed == completed else registry["watermark"]
+    promoted = not issues and not dry_run
+    entry = {
+        "version": version,
+        "parent": parent,
+        "createdAt": datetime.utcnow().isoformat(),
+        "rows": {"train": int(len(y_train)), "holdout": int(len(y_hold))},
+        "rounds": {"added": rounds, "total": int(candidate.get_booster().num_boosted_rounds())},
+        "params": dict(params, source=params_source),
+        "dataWatermark": watermark,
+        "holdout": report,
+        "regressions": issues,
+        "promoted": promoted,
+    }
+    registry["versions"].append(entry)
+    if promoted:
+        # Copy then rename so the API never reads a half-written model
+        for src, dst in ((model_path, live_model_path), (encoder_path, live_encoder_path)):
+            tmp = dst.with_name(dst.stem + ".tmp" + dst.suffix)
+            shutil.copyfile(src, tmp)
+            os.replace(tmp, dst)
+        registry["current"] = version
+        registry["watermark"] = watermark
+    save_registry(registry)
+
+    status = "promoted" if promoted else ("dry run" if not issues else "rejected: " + "; ".join(issues))
+    print(f"=== XGB REFRESH {version} (from {parent}, {len(y_train)} new rows): {status} ===")
+    print(json.dumps(report, indent=2))
+    return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Continue boosting the risk model on new assessments")
+    parser.add_argument('--data', type=Path, help='Exported cohort CSV instead of querying MongoDB')
+    parser.add_argument('--since', type=str, help='Override the stored completedAt watermark (ISO date)')
+    parser.add_argument('--rounds', type=int, default=REFRESH_ROUNDS, help='Boosting rounds to add')
+    parser.add_argument('--tolerance', type=float, default=0.01, help='Allowed logloss / F1 regression')
+    parser.add_argument('--min-rows', type=int, default=MIN_NEW_ROWS, help='Minimum new labelled assessments')
+    parser.add_argument('--baseline-data', type=Path, default=data_path, help='Dataset whose 30%% test split guards against forgetting')
+    parser.add_argument('--dry-run', action='store_true', help='Save and evaluate the candidate without promoting it')
+    parser.add_argument('--status', action='store_true', help='Print the model registry and exit')
+    args = parser.parse_args()
+
+    registry = load_registry()
+    if args.status:
+        print(json.dumps({k: registry[k] for k in ("current", "watermark")}, indent=2))
+        for v in registry["versions"]:
+            print(f"  {v['version']}  parent={v['parent']}  promoted={v['promoted']}  {v['createdAt']}")
+        return
+
+    since = args.since or registry["watermark"]
+    since = datetime.fromisoformat(since) if since else None
+    if args.data:
+        new_df = pd.read_csv(args.data)
+        new_df = new_df[new_df["dyslexia_risk"].notna()]
+        if since is not None and "completedAt" in new_df:
+            new_df = new_df[pd.to_datetime(new_df["completedAt"], errors="coerce") > since]
+    else:
+        new_df = fetch_new_rows(since)
+    print(f"{len(new_df)} labelled assessments completed after {since.isoformat() if since else 'the beginning'}")
+    refresh(new_df, args.rounds, args.tolerance, args.min_rows, args.baseline_data, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
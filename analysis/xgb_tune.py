@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Cross-validated hyperparameter search for the XGBoost risk model.
+
+Trials (grid or random samples from SEARCH_SPACE) are spread across a process
+pool. Each worker builds the stratified k-fold DMatrix pairs once, in its
+initializer, and reuses them for every trial it runs. Each fold boosts with
+the held-out fold as an eval set and early stopping, and a trial is pruned
+after its first fold if that fold is already far behind the best
+cross-validated logloss seen so far.
+
+Run through ``python xgb.py --tune``.
+
+Outputs:
+  analysis/xgb_tuning_leaderboard.csv
+  analysis/xgb_tuning_best.json   (feed to ``python xgb.py --params``)
+"""
+import itertools
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xgboost
+from sklearn.metrics import accuracy_score, f1_score, log_loss, roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+
+from xgb import RANDOM_SEED, DEFAULT_PARAMS, load_dataset, out_dir
+
+SEARCH_SPACE = {
+    "max_depth": [2, 3, 4, 5, 6],
+    "learning_rate": [0.03, 0.05, 0.07, 0.1, 0.15],
+    "subsample": [0.7, 0.85, 1.0],
+    "colsample_bytree": [0.6, 0.85, 1.0],
+    "min_child_weight": [1, 3, 5],
+    "reg_lambda": [0.5, 1.0, 2.0, 5.0],
+}
+
+GRID_SPACE = {
+    "max_depth": [2, 3, 4, 5],
+    "learning_rate": [0.05, 0.07, 0.1],
+    "subsample": [0.85, 1.0],
+    "colsample_bytree": [0.85, 1.0],
+}
+
+# A trial whose first fold is this much worse than the best CV logloss is dropped
+PRUNE_MARGIN = 0.25
+
+# Per-worker state, filled by _init_worker
+_folds = []
+_num_class = 0
+_nthread = 1
+
+
+def grid_trials(space=GRID_SPACE):
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def random_trials(n, space=SEARCH_SPACE, seed=RANDOM_SEED):
+    rng = np.random.default_rng(seed)
+    seen, trials = set(), []
+    # Bounded so a small space can't loop forever
+    for _ in range(n * 20):
+        trial = {k: values[rng.integers(len(values))] for k, values in space.items()}
+        key = tuple(sorted(trial.items()))
+        if key not in seen:
+            seen.add(key)
+            trials.append({k: (v.item() if hasattr(v, "item") else v) for k, v in trial.items()})
+        if len(trials) >= n:
+            break
+    return trials
+
+
+def _init_worker(X, y, folds, num_class, nthread):
+    """Build every fold's DMatrix pair once per worker process"""
+    global _folds, _num_class, _nthread
+    _num_class, _nthread = num_class, nthread
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=RANDOM_SEED)
+    _folds = []
+    for train_idx, valid_idx in splitter.split(X, y):
+        dtrain = xgboost.QuantileDMatrix(X[train_idx], label=y[train_idx], nthread=nthread)
+        dvalid = xgboost.QuantileDMatrix(X[valid_idx], label=y[valid_idx], ref=dtrain, nthread=nthread)
+        _folds.append((dtrain, dvalid, y[valid_idx]))
+
+
+def _booster_params(trial):
+    params = {k: v for k, v in dict(DEFAULT_PARAMS, **trial).items() if k != "n_estimators"}
+    params["eta"] = params.pop("learning_rate")
+    params.update(
+        objective="multi:softprob",
+        num_class=_num_class,
+        eval_metric="mlogloss",
+        tree_method="hist",
+        seed=RANDOM_SEED,
+        nthread=_nthread,
+    )
+    return params
+
+
+def run_trial(trial, max_rounds, early_stopping, prune_above=None):
+    """Cross-validate one parameter set on the cached folds"""
+    start = time.perf_counter()
+    params = _booster_params(trial)
+    scores = {"logloss": [], "accuracy": [], "f1_macro": [], "auroc": [], "rounds": []}
+    labels = list(range(_num_class))
+    for i, (dtrain, dvalid, y_valid) in enumerate(_folds):
+        booster = xgboost.train(
+            params, dtrain, num_boost_round=max_rounds,
+            evals=[(dvalid, "valid")], early_stopping_rounds=early_stopping, verbose_eval=False,
+        )
+        proba = booster.predict(dvalid, iteration_range=(0, booster.best_iteration + 1))
+        pred = np.argmax(proba, axis=1)
+        scores["logloss"].append(log_loss(y_valid, proba, labels=labels))
+        scores["accuracy"].append(accuracy_score(y_valid, pred))
+        scores["f1_macro"].append(f1_score(y_valid, pred, average="macro", zero_division=0))
+        try:
+            scores["auroc"].append(roc_auc_score(y_valid, proba, multi_class="ovr", labels=labels))
+        except ValueError:
+            pass
+        scores["rounds"].append(booster.best_iteration + 1)
+        if i == 0 and prune_above is not None and scores["logloss"][0] > prune_above:
+            break
+
+    pruned = len(scores["rounds"]) < len(_folds)
+    return {
+        "params": trial,
+        "folds": len(scores["rounds"]),
+        "pruned": pruned,
+        "logloss": float(np.mean(scores["logloss"])),
+        "logloss_std": float(np.std(scores["logloss"])),
+        "accuracy": float(np.mean(scores["accuracy"])),
+        "f1_macro": float(np.mean(scores["f1_macro"])),
+        "auroc": float(np.mean(scores["auroc"])) if scores["auroc"] else None,
+        # Final model size: the average early-stopped round count across folds
+        "n_estimators": int(round(np.mean(scores["rounds"]))),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def tune(data, search="random", trials=40, folds=5, workers=None, max_rounds=600, early_stopping=30):
+    _, X, y, le = load_dataset(data)
+    X = X.to_numpy(dtype=np.float32)
+    candidates = grid_trials() if search == "grid" else random_trials(trials)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(candidates)))
+    # Split the cores between trials instead of oversubscribing them
+    nthread = max(1, (os.cpu_count() or 1) // workers)
+    print(f"Tuning {len(candidates)} {search} trials, {folds}-fold CV, {workers} workers x {nthread} threads")
+
+    start = time.perf_counter()
+    results = []
+    best = float("inf")
+    pending = {}
+    queue = iter(candidates)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(X, y, folds, len(le.classes_), nthread)) as pool:
+        # Keep only a couple of trials queued per worker so later submissions
+        # see an up-to-date best score to prune against
+        while True:
+            while len(pending) < workers * 2:
+                trial = next(queue, None)
+                if trial is None:
+                    break
+                prune_above = best * (1 + PRUNE_MARGIN) if best < float("inf") else None
+                pending[pool.submit(run_trial, trial, max_rounds, early_stopping, prune_above)] = trial
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.pop(future)
+                result = future.result()
+                results.append(result)
+                if not result["pruned"]:
+                    best = min(best, result["logloss"])
+                print(f"  [{len(results)}/{len(candidates)}] logloss={result['logloss']:.4f} "
+                      f"acc={result['accuracy']:.4f}{' (pruned)' if result['pruned'] else ''} {result['params']}")
+
+    board = write_leaderboard(results, le, search, folds, time.perf_counter() - start)
+    return board
+
+
+def write_leaderboard(results, le, search, folds, elapsed):
+    """Rank trials (complete ones first, then by CV logloss) and save the winner"""
+    rows = [dict(r["params"], **{k: v for k, v in r.items() if k != "params"}) for r in results]
+    board = pd.DataFrame(rows).sort_values(["pruned", "logloss"]).reset_index(drop=True)
+    board.index += 1
+    board.index.name = "rank"
+    board_path = out_dir / "xgb_tuning_leaderboard.csv"
+    board.to_csv(board_path)
+
+    winner = min((r for r in results if not r["pruned"]), key=lambda r: r["logloss"])
+    best = {
+        "params": dict(DEFAULT_PARAMS, **winner["params"], n_estimators=winner["n_estimators"]),
+        "cv": {k: winner[k] for k in ("logloss", "logloss_std", "accuracy", "f1_macro", "auroc")},
+        "search": search,
+        "folds": folds,
+        "trials": len(results),
+        "pruned": sum(r["pruned"] for r in results),
+        "classes": list(le.classes_),
+        "elapsed_seconds": round(elapsed, 1),
+    }
+    best_path = out_dir / "xgb_tuning_best.json"
+    best_path.write_text(json.dumps(best, indent=2), encoding="utf-8")
+
+    print("=== XGB TUNING LEADERBOARD (top 10) ===")
+    print(board.head(10).to_string())
+    print(f"Best parameters written to {best_path} ({elapsed:.1f}s)")
+    return board
@@ -2,27 +2,67 @@
 """
 Dyslexia Screening Tool Backend
 Simple Flask server with Whisper transcription
+
+Heavy dependencies (whisper/torch, xgboost, pyttsx3) are imported lazily and
+the models are warmed up on a background thread, so storage endpoints and
+/health/live answer as soon as the process starts; /health/ready flips once
+the models can serve requests.
+
+``create_app(settings)`` builds the server from a ``config.Settings``: Whisper
+model size, device, compute dtype, thread counts, batch limits and which
+feature modules (blueprints) are mounted. Pick a deployment with
+``DYSCOVER_PROFILE`` (central, kiosk, lite) or ``--profile``; see config.py.
+``python app.py`` is the single-process development server; serve.py runs
+the same app in forked workers that share one preloaded model.
 """
 
 import os
 import logging
+import argparse
+import threading
+import time
 import warnings
-from flask import Flask, request, jsonify, send_file
+from typing import Optional
+from flask import Blueprint, Flask, Response, g, has_request_context, request, jsonify, stream_with_context
 from flask_cors import CORS
-import whisper
+from flask_sock import Sock
+import numpy as np
 import re
-from datetime import datetime
+import base64
+import json
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta
 from bson import ObjectId
-from pymongo import MongoClient, ReturnDocument
+from pymongo import ASCENDING, DESCENDING, MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
 from dotenv import load_dotenv
-try:
-    import torch
-except Exception:
-    torch = None
-try:
-    import pyttsx3
-except Exception:
-    pyttsx3 = None
+from audio_io import decode_audio, read_upload
+from cascade import CascadeScheduler
+from config import Settings, load_settings
+from export_assessments import export_query, iter_batches, iter_csv, iter_parquet
+from inference import BULK, INTERACTIVE, LANES, SAMPLE_RATE, InferenceScheduler, QueueFull
+from jobs import JobBoard, JobQueue
+from local_store import COMPLETE, CREATE, RESULT, LocalStore, Syncer
+from metrics import Callback, Counter, Histogram, MongoCommandMetrics, render as render_metrics
+from model_loader import load_whisper, quantize_int8
+from pronunciation import is_single_word, parse_alternatives, score_pronunciation_batch
+from reading import LONG_PAUSE_SECONDS, analyze_reading, transcribe_words_batch
+from streaming import StreamingSession
+from rollups import (ROLLUP_PROJECTION, apply_changes, ensure_rollup_indexes, rollup_changes, rollup_query,
+                     summarize, with_result)
+from risk_model import FEATURE_COLUMNS, FEATURE_PROJECTION, assessment_features, features_from_mapping, load_risk_model
+from transcript_cache import DiskTier, MongoTier, TranscriptCache, result_key
+from tts_cache import TTSCache, cache_key, render_wav
+from tts_pool import TTSWorkerPool
+from vad import speech_bounds, speech_chunks
+
+def import_pyttsx3():
+    """Import pyttsx3 on first use; returns None when it is not installed"""
+    try:
+        import pyttsx3
+        return pyttsx3
+    except Exception:
+        return None
 
 # Suppress FP16 warnings
 warnings.filterwarnings("ignore", category=UserWarning)
@@ -31,71 +71,618 @@ warnings.filterwarnings("ignore", category=UserWarning)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Initialize Flask app
-app = Flask(__name__)
-CORS(app)
-
-# Load env and initialize Mongo
+# Load env; the active settings are replaced by create_app()
 load_dotenv()
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-MONGO_DB = os.getenv("MONGO_DB", "dyscover")
+settings = load_settings()
+
+# Feature modules, mounted by create_app() according to settings.features
+core_routes = Blueprint("core", __name__)
+metrics_routes = Blueprint("metrics", __name__)
+storage_routes = Blueprint("storage", __name__)
+risk_routes = Blueprint("risk", __name__)
+transcribe_routes = Blueprint("transcribe", __name__)
+pronunciation_routes = Blueprint("pronunciation", __name__)
+tts_routes = Blueprint("tts", __name__)
+job_routes = Blueprint("jobs", __name__)
+# WebSocket routes are attached to the blueprints above
+sock = Sock()
+
 mongo_client = None
 db = None
+# Times every Mongo command (dyscover_mongo_command_seconds)
+mongo_metrics = MongoCommandMetrics()
+
+# Compound indexes backing the listing/search API. Each ends in the sort key
+# (startedAt/completedAt, _id) so filtered pages are index range scans.
+ASSESSMENT_INDEXES = [
+    ([('startedAt', DESCENDING), ('_id', DESCENDING)], 'startedAt_desc'),
+    ([('completedAt', DESCENDING), ('_id', DESCENDING)], 'completedAt_desc'),
+    ([('ageGroup', ASCENDING), ('startedAt', DESCENDING), ('_id', DESCENDING)], 'ageGroup_startedAt'),
+    ([('risk.level', ASCENDING), ('startedAt', DESCENDING), ('_id', DESCENDING)], 'risk_startedAt'),
+    ([('ageGroup', ASCENDING), ('risk.level', ASCENDING), ('startedAt', DESCENDING), ('_id', DESCENDING)],
+     'ageGroup_risk_startedAt'),
+]
+
+def ensure_indexes():
+    """Create the declared indexes (no-op when they already exist)"""
+    for keys, name in ASSESSMENT_INDEXES:
+        db.assessments.create_index(keys, name=name, background=True)
+    ensure_rollup_indexes(db.rollups)
 
 def init_mongo():
     global mongo_client, db
     try:
-        mongo_client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=3000)
+        # One client per process: retries reuse it (its monitor keeps looking for the server)
+        # instead of leaking a new client with its threads and sockets on every attempt
+        if mongo_client is None:
+            mongo_client = MongoClient(settings.mongo_uri, serverSelectionTimeoutMS=3000,
+                                       event_listeners=[mongo_metrics])
         # Trigger server selection
         mongo_client.server_info()
-        db = mongo_client[MONGO_DB]
-        logger.info(f"✅ Connected to MongoDB at {MONGO_URI}, db={MONGO_DB}")
+        db = mongo_client[settings.mongo_db]
+        logger.info(f"✅ Connected to MongoDB at {settings.mongo_uri}, db={settings.mongo_db}")
+        try:
+            ensure_indexes()
+        except Exception as e:
+            logger.error(f"❌ Failed to create MongoDB indexes: {e}")
         return True
     except Exception as e:
         logger.error(f"❌ MongoDB connection failed: {e}")
         return False
 
-# Global variable to store the Whisper model
+def connected_db():
+    """The Mongo database, reconnecting first if it was down (used by the local store syncer)"""
+    if db is None:
+        init_mongo()
+    return db
+
+# Long-lived TTS worker processes (tts_workers=0 renders in-process instead)
+# and the content-addressed /tts_offline cache; built by create_app()
+tts_pool = None
+tts_cache = None
+
+# Audio-route results keyed by the uploaded bytes; built by create_app()
+transcript_cache = None
+
+# Asynchronous audio jobs (/api/jobs); built by create_app()
+job_queue = None
+# Route a background job stands in for, so its stages are labelled like the sync route
+job_context = threading.local()
+
+# Offline-first storage writes and their background replay to Mongo; built by create_app()
+local_store = None
+store_syncer = None
+
+# Trained XGBoost risk classifier (loaded once at startup)
+risk_model = None
+
+# Global variables to store the Whisper model and its batching scheduler
 whisper_model = None
+inference_scheduler = None
+# First stage of the confidence cascade (cascade_model), when configured
+cascade_first_model = None
+# Model lifecycle: "not loaded" -> "loading" -> "ready" | "failed"
+model_status = "not loaded"
+
+def configure_torch_threads():
+    """Apply the configured torch intra-/inter-op thread counts"""
+    import torch
+
+    if settings.torch_threads:
+        torch.set_num_threads(settings.torch_threads)
+    if settings.interop_threads:
+        try:
+            torch.set_num_interop_threads(settings.interop_threads)
+        except RuntimeError as e:
+            # Only allowed before the first parallel op in the process
+            logger.warning(f"Could not set interop threads: {e}")
+
+def load_model(name, device):
+    logger.info(f"Loading Whisper {name} model on {device}...")
+    model = load_whisper(name, device=device, mmap_cache=settings.mmap_cache)
+    if settings.compute_dtype == "int8":
+        model = quantize_int8(model)
+        logger.info("Quantized Whisper Linear layers to int8")
+    # Read by the batch handlers to pick fp16/fp32 decoding
+    model.compute_dtype = settings.compute_dtype
+    return model
+
+def new_scheduler(model):
+    return InferenceScheduler(
+        model,
+        max_batch_size=settings.max_batch_size,
+        max_wait_ms=settings.max_batch_wait_ms,
+        max_queue_depth=settings.max_queue_depth,
+    )
+
+def load_whisper_weights():
+    """Load the Whisper checkpoint(s) without starting any threads.
+
+    serve.py calls this in the parent process before forking workers, so the
+    weights are shared copy-on-write; a worker then only builds its scheduler.
+    """
+    global whisper_model, cascade_first_model
+    device = settings.resolved_device()
+    if whisper_model is None:
+        whisper_model = load_model(settings.whisper_model, device)
+    if settings.cascade_model and cascade_first_model is None:
+        cascade_first_model = load_model(settings.cascade_model, device)
+
+def preload_models():
+    """Load the risk and Whisper models in this process (no inference, no threads)"""
+    global risk_model
+    if settings.enabled("risk") and risk_model is None:
+        risk_model = load_risk_model(settings.xgb_model_path, settings.xgb_label_encoder_path)
+    if settings.needs_whisper:
+        load_whisper_weights()
 
 def load_whisper_model():
-    """Load the Whisper model once at startup"""
-    global whisper_model
+    """Load the Whisper model(s) unless preloaded, and start the batching scheduler"""
+    global inference_scheduler
     try:
-        logger.info("Loading Whisper model...")
-        # Use small model for better Windows compatibility and faster loading
-        whisper_model = whisper.load_model("medium")
+        configure_torch_threads()
+        load_whisper_weights()
+        inference_scheduler = new_scheduler(whisper_model)
+        if settings.cascade_model:
+            # Clear answers come from the small model; uncertain ones escalate
+            inference_scheduler = CascadeScheduler(
+                new_scheduler(cascade_first_model),
+                inference_scheduler,
+                names=(settings.cascade_model, settings.whisper_model),
+                min_logprob=settings.cascade_min_logprob,
+                max_no_speech=settings.cascade_max_no_speech,
+                margin=settings.cascade_margin,
+            )
+        inference_scheduler.register("pronunciation", score_pronunciation_batch)
+        inference_scheduler.register("words", transcribe_words_batch)
+        inference_scheduler.start()
         logger.info("✅ Whisper model loaded successfully!")
-        logger.info("✅ XGBoost model loaded successfully!")
         return True
     except Exception as e:
         logger.error(f"❌ Failed to load Whisper model: {e}")
         logger.error(f"Error type: {type(e).__name__}")
         return False
 
-@app.route('/health', methods=['GET'])
+def warm_up_models():
+    """Load the risk and Whisper models and run one warm-up inference"""
+    global model_status, risk_model
+    model_status = "loading"
+    if settings.enabled("risk") and risk_model is None:
+        risk_model = load_risk_model(settings.xgb_model_path, settings.xgb_label_encoder_path)
+    if not settings.needs_whisper:
+        model_status = "ready"
+        return
+    if not load_whisper_model():
+        model_status = "failed"
+        return
+    if settings.warmup:
+        try:
+            # One short silent clip allocates the decode buffers up front
+            inference_scheduler.transcribe(
+                np.zeros(SAMPLE_RATE, dtype=np.float32),
+                timeout=settings.request_timeout,
+                language='en',
+                task='transcribe'
+            )
+            logger.info("✅ Whisper warm-up inference done")
+        except Exception as e:
+            logger.warning(f"Whisper warm-up inference failed: {e}")
+    model_status = "ready"
+
+def start_model_warmup():
+    """Warm up the models on a background thread so the API can serve right away"""
+    thread = threading.Thread(target=warm_up_models, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def model_unavailable():
+    """Error response for audio routes when the Whisper model cannot serve"""
+    if model_status in ("not loaded", "loading"):
+        response = jsonify({"error": "Whisper model is still loading"})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    return jsonify({"error": "Whisper model not available"}), 500
+
+def too_busy(e):
+    """429 for a full priority lane, with the scheduler's Retry-After estimate"""
+    logger.warning(f"Rejecting request: {e}")
+    response = jsonify({"error": "Server busy, retry later", "lane": e.lane, "retryAfter": e.retry_after})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 429
+
+# -----------------------------
+# Metrics
+# -----------------------------
+
+HTTP_REQUESTS = Counter("dyscover_http_requests_total", "HTTP requests by route and status",
+                        ["route", "method", "status"])
+HTTP_ERRORS = Counter("dyscover_http_errors_total", "HTTP responses with status >= 400", ["route", "status"])
+HTTP_SECONDS = Histogram("dyscover_http_request_seconds", "HTTP request latency", ["route", "method"])
+STAGE_SECONDS = Histogram("dyscover_stage_seconds",
+                          "Time per stage inside the audio routes (upload, decode, inference, scoring, ...)",
+                          ["route", "stage"])
+VAD_AUDIO_SECONDS = Counter("dyscover_vad_audio_seconds_total",
+                            "Audio seconds received vs. kept as speech by the VAD", ["route", "kind"])
+VAD_SILENT_CLIPS = Counter("dyscover_vad_silent_clips_total", "Clips rejected by the VAD as silent", ["route"])
+Callback("dyscover_queue_depth", "Jobs waiting for the model scheduler / TTS workers",
+         lambda: {
+             "inference": inference_scheduler.queue_depth if inference_scheduler else None,
+             "tts": tts_pool.queue_depth if tts_pool else None,
+         }, ["queue"])
+Callback("dyscover_lane_depth", "Jobs waiting per priority lane in the model scheduler / job queue",
+         lambda: {
+             **{("inference", lane): n for lane, n in (inference_scheduler.lane_depths() if inference_scheduler else {}).items()},
+             **{("jobs", lane): n for lane, n in (job_queue.depths() if job_queue else {}).items()},
+         }, ["queue", "lane"])
+Callback("dyscover_tts_cache_hits_total", "TTS cache hits by tier",
+         lambda: {"memory": tts_cache.memory.hits, "disk": tts_cache.disk_hits}, ["tier"], kind="counter")
+Callback("dyscover_tts_cache_renders_total", "TTS cache misses that were synthesized",
+         lambda: tts_cache.renders, kind="counter")
+Callback("dyscover_tts_cache_hit_ratio", "Fraction of TTS lookups served from memory or disk",
+         lambda: tts_cache.stats()["hit_rate"])
+Callback("dyscover_transcript_cache_hits_total", "Audio-route results served from the transcript cache by tier",
+         lambda: {"memory": transcript_cache.memory.hits, "tier": transcript_cache.tier_hits},
+         ["tier"], kind="counter")
+Callback("dyscover_transcript_cache_computed_total", "Audio-route results computed on a transcript cache miss",
+         lambda: transcript_cache.computed, kind="counter")
+Callback("dyscover_transcript_cache_hit_ratio", "Fraction of audio-route lookups served from the transcript cache",
+         lambda: transcript_cache.stats()["hit_rate"])
+Callback("dyscover_cascade_escalation_rate", "Fraction of jobs the cascade re-ran on the large model",
+         lambda: {kind: c["escalation_rate"] for kind, c in inference_scheduler.stats().items()}, ["kind"])
+Callback("dyscover_cascade_disagreement_rate", "Fraction of escalated jobs where the two models disagreed",
+         lambda: {kind: c["disagreement_rate"] for kind, c in inference_scheduler.stats().items()}, ["kind"])
+Callback("dyscover_local_store_ops", "Storage writes in the local store waiting to sync / rejected by the replay",
+         lambda: {k: v for k, v in local_store.stats().items() if k != "oldest_pending_seconds"}, ["status"])
+Callback("dyscover_local_store_lag_seconds", "Age of the oldest storage write not yet synced to MongoDB",
+         lambda: local_store.stats()["oldest_pending_seconds"])
+Callback("dyscover_model_ready", "1 once the Whisper model is loaded and warmed up",
+         lambda: int(model_status == "ready"))
+
+def route_label():
+    if not has_request_context():
+        return getattr(job_context, "route", None) or "background"
+    # The URL rule keeps ids out of the labels; unmatched paths share one series
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+def stage(name):
+    """Time a block of the current request as ``name`` in dyscover_stage_seconds"""
+    return STAGE_SECONDS.time(route=route_label(), stage=name)
+
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route, status = route_label(), str(response.status_code)
+        HTTP_SECONDS.observe(time.perf_counter() - started, route=route, method=request.method)
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=status)
+        if response.status_code >= 400:
+            HTTP_ERRORS.inc(route=route, status=status)
+    return response
+
+@metrics_routes.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of the counters, histograms and gauges above"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@core_routes.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         "message": "Dyslexia Screening Tool Backend is running",
         "status": "healthy",
         "whisper_model": "loaded" if whisper_model else "not loaded",
-        "mongo": "connected" if db is not None else "not connected"
+        "model_status": model_status,
+        "risk_model": risk_model.version if risk_model else "not loaded",
+        "mongo": "connected" if db is not None else "not connected",
+        "device": str(next(whisper_model.parameters()).device) if whisper_model else None,
+        "cascade": inference_scheduler.stats() if isinstance(inference_scheduler, CascadeScheduler) else None,
+        "local_store": local_store.stats() if local_store else None,
+        "config": settings.describe(),
     })
 
+@core_routes.route('/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness: the process is up and serving HTTP"""
+    return jsonify({"status": "alive"})
+
+@core_routes.route('/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness: the Whisper model is loaded and warmed up"""
+    ready = model_status == "ready"
+    return jsonify({
+        "status": "ready" if ready else "not ready",
+        "model_status": model_status,
+        "risk_model": "loaded" if risk_model else "not loaded",
+        "mongo": "connected" if db is not None else "not connected"
+    }), (200 if ready else 503)
+
+# -----------------------------
+# Voice activity detection
+# -----------------------------
+
+def count_speech(audio, kept):
+    """Record VAD input vs. kept seconds (and silent clips) for the current route"""
+    route = route_label()
+    VAD_AUDIO_SECONDS.inc(len(audio) / SAMPLE_RATE, route=route, kind="input")
+    VAD_AUDIO_SECONDS.inc(kept / SAMPLE_RATE, route=route, kind="speech")
+    if not kept:
+        VAD_SILENT_CLIPS.inc(route=route)
+
+def trim_silence(audio):
+    """(speech-only span of ``audio``, offset in samples), or (None, 0) for a silent clip"""
+    if not settings.vad:
+        return audio, 0
+    with stage("vad"):
+        bounds = speech_bounds(audio)
+    if bounds is None:
+        count_speech(audio, 0)
+        return None, 0
+    start, end = bounds
+    count_speech(audio, end - start)
+    return audio[start:end], start
+
+def speech_lane(samples):
+    """Priority lane for ``samples`` of speech: short clips are interactive, reads are bulk"""
+    return INTERACTIVE if samples <= settings.interactive_max_seconds * SAMPLE_RATE else BULK
+
+def transcribe_speech(audio, lane=None):
+    """Transcribe only the speech in ``audio``; None when the VAD finds none.
+
+    Long reads are split into speech-only chunks that fit one Whisper window
+    and submitted together, so they batch instead of decoding sequentially.
+    ``lane`` defaults to the one the speech length calls for.
+    """
+    if settings.vad:
+        with stage("vad"):
+            chunks = speech_chunks(audio)
+        count_speech(audio, sum(len(c) for c in chunks))
+        if not chunks:
+            return None
+    else:
+        chunks = [audio]
+    lane = lane or speech_lane(sum(len(c) for c in chunks))
+    futures = []
+    with stage("inference"):
+        try:
+            for chunk in chunks:
+                futures.append(inference_scheduler.submit(
+                    "transcribe", (np.asarray(chunk, dtype=np.float32), {"language": "en", "task": "transcribe"}), lane
+                ))
+            texts = [inference_scheduler.wait(f, settings.request_timeout)["text"].strip() for f in futures]
+        except BaseException:
+            # Don't leave the rest of a rejected or abandoned read queued
+            for future in futures:
+                future.cancel()
+            raise
+    return " ".join(t for t in texts if t)
+
+# -----------------------------
+# Transcript cache
+# -----------------------------
+
+def cached_result(route, audio_bytes, run, target=None, **options):
+    """``run(audio_bytes) -> (body, status)`` for an upload to ``route``, through the transcript cache.
+
+    The key covers the uploaded bytes, the route, the model and everything
+    that changes the answer, so a retried upload skips decoding and inference.
+    """
+    if transcript_cache is None:
+        return run(audio_bytes)
+    key = result_key(audio_bytes, route, settings.whisper_model, "en", target, cascade=settings.cascade_model,
+                     compute_dtype=settings.compute_dtype, vad=settings.vad, **options)
+    (body, status), hit = transcript_cache.get_or_compute(key, lambda: run(audio_bytes))
+    if hit:
+        logger.info("Served from the transcript cache")
+        body = {**body, "cached": True}
+    return body, status
+
+def cached_response(audio_bytes, run, target=None, **options):
+    body, status = cached_result(route_label(), audio_bytes, run, target, **options)
+    return jsonify(body), status
+
+# -----------------------------
+# Audio tasks
+# -----------------------------
+# Shared by the synchronous routes and /api/jobs: ``*_task(form, lane)``
+# validates the form and returns ``(run, cache options)``; ``run(audio_bytes)``
+# decodes, runs the model in ``lane`` (None = the route's own choice) and
+# returns ``(body, status)``.
+
+class InvalidRequest(ValueError):
+    """A missing or malformed form field (400)"""
+
+def model_fields(result):
+    """Which cascade stage answered (empty when a single model serves)"""
+    return {key: result[key] for key in ("model", "escalated") if key in result}
+
+def transcribe_task(form, lane=None):
+    def run(audio_bytes):
+        with stage("decode"):
+            audio = decode_audio(audio_bytes)
+
+        # Transcribe the speech using Whisper (batched with other in-flight clips)
+        logger.info("Starting Whisper transcription (forced English)...")
+        transcribed_text = transcribe_speech(audio, lane)
+        if transcribed_text is None:
+            logger.info("No speech detected; skipping transcription")
+            return {"error": "No speech detected", "speech": False}, 422
+
+        logger.info("✅ Transcription successful!")
+        logger.info(f"Transcribed text: {transcribed_text[:100]}...")
+
+        # Return the transcribed text
+        return {
+            "transcribed_text": transcribed_text,
+            "success": True
+        }, 200
+
+    return run, {}
+
+def analyze_task(form, lane=None):
+    passage = (form.get('passage') or '').strip()
+    if not passage:
+        raise InvalidRequest("passage is required")
+    try:
+        pause_threshold = float(form.get('pauseSeconds', LONG_PAUSE_SECONDS))
+    except ValueError:
+        raise InvalidRequest("pauseSeconds must be a number")
+
+    def run(audio_bytes):
+        with stage("decode"):
+            audio = decode_audio(audio_bytes)
+        speech, offset = trim_silence(audio)
+        if speech is None:
+            return {"error": "No speech detected", "speech": False}, 422
+
+        with stage("inference"):
+            result = inference_scheduler.wait(
+                inference_scheduler.submit("words", (speech, {"language": "en", "task": "transcribe"}), lane or BULK),
+                settings.request_timeout,
+            )
+        # Word times relative to the original recording
+        for word in result["words"]:
+            word["start"] = round(word["start"] + offset / SAMPLE_RATE, 2)
+            word["end"] = round(word["end"] + offset / SAMPLE_RATE, 2)
+        with stage("scoring"):
+            analysis = analyze_reading(passage, result["words"], duration=len(audio) / SAMPLE_RATE,
+                                       pause_threshold=pause_threshold)
+
+        return {
+            "transcribed_text": result["text"],
+            "words": result["words"],
+            **analysis,
+            **model_fields(result),
+            "success": True
+        }, 200
+
+    return run, {"target": passage, "pause_seconds": pause_threshold}
+
+def pronunciation_task(form, lane=None):
+    lane = lane or INTERACTIVE
+    target = (form.get('target') or '').strip().lower()
+    if not target:
+        raise InvalidRequest("audio file and target required")
+    mode = (form.get('mode') or 'fast').strip().lower()
+    fast = settings.pronunciation_fast_path and mode != 'full' and is_single_word(target)
+    alternatives = parse_alternatives(form.get('alternatives'), target) if fast else None
+
+    def run(audio_bytes):
+        with stage("decode"):
+            audio = decode_audio(audio_bytes)
+
+        audio, _ = trim_silence(audio)
+        if audio is None:
+            logger.info(f"Pronunciation target='{target}': no speech detected, score=0")
+            return {"success": True, "score": 0, "transcript": "", "speech": False, "mode": "vad"}, 200
+
+        if fast:
+            logger.info(f"Scoring pronunciation clip (fast path, {len(alternatives)} alternatives)...")
+            # Scoring happens inside the constrained forward pass
+            with stage("inference"):
+                future = inference_scheduler.submit(
+                    "pronunciation", (audio, target, alternatives, settings.pronunciation_min_confidence,
+                                      settings.pronunciation_min_logprob), lane
+                )
+                scored = inference_scheduler.wait(future, settings.request_timeout)
+            logger.info(
+                f"Pronunciation target='{target}', best='{scored['best']}', "
+                f"confidence={scored['confidence']:.3f}, logprob={scored['target_logprob']:.3f}, "
+                f"score={scored['score']}"
+            )
+            if scored.get("below_floor"):
+                # Top of the candidate set but a poor fit on its own: the word may be
+                # none of the candidates, so let a free transcription decide
+                logger.info(f"Pronunciation target='{target}' below the likelihood floor; transcribing")
+                return full_match(audio, fallback=True)
+            return {
+                "success": True,
+                "score": scored["score"],
+                "confidence": scored["confidence"],
+                "transcript": scored["best"],
+                "candidates": scored["candidates"],
+                "mode": "fast",
+                **model_fields(scored),
+            }, 200
+
+        return full_match(audio)
+
+    def full_match(audio, fallback=False):
+        # Transcribe using the same approach as /transcribe
+        logger.info("Transcribing pronunciation clip...")
+        with stage("inference"):
+            result = inference_scheduler.transcribe(
+                audio,
+                timeout=settings.request_timeout,
+                lane=lane,
+                language='en',
+                task='transcribe'
+            )
+        transcribed_text = (result.get("text") or "").strip().lower()
+
+        # Simple scoring: exact token match for target
+        with stage("scoring"):
+            tokens = re.findall(r"[a-zA-Z]+", transcribed_text)
+            is_correct = int(target in tokens or target == transcribed_text)
+
+        # Log outcome in server console
+        logger.info(f"Pronunciation target='{target}', transcript='{transcribed_text}', score={is_correct}")
+
+        body = {"success": True, "score": is_correct, "transcript": transcribed_text, "mode": "full",
+                **model_fields(result)}
+        if fallback:
+            body["fallback"] = "below_floor"
+        return body, 200
+
+    return run, {"target": target, "fast": fast, "alternatives": alternatives,
+                 "min_confidence": settings.pronunciation_min_confidence,
+                 "min_logprob": settings.pronunciation_min_logprob}
+
 # -----------------------------
 # Assessment Storage Endpoints
 # -----------------------------
 
 def oid(oid_str):
+    # ObjectId(None) would mint a fresh id, so only accept strings
+    if not isinstance(oid_str, str):
+        return None
     try:
         return ObjectId(oid_str)
     except Exception:
         return None
 
-@app.route('/api/assessments', methods=['POST'])
-def create_assessment():
+def writable_assessments(ids):
+    """(verified, unverified): the ids (strings) that queued writes may target.
+
+    Assessments created here are known locally; others are looked up in Mongo
+    once and remembered. While Mongo is unreachable the rest cannot be
+    checked: they are accepted as unverified, and the replay rejects the ones
+    Mongo turns out not to have. Ids Mongo answered for but lacks are in neither.
+    """
+    ids = set(ids)
+    found = local_store.known(ids)
+    missing = ids - found
+    if not missing:
+        return found, set()
     if db is None:
+        return found, missing
+    try:
+        in_mongo = {str(d['_id']) for d in db.assessments.find({'_id': {'$in': [ObjectId(i) for i in missing]}}, {'_id': 1})}
+    except PyMongoError:
+        return found, missing
+    local_store.remember(in_mongo)
+    return found | in_mongo, set()
+
+def queued_write(verified):
+    """202: the write is committed locally and not yet in Mongo. ``verified`` is
+    False when the assessment could not be checked (Mongo down); the sync may still reject it.
+    """
+    return jsonify({"ok": True, "queued": True, "verified": verified}), 202
+
+@storage_routes.route('/api/assessments', methods=['POST'])
+def create_assessment():
+    if db is None and local_store is None:
         return jsonify({"error": "database not available"}), 503
     data = request.get_json(force=True, silent=True) or {}
     user = (data.get('user') or {})
@@ -107,80 +694,509 @@ def create_assessment():
             'sex': (user.get('sex') or '').strip(),
         },
         'ageGroup': data.get('ageGroup') or None,
+        'school': (data.get('school') or '').strip() or None,
         'results': {},
         'startedAt': datetime.utcnow(),
         'completedAt': None,
         'version': 1,
     }
-    res = db.assessments.insert_one(doc)
+    if local_store is not None:
+        # The id is minted here, so the replayed insert is an idempotent upsert
+        doc['_id'] = ObjectId()
+        local_store.append([(CREATE, str(doc['_id']), {'doc': doc})])
+    else:
+        db.assessments.insert_one(doc)
+        update_rollups(None, doc)
     return jsonify({
-        'assessmentId': str(res.inserted_id),
+        'assessmentId': str(doc['_id']),
         'userId': None,
     })
 
-@app.route('/api/assessments/<assessment_id>', methods=['GET'])
-def get_assessment(assessment_id):
+LIST_PAGE_SIZE = 20
+LIST_MAX_PAGE_SIZE = 100
+# List views get identity, timing, risk and score summaries; never raw payloads
+LIST_PROJECTION = dict(
+    {'user': 1, 'ageGroup': 1, 'startedAt': 1, 'completedAt': 1, 'risk.level': 1},
+    **{f'results.{t}.{f}': 1 for t in ('phoneme', 'pretest', 'nonsense', 'questionnaire') for f in ('score', 'total')},
+    **{'results.reading.wpm': 1, 'results.questionnaire.level': 1},
+)
+
+def encode_cursor(sort_value, _id):
+    raw = json.dumps([sort_value.isoformat(), str(_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_value, _id = json.loads(raw)
+        return datetime.fromisoformat(sort_value), ObjectId(_id)
+    except Exception:
+        return None
+
+def parse_date(value):
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None) if value else None
+    except ValueError:
+        raise ValueError(f"invalid date: {value}")
+
+def serialize_summary(doc):
+    doc['id'] = str(doc.pop('_id'))
+    for field in ('startedAt', 'completedAt'):
+        if isinstance(doc.get(field), datetime):
+            doc[field] = doc[field].isoformat()
+    return doc
+
+@storage_routes.route('/api/assessments', methods=['GET'])
+def list_assessments():
+    """Browse assessments with keyset pagination.
+
+    Query params: from/to (ISO dates on the sort field), ageGroup,
+    completed=true|false, risk (risk level), sort=startedAt|completedAt,
+    limit (<= 100) and cursor (from the previous page's nextCursor).
+    Results are newest first; every filter combination is served by one of
+    ASSESSMENT_INDEXES, so a page costs the same however large the
+    collection grows.
+    """
     if db is None:
         return jsonify({"error": "database not available"}), 503
+    args = request.args
+    sort_field = args.get('sort', 'startedAt')
+    if sort_field not in ('startedAt', 'completedAt'):
+        return jsonify({"error": "sort must be startedAt or completedAt"}), 400
+    limit = min(max(args.get('limit', LIST_PAGE_SIZE, type=int), 1), LIST_MAX_PAGE_SIZE)
+
+    query = {}
+    if args.get('ageGroup'):
+        query['ageGroup'] = args['ageGroup']
+    if args.get('risk'):
+        query['risk.level'] = args['risk']
+    completed = args.get('completed')
+    if completed is not None:
+        query['completedAt'] = {'$ne': None} if completed.lower() == 'true' else None
+    if sort_field == 'completedAt':
+        # Incomplete assessments have no completion time to page by
+        if completed is not None and completed.lower() != 'true':
+            return jsonify({"error": "sort=completedAt requires completed assessments"}), 400
+        query['completedAt'] = {'$ne': None}
+
+    try:
+        start, end = parse_date(args.get('from')), parse_date(args.get('to'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    bounds = {}
+    if start:
+        bounds['$gte'] = start
+    if end:
+        bounds['$lt'] = end
+    if bounds:
+        existing = query.get(sort_field)
+        query[sort_field] = dict(existing, **bounds) if isinstance(existing, dict) else bounds
+
+    if args.get('cursor'):
+        position = decode_cursor(args['cursor'])
+        if position is None:
+            return jsonify({"error": "invalid cursor"}), 400
+        after_value, after_id = position
+        query = {'$and': [query, {'$or': [
+            {sort_field: {'$lt': after_value}},
+            {sort_field: after_value, '_id': {'$lt': after_id}},
+        ]}]}
+
+    docs = list(
+        db.assessments.find(query, LIST_PROJECTION)
+        .sort([(sort_field, DESCENDING), ('_id', DESCENDING)])
+        .limit(limit + 1)
+    )
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last[sort_field], last['_id'])
+    return jsonify({
+        "items": [serialize_summary(d) for d in docs],
+        "nextCursor": next_cursor,
+    })
+
+@storage_routes.route('/api/assessments/<assessment_id>', methods=['GET'])
+def get_assessment(assessment_id):
+    if db is None and local_store is None:
+        return jsonify({"error": "database not available"}), 503
     _id = oid(assessment_id)
     if not _id:
         return jsonify({"error": "invalid id"}), 400
-    doc = db.assessments.find_one({'_id': _id})
+    doc = db.assessments.find_one({'_id': _id}) if db is not None else None
+    if local_store is not None:
+        # Read your own writes before they have synced
+        doc = local_store.overlay(str(_id), doc)
     if not doc:
         return jsonify({"error": "not found"}), 404
     doc['id'] = str(doc.pop('_id'))
     return jsonify(doc)
 
-@app.route('/api/assessments/<assessment_id>/results', methods=['POST'])
-def upsert_result(assessment_id):
+@storage_routes.route('/api/assessments/export', methods=['GET'])
+def export_assessments():
+    """Download assessments as a flat training cohort (see export_assessments.py).
+
+    Query params: format=csv|parquet, completedOnly=true, labelledOnly=true,
+    since (ISO date on completedAt). Rows are streamed batch by batch, so the
+    response never holds the whole collection in memory.
+    """
     if db is None:
         return jsonify({"error": "database not available"}), 503
+    args = request.args
+    fmt = args.get('format', 'csv')
+    if fmt not in ('csv', 'parquet'):
+        return jsonify({"error": "format must be csv or parquet"}), 400
+    if fmt == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return jsonify({"error": "parquet export requires pyarrow"}), 501
+    try:
+        since = parse_date(args.get('since'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    query = export_query(
+        completed_only=args.get('completedOnly', '').lower() == 'true',
+        since=since,
+        labelled_only=args.get('labelledOnly', '').lower() == 'true',
+    )
+    batches = iter_batches(db.assessments, query, settings.export_batch_size)
+    if fmt == 'parquet':
+        body, mimetype = iter_parquet(batches), 'application/vnd.apache.parquet'
+    else:
+        body, mimetype = iter_csv(batches), 'text/csv'
+    filename = f"assessments-{datetime.utcnow():%Y%m%d}.{fmt}"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+RESULT_TYPES = {'questionnaire','pretest','phoneme','nonsense','reading'}
+
+def update_rollups(before, after):
+    """Move the analytics buckets from one assessment state to the next (see rollups.py)"""
+    apply_changes(db.rollups, rollup_changes(before, after))
+
+def stamp_result(payload):
+    """Add the server timestamp (fixed-width, so savedAt strings compare in time order)"""
+    payload['savedAt'] = datetime.utcnow().isoformat(timespec='microseconds')
+    return payload
+
+def result_update(test_type, payload):
+    """Mongo update that stores one test's payload under results.<type>"""
+    stamp_result(payload)
+    return {
+        '$set': {f'results.{test_type}': payload},
+        '$setOnInsert': {'startedAt': datetime.utcnow()},
+    }
+
+@storage_routes.route('/api/assessments/<assessment_id>/results', methods=['POST'])
+def upsert_result(assessment_id):
+    if db is None and local_store is None:
+        return jsonify({"error": "database not available"}), 503
     _id = oid(assessment_id)
     if not _id:
         return jsonify({"error": "invalid id"}), 400
     data = request.get_json(force=True, silent=True) or {}
     test_type = data.get('type')
     payload = data.get('payload') or {}
-    if test_type not in {'questionnaire','pretest','phoneme','nonsense','reading'}:
+    if test_type not in RESULT_TYPES:
         return jsonify({"error": "invalid type"}), 400
-    # Add server timestamp
-    payload['savedAt'] = datetime.utcnow().isoformat()
-    update = {
-        '$set': {f'results.{test_type}': payload},
-        '$setOnInsert': {'startedAt': datetime.utcnow()},
-    }
-    doc = db.assessments.find_one_and_update(
-        {'_id': _id}, update, return_document=ReturnDocument.AFTER
+    if local_store is not None:
+        verified, unverified = writable_assessments([str(_id)])
+        if not verified and not unverified:
+            return jsonify({"error": "not found"}), 404
+        local_store.append([(RESULT, str(_id), {'type': test_type, 'payload': stamp_result(payload)})])
+        return queued_write(bool(verified))
+    # The projected pre-image is all the rollups need; the response is just an ack
+    update = result_update(test_type, payload)
+    before = db.assessments.find_one_and_update(
+        {'_id': _id}, update, projection=ROLLUP_PROJECTION, return_document=ReturnDocument.BEFORE
     )
-    if not doc:
+    if before is None:
         return jsonify({"error": "not found"}), 404
+    update_rollups(before, with_result(before, test_type, payload))
     return jsonify({"ok": True})
 
-@app.route('/api/assessments/<assessment_id>/complete', methods=['POST'])
+@storage_routes.route('/api/assessments/results/bulk', methods=['POST'])
+def bulk_upsert_results():
+    """Apply many result updates in one unordered bulk_write (or one local store commit).
+
+    Body: {"items": [{"assessmentId": "...", "type": "...", "payload": {...}}, ...]}
+    Returns per-item status in request order: ok, invalid id, invalid type,
+    not found or error.
+    """
+    if db is None and local_store is None:
+        return jsonify({"error": "database not available"}), 503
+    data = request.get_json(force=True, silent=True) or {}
+    items = data.get('items')
+    if not isinstance(items, list):
+        return jsonify({"error": "items list required"}), 400
+    if len(items) > settings.bulk_max_items:
+        return jsonify({"error": f"at most {settings.bulk_max_items} items per request"}), 413
+
+    statuses = [None] * len(items)
+    valid = []
+    for i, item in enumerate(items):
+        item = item if isinstance(item, dict) else {}
+        _id = oid(item.get('assessmentId'))
+        if not _id:
+            statuses[i] = "invalid id"
+        elif item.get('type') not in RESULT_TYPES:
+            statuses[i] = "invalid type"
+        else:
+            valid.append((i, _id, item['type'], item.get('payload') or {}))
+
+    if local_store is not None:
+        verified, unverified = writable_assessments(str(_id) for _, _id, _, _ in valid)
+        results = [{"index": i, "status": s} for i, s in enumerate(statuses)]
+        ops = []
+        for i, _id, test_type, payload in valid:
+            if str(_id) not in verified and str(_id) not in unverified:
+                statuses[i] = results[i]["status"] = "not found"
+                continue
+            ops.append((RESULT, str(_id), {'type': test_type, 'payload': stamp_result(payload)}))
+            statuses[i] = results[i]["status"] = "ok"
+            # Queued, not yet in Mongo; unverified items may still be rejected by the sync
+            results[i]["verified"] = str(_id) in verified
+        local_store.append(ops)
+        return jsonify({
+            "ok": all(s == "ok" for s in statuses),
+            "applied": statuses.count("ok"),
+            "queued": True,
+            "results": results,
+        }), 202
+
+    # One projected lookup tells us which assessments exist and gives the rollup pre-images
+    existing = {}
+    if valid:
+        ids = list({_id for _, _id, _, _ in valid})
+        existing = {d['_id']: d for d in db.assessments.find({'_id': {'$in': ids}}, ROLLUP_PROJECTION)}
+
+    ops, op_items = [], []
+    for i, _id, test_type, payload in valid:
+        if _id not in existing:
+            statuses[i] = "not found"
+            continue
+        ops.append(UpdateOne({'_id': _id}, result_update(test_type, payload)))
+        op_items.append((i, _id, test_type, payload))
+
+    if ops:
+        failed = {}
+        try:
+            db.assessments.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            failed = {err['index']: err.get('errmsg', 'error') for err in e.details.get('writeErrors', [])}
+            logger.error(f"Bulk result ingest: {len(failed)} of {len(ops)} writes failed")
+        for op_index, (i, _, _, _) in enumerate(op_items):
+            statuses[i] = "error" if op_index in failed else "ok"
+
+        # Roll each assessment from its pre-image through its applied results
+        states = dict(existing)
+        for op_index, (_, _id, test_type, payload) in enumerate(op_items):
+            if op_index not in failed:
+                states[_id] = with_result(states[_id], test_type, payload)
+        changes = []
+        for _id, after in states.items():
+            if after is not existing[_id]:
+                changes.extend(rollup_changes(existing[_id], after))
+        apply_changes(db.rollups, changes)
+
+    return jsonify({
+        "ok": all(s == "ok" for s in statuses),
+        "applied": statuses.count("ok"),
+        "results": [{"index": i, "status": s} for i, s in enumerate(statuses)],
+    })
+
+@storage_routes.route('/api/assessments/<assessment_id>/complete', methods=['POST'])
 def complete_assessment(assessment_id):
-    if db is None:
+    if db is None and local_store is None:
         return jsonify({"error": "database not available"}), 503
     _id = oid(assessment_id)
     if not _id:
         return jsonify({"error": "invalid id"}), 400
-    doc = db.assessments.find_one_and_update(
+    completed_at = datetime.utcnow()
+    if local_store is not None:
+        verified, unverified = writable_assessments([str(_id)])
+        if not verified and not unverified:
+            return jsonify({"error": "not found"}), 404
+        local_store.append([(COMPLETE, str(_id), {'completedAt': completed_at})])
+        return queued_write(bool(verified))
+    before = db.assessments.find_one_and_update(
         {'_id': _id},
-        {'$set': {'completedAt': datetime.utcnow()}},
-        return_document=ReturnDocument.AFTER
+        {'$set': {'completedAt': completed_at}},
+        projection=ROLLUP_PROJECTION,
+        return_document=ReturnDocument.BEFORE
     )
-    if not doc:
+    if not before:
         return jsonify({"error": "not found"}), 404
+    update_rollups(before, dict(before, completedAt=completed_at))
     return jsonify({"ok": True})
 
-@app.route('/transcribe', methods=['POST'])
+ANALYTICS_DEFAULT_WEEKS = 12
+ANALYTICS_GROUPS = ('school', 'week', 'ageGroup', 'risk')
+
+@storage_routes.route('/api/analytics/cohorts', methods=['GET'])
+def cohort_analytics():
+    """Assessment counts, completion rates and average scores from the rollups.
+
+    Query params: from/to (ISO dates; default the last 12 weeks), school,
+    ageGroup, risk, and groupBy (comma-separated subset of school, week,
+    ageGroup, risk; default week). Only the pre-aggregated buckets in
+    ``rollups`` are read, so the cost does not grow with stored history.
+    """
+    if db is None:
+        return jsonify({"error": "database not available"}), 503
+    args = request.args
+    group_by = [g for g in args.get('groupBy', 'week').split(',') if g]
+    unknown = [g for g in group_by if g not in ANALYTICS_GROUPS]
+    if unknown:
+        return jsonify({"error": f"groupBy must be a subset of {', '.join(ANALYTICS_GROUPS)}"}), 400
+    try:
+        start, end = parse_date(args.get('from')), parse_date(args.get('to'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if start is None:
+        start = (end or datetime.utcnow()) - timedelta(weeks=ANALYTICS_DEFAULT_WEEKS)
+    query = rollup_query(start, end, school=args.get('school'), ageGroup=args.get('ageGroup'),
+                         risk=args.get('risk'))
+    buckets = list(db.rollups.find(query, {'updatedAt': 0}))
+    return jsonify({
+        "from": start.isoformat(),
+        "to": end.isoformat() if end else None,
+        "groupBy": group_by,
+        "buckets": len(buckets),
+        "rows": summarize(buckets, group_by),
+        "total": summarize(buckets)[0] if buckets else None,
+    })
+
+# -----------------------------
+# Risk Prediction Endpoints
+# -----------------------------
+
+def _store_risk(predictions):
+    """Write predicted risk back onto assessments and move their rollup buckets"""
+    if not predictions:
+        return
+    ids = [_id for _id, _ in predictions]
+    before = {d['_id']: d for d in db.assessments.find({'_id': {'$in': ids}}, ROLLUP_PROJECTION)}
+    db.assessments.bulk_write([_risk_update(_id, p) for _id, p in predictions], ordered=False)
+    changes = []
+    for _id, prediction in predictions:
+        if _id in before:
+            changes.extend(rollup_changes(before[_id], dict(before[_id], risk={'level': prediction['level']})))
+    apply_changes(db.rollups, changes)
+
+def _risk_update(_id, prediction):
+    risk = dict(prediction, scoredAt=datetime.utcnow())
+    return UpdateOne({'_id': _id}, {'$set': {'risk': risk}})
+
+@risk_routes.route('/api/risk/predict', methods=['POST'])
+def predict_risk():
+    """Predict risk for one assessment, from raw features or a stored assessmentId"""
+    if risk_model is None:
+        return jsonify({"error": "risk model not available"}), 503
+    data = request.get_json(force=True, silent=True) or {}
+    _id = None
+    if data.get('assessmentId'):
+        if db is None:
+            return jsonify({"error": "database not available"}), 503
+        _id = oid(data['assessmentId'])
+        if not _id:
+            return jsonify({"error": "invalid id"}), 400
+        doc = db.assessments.find_one({'_id': _id}, FEATURE_PROJECTION)
+        if not doc:
+            return jsonify({"error": "not found"}), 404
+        row = assessment_features(doc)
+    elif isinstance(data.get('features'), dict):
+        row = features_from_mapping(data['features'])
+    else:
+        return jsonify({"error": "features or assessmentId required"}), 400
+
+    prediction = risk_model.predict_records([row])[0]
+    if _id is not None and data.get('store'):
+        _store_risk([(_id, prediction)])
+    prediction['features'] = {
+        col: (None if v != v else v) for col, v in zip(FEATURE_COLUMNS, row)
+    }
+    return jsonify(prediction)
+
+@risk_routes.route('/api/risk/predict_batch', methods=['POST'])
+def predict_risk_batch():
+    """Score many assessments with vectorised predict_proba calls.
+
+    Body (one of):
+      {"items": [{feature: value, ...}, ...]}      -> per-item predictions
+      {"assessmentIds": ["...", ...], "store": bool}
+      {"all": true, "completedOnly": bool, "store": bool}  -> cohort re-score
+    Stored assessments are streamed with a projected cursor and scored
+    settings.risk_batch_size rows at a time; store=true writes `risk` back in bulk.
+    """
+    if risk_model is None:
+        return jsonify({"error": "risk model not available"}), 503
+    data = request.get_json(force=True, silent=True) or {}
+
+    if isinstance(data.get('items'), list):
+        rows = [features_from_mapping(item if isinstance(item, dict) else {}) for item in data['items']]
+        return jsonify({
+            "modelVersion": risk_model.version,
+            "results": risk_model.predict_records(rows),
+        })
+
+    if db is None:
+        return jsonify({"error": "database not available"}), 503
+    if isinstance(data.get('assessmentIds'), list):
+        ids = [oid(x) for x in data['assessmentIds']]
+        if any(i is None for i in ids):
+            return jsonify({"error": "invalid id"}), 400
+        query = {'_id': {'$in': ids}}
+        return_results = True
+    elif data.get('all'):
+        query = {'completedAt': {'$ne': None}} if data.get('completedOnly') else {}
+        return_results = False
+    else:
+        return jsonify({"error": "items, assessmentIds or all required"}), 400
+
+    store = bool(data.get('store'))
+    cursor = db.assessments.find(query, FEATURE_PROJECTION, batch_size=settings.risk_batch_size)
+    scored, results = 0, {}
+    chunk_ids, chunk_rows = [], []
+
+    def flush():
+        nonlocal scored
+        predictions = risk_model.predict_records(chunk_rows)
+        if store:
+            _store_risk(list(zip(chunk_ids, predictions)))
+        if return_results:
+            results.update({str(i): p for i, p in zip(chunk_ids, predictions)})
+        scored += len(chunk_ids)
+        chunk_ids.clear()
+        chunk_rows.clear()
+
+    for doc in cursor:
+        chunk_ids.append(doc['_id'])
+        chunk_rows.append(assessment_features(doc))
+        if len(chunk_ids) >= settings.risk_batch_size:
+            flush()
+    if chunk_ids:
+        flush()
+
+    response = {"modelVersion": risk_model.version, "scored": scored, "stored": store}
+    if return_results:
+        response["results"] = results
+    return jsonify(response)
+
+@transcribe_routes.route('/transcribe', methods=['POST'])
 def transcribe_audio():
     """Transcribe audio file using Whisper"""
     
     try:
         # Check if model is loaded
-        if not whisper_model:
+        if inference_scheduler is None:
             logger.error("Whisper model not loaded")
-            return jsonify({"error": "Whisper model not available"}), 500
+            return model_unavailable()
         
         # Check if audio file is in request
         if 'audio' not in request.files:
@@ -198,187 +1214,414 @@ def transcribe_audio():
         logger.info(f"Received audio file: {audio_file.filename}")
         logger.info(f"Content type: {audio_file.content_type}")
         
-        # Save audio file temporarily
-        temp_filename = f"temp_audio_{os.getpid()}.webm"
-        temp_path = os.path.join(os.getcwd(), temp_filename)
-        
-        try:
-            # Save the file
-            audio_file.save(temp_path)
-            
-            # Check file was saved
-            if not os.path.exists(temp_path):
-                raise FileNotFoundError("Failed to save audio file")
-            
-            file_size = os.path.getsize(temp_path)
-            logger.info(f"Audio file saved: {temp_path} ({file_size} bytes)")
-            
-            if file_size == 0:
-                raise ValueError("Audio file is empty")
-            
-            # Transcribe using Whisper (same logic as test_whisper.py)
-            logger.info("Starting Whisper transcription (forced English)...")
-            result = whisper_model.transcribe(
-                temp_path,
-                language='en',
-                task='transcribe'
-            )
-            transcribed_text = result["text"].strip()
-            
-            logger.info("✅ Transcription successful!")
-            logger.info(f"Transcribed text: {transcribed_text[:100]}...")
-            
-            # Return the transcribed text
-            return jsonify({
-                "transcribed_text": transcribed_text,
-                "success": True
-            })
-            
-        finally:
-            # Clean up temporary file
-            try:
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-                    logger.info("Temporary audio file cleaned up")
-            except Exception as cleanup_error:
-                logger.warning(f"Failed to cleanup temporary file: {cleanup_error}")
+        # Decode the upload in memory (no temp file round trip)
+        with stage("upload"):
+            audio_bytes = read_upload(audio_file)
+        logger.info(f"Audio upload received ({len(audio_bytes)} bytes)")
+
+        run, options = transcribe_task(request.form)
+        # A re-submitted recording is answered from the transcript cache
+        return cached_response(audio_bytes, run, **options)
         
-    except FileNotFoundError as e:
-        logger.error(f"File not found error: {e}")
-        return jsonify({"error": "Audio file not found"}), 500
+    except InvalidRequest as e:
+        return jsonify({"error": str(e)}), 400
+    except QueueFull as e:
+        return too_busy(e)
     except ValueError as e:
         logger.error(f"Invalid file error: {e}")
         return jsonify({"error": str(e)}), 500
+    except FutureTimeoutError:
+        logger.error("Transcription timed out waiting for the model")
+        return jsonify({"error": "Transcription timed out"}), 503
     except Exception as e:
         logger.error(f"Unexpected error during transcription: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
 
-@app.route('/check_pronunciation', methods=['POST'])
+@transcribe_routes.route('/api/reading/analyze', methods=['POST'])
+def analyze_reading_audio():
+    """Transcribe a reading passage with word timestamps and score its fluency.
+
+    Form fields: ``audio`` (file), ``passage`` (the text that was read) and
+    optional ``pauseSeconds`` (long-pause threshold). Returns the transcript,
+    timed words, WPM, WCPM, substitutions, omissions, insertions and long
+    pauses.
+    """
+    try:
+        if inference_scheduler is None:
+            return model_unavailable()
+        if 'audio' not in request.files or request.files['audio'].filename == '':
+            return jsonify({"error": "No audio file provided"}), 400
+        run, options = analyze_task(request.form)
+
+        with stage("upload"):
+            audio_bytes = read_upload(request.files['audio'])
+        return cached_response(audio_bytes, run, **options)
+
+    except InvalidRequest as e:
+        return jsonify({"error": str(e)}), 400
+    except QueueFull as e:
+        return too_busy(e)
+    except ValueError as e:
+        logger.error(f"Invalid file error: {e}")
+        return jsonify({"error": str(e)}), 500
+    except FutureTimeoutError:
+        logger.error("Reading analysis timed out waiting for the model")
+        return jsonify({"error": "Transcription timed out"}), 503
+    except Exception as e:
+        logger.error(f"Unexpected error during reading analysis: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+# Seconds to wait for the session config / the next audio chunk
+STREAM_START_TIMEOUT = 10
+STREAM_IDLE_TIMEOUT = 30
+
+@sock.route('/ws/reading', bp=transcribe_routes)
+def stream_reading(ws):
+    """Transcribe a reading passage while it is being recorded.
+
+    The client first sends a JSON config ``{"passage", "encoding", "sampleRate"}``
+    (encoding: webm (MediaRecorder pieces, the default), pcm_s16le or f32le),
+    then binary audio chunks, then ``{"type": "end"}``. The server answers
+    ``{"type": "ready"}``, a ``partial`` message (text, wordsRead, wordsCorrect)
+    every couple of seconds of new audio, and a ``final`` message with the
+    finished transcript, WPM and WCPM before closing.
+    """
+    def send(message):
+        ws.send(json.dumps(message))
+
+    if inference_scheduler is None:
+        send({"type": "error", "error": "Whisper model not available"})
+        return
+
+    def transcribe_window(audio):
+        return inference_scheduler.transcribe(
+            audio,
+            timeout=settings.request_timeout,
+            lane=BULK,
+            language='en',
+            task='transcribe'
+        )["text"]
+
+    first = ws.receive(timeout=STREAM_START_TIMEOUT)
+    try:
+        config = json.loads(first) if isinstance(first, str) else {}
+        session = StreamingSession(
+            transcribe_window,
+            passage=config.get("passage", ""),
+            encoding=config.get("encoding", "webm"),
+            sample_rate=int(config.get("sampleRate", SAMPLE_RATE)),
+            skip_silence=settings.vad,
+        )
+    except (ValueError, TypeError, AttributeError) as e:
+        send({"type": "error", "error": f"Invalid stream config: {e}"})
+        return
+    if isinstance(first, bytes):
+        session.feed(first)
+    send({"type": "ready"})
+
+    try:
+        ended = False
+        while not ended:
+            message = ws.receive(timeout=STREAM_IDLE_TIMEOUT)
+            if message is None:
+                logger.warning("Reading stream idle; finalizing")
+                break
+            # Drain everything already received so a slow decode never leaves
+            # the transcript more than one step behind the reader
+            while message is not None:
+                if isinstance(message, bytes):
+                    session.feed(message)
+                elif json.loads(message).get("type") == "end":
+                    ended = True
+                    break
+                message = ws.receive(timeout=0)
+            if not ended and session.due():
+                with stage("inference"):
+                    send(session.update())
+        with stage("inference"):
+            final = session.finish()
+        logger.info(f"Reading stream finalized: {final['seconds']}s audio, "
+                    f"{final['wordsCorrect']}/{final['passageWords']} words correct")
+        send(final)
+    except FutureTimeoutError:
+        logger.error("Streaming transcription timed out waiting for the model")
+        send({"type": "error", "error": "Transcription timed out"})
+    except QueueFull as e:
+        logger.warning(f"Streaming transcription rejected: {e}")
+        send({"type": "error", "error": "Server busy, retry later", "retryAfter": e.retry_after})
+    except (ValueError, RuntimeError) as e:
+        logger.error(f"Streaming transcription failed: {e}")
+        send({"type": "error", "error": str(e)})
+
+
+@pronunciation_routes.route('/check_pronunciation', methods=['POST'])
 def check_pronunciation():
     """Score a short audio clip against a target word/phrase (1 or 0).
-    Implements the same file handling/transcription pattern as /transcribe.
+    Implements the same in-memory decoding/transcription pattern as /transcribe.
+
+    Single-word targets use the constrained fast path (one forward pass over
+    the target and its confusables) unless the form sets mode=full; phrases
+    fall back to full transcription plus token matching.
     """
     try:
         # Check model loaded
-        if not whisper_model:
+        if inference_scheduler is None:
             logger.error("Whisper model not loaded")
-            return jsonify({"error": "Whisper model not available"}), 500
+            return model_unavailable()
 
         # Validate request
         if 'audio' not in request.files or 'target' not in request.form:
             logger.error("Missing audio or target in request")
             return jsonify({"error": "audio file and target required"}), 400
 
-        target = request.form['target'].strip().lower()
+        run, options = pronunciation_task(request.form)
         audio_file = request.files['audio']
         if audio_file.filename == '':
             logger.error("No file selected")
             return jsonify({"error": "No file selected"}), 400
 
-        # Save temp file (same pattern as /transcribe)
-        temp_filename = f"temp_audio_{os.getpid()}_pron.webm"
-        temp_path = os.path.join(os.getcwd(), temp_filename)
-
-        try:
-            audio_file.save(temp_path)
-            if not os.path.exists(temp_path):
-                raise FileNotFoundError("Failed to save audio file")
-
-            file_size = os.path.getsize(temp_path)
-            logger.info(f"Pronunciation clip saved: {temp_path} ({file_size} bytes)")
-            if file_size == 0:
-                raise ValueError("Audio file is empty")
-
-            # Transcribe using the same approach as /transcribe
-            logger.info("Transcribing pronunciation clip...")
-            result = whisper_model.transcribe(
-                temp_path,
-                language='en',
-                task='transcribe'
-            )
-            transcribed_text = (result.get("text") or "").strip().lower()
-
-            # Simple scoring: exact token match for target
-            tokens = re.findall(r"[a-zA-Z]+", transcribed_text)
-            is_correct = int(target in tokens or target == transcribed_text)
-
-            # Log outcome in server console
-            logger.info(f"Pronunciation target='{target}', transcript='{transcribed_text}', score={is_correct}")
-
-            return jsonify({"success": True, "score": is_correct, "transcript": transcribed_text})
-        finally:
-            # Cleanup temp file
-            try:
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-                    logger.info("Pronunciation temp file cleaned up")
-            except Exception:
-                pass
-    except FileNotFoundError as e:
-        logger.error(f"File not found error (pronunciation): {e}")
-        return jsonify({"error": "Audio file not found"}), 500
+        # Decode the upload in memory (same pattern as /transcribe)
+        with stage("upload"):
+            audio_bytes = read_upload(audio_file)
+        logger.info(f"Pronunciation clip received ({len(audio_bytes)} bytes)")
+        return cached_response(audio_bytes, run, **options)
+    except InvalidRequest as e:
+        return jsonify({"error": str(e)}), 400
+    except QueueFull as e:
+        return too_busy(e)
     except ValueError as e:
         logger.error(f"Invalid file error (pronunciation): {e}")
         return jsonify({"error": str(e)}), 500
+    except FutureTimeoutError:
+        logger.error("Pronunciation check timed out waiting for the model")
+        return jsonify({"error": "Transcription timed out"}), 503
     except Exception as e:
         logger.error(f"check_pronunciation error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
 
-@app.route('/tts_offline', methods=['GET'])
+@tts_routes.route('/tts_offline', methods=['GET'])
 def tts_offline():
-    """Generate speech audio (WAV) from text using pyttsx3 and return it."""
+    """Generate speech audio (WAV) from text using pyttsx3 and return it.
+    Audio is served from the content-addressed TTS cache when possible.
+    """
     try:
-        if pyttsx3 is None:
-            return jsonify({"error": "pyttsx3 not installed"}), 500
-
         text = (request.args.get('text') or '').strip()
         if not text:
             return jsonify({"error": "text query param required"}), 400
 
-        engine = pyttsx3.init()
         # Optional: query params for rate, voice, volume
         rate = request.args.get('rate', type=int)
         volume = request.args.get('volume', type=float)
         voice_index = request.args.get('voice', type=int)
-        if rate is not None:
-            engine.setProperty('rate', rate)
-        if volume is not None:
-            engine.setProperty('volume', max(0.0, min(1.0, volume)))
-        if voice_index is not None:
-            voices = engine.getProperty('voices')
-            if 0 <= voice_index < len(voices):
-                engine.setProperty('voice', voices[voice_index].id)
-
-        temp_filename = f"tts_{os.getpid()}.wav"
-        temp_path = os.path.join(os.getcwd(), temp_filename)
-        try:
-            engine.save_to_file(text, temp_path)
-            engine.runAndWait()
-            if not os.path.exists(temp_path):
-                raise FileNotFoundError("Failed to synthesize audio")
-            return send_file(temp_path, mimetype='audio/wav', as_attachment=False)
-        finally:
-            try:
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-            except Exception:
-                pass
+
+        # The cache key is the ETag; clients holding it need no body at all
+        key = cache_key(text, rate, volume, voice_index)
+        if request.if_none_match.contains(key):
+            response = Response(status=304)
+        else:
+            with stage("cache"):
+                data = tts_cache.get(key)
+            if data is None:
+                if import_pyttsx3() is None:
+                    return jsonify({"error": "pyttsx3 not installed"}), 500
+                with stage("synthesis"):
+                    data = tts_cache.render(key, text, rate, volume, voice_index)
+            response = Response(data, mimetype='audio/wav')
+        response.set_etag(key)
+        response.headers['Cache-Control'] = f'public, max-age={settings.tts_cache_max_age}'
+        return response
     except Exception as e:
         logger.error(f"tts_offline error: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
-if __name__ == '__main__':
-    # Load Whisper model at startup
-    if not load_whisper_model():
-        logger.error("Failed to load Whisper model. Exiting.")
-        exit(1)
-    # Init Mongo
-    init_mongo()
-    
+# -----------------------------
+# Audio jobs
+# -----------------------------
+
+# Job type -> (route whose work it runs, feature it needs, task, default lane)
+JOB_TYPES = {
+    "transcribe": ("/transcribe", "transcribe", transcribe_task, BULK),
+    "analyze": ("/api/reading/analyze", "transcribe", analyze_task, BULK),
+    "pronunciation": ("/check_pronunciation", "pronunciation", pronunciation_task, INTERACTIVE),
+}
+# Longest ?wait= a status request may block for
+JOB_MAX_WAIT = 30
+
+def job_result(route, audio_bytes, run, options):
+    """Run a queued job on a runner thread, with the same error bodies as the synchronous route"""
+    job_context.route = route
+    try:
+        return cached_result(route, audio_bytes, run, **options)
+    except QueueFull as e:
+        return {"error": "Server busy, retry later", "lane": e.lane, "retryAfter": e.retry_after}, 429
+    except FutureTimeoutError:
+        return {"error": "Transcription timed out"}, 503
+    except ValueError as e:
+        return {"error": str(e)}, 500
+    finally:
+        job_context.route = None
+
+@job_routes.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue an audio job and answer 202 with its id right away.
+
+    Form fields: ``type`` (transcribe, analyze or pronunciation), ``audio``
+    and the fields of the matching synchronous route (passage/pauseSeconds,
+    target/alternatives/mode). ``priority`` (interactive or bulk) overrides the
+    type's lane. Poll ``GET /api/jobs/<id>`` for the result.
+    """
+    try:
+        if inference_scheduler is None or job_queue is None:
+            return model_unavailable()
+        types = [t for t, (_, feature, _, _) in JOB_TYPES.items() if settings.enabled(feature)]
+        kind = (request.form.get('type') or 'transcribe').strip().lower()
+        if kind not in types:
+            return jsonify({"error": f"type must be one of {', '.join(types)}"}), 400
+        route, _, task, lane = JOB_TYPES[kind]
+        lane = (request.form.get('priority') or lane).strip().lower()
+        if lane not in LANES:
+            return jsonify({"error": f"priority must be one of {', '.join(LANES)}"}), 400
+        if 'audio' not in request.files or request.files['audio'].filename == '':
+            return jsonify({"error": "No audio file provided"}), 400
+        # The runner submits the model work in the job's lane too
+        run, options = task(request.form, lane)
+
+        with stage("upload"):
+            audio_bytes = read_upload(request.files['audio'])
+        job = job_queue.submit(kind, lane, lambda: job_result(route, audio_bytes, run, options))
+        logger.info(f"Queued {kind} job {job.id} in the {lane} lane ({len(audio_bytes)} bytes)")
+
+        response = jsonify(job.describe(job_queue.position(job)))
+        response.headers['Location'] = f"/api/jobs/{job.id}"
+        return response, 202
+    except InvalidRequest as e:
+        return jsonify({"error": str(e)}), 400
+    except QueueFull as e:
+        return too_busy(e)
+    except Exception as e:
+        logger.error(f"submit_job error: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+@job_routes.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status, and its result once done; ``?wait=<seconds>`` long-polls until it finishes"""
+    job = job_queue.get(job_id) if job_queue is not None else None
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    try:
+        wait = min(float(request.args.get('wait', 0)), JOB_MAX_WAIT)
+    except ValueError:
+        return jsonify({"error": "wait must be a number of seconds"}), 400
+    if wait > 0:
+        job = job_queue.wait(job, wait)
+    return jsonify(job.describe(job_queue.position(job)))
+
+# -----------------------------
+# Application factory
+# -----------------------------
+
+FEATURE_ROUTES = {
+    "metrics": metrics_routes,
+    "storage": storage_routes,
+    "risk": risk_routes,
+    "transcribe": transcribe_routes,
+    "pronunciation": pronunciation_routes,
+    "tts": tts_routes,
+    "jobs": job_routes,
+}
+
+def create_app(config: Optional[Settings] = None) -> Flask:
+    """Build the Flask app with the feature modules enabled in ``config``.
+    Models, Mongo and TTS workers are started separately by start_services().
+    """
+    global settings, tts_pool, tts_cache, transcript_cache, job_queue, local_store, store_syncer
+    settings = config or load_settings()
+
+    flask_app = Flask(__name__)
+    CORS(flask_app)
+    flask_app.config["DYSCOVER_SETTINGS"] = settings
+    flask_app.register_blueprint(core_routes)
+    for feature, routes in FEATURE_ROUTES.items():
+        if settings.enabled(feature):
+            flask_app.register_blueprint(routes)
+    if settings.enabled("metrics"):
+        flask_app.before_request(start_request_timer)
+        flask_app.after_request(record_request_metrics)
+
+    if settings.enabled("tts"):
+        tts_pool = TTSWorkerPool(settings.tts_workers, settings.tts_timeout) if settings.tts_workers > 0 else None
+        tts_cache = TTSCache(settings.tts_cache_dir, settings.tts_cache_disk_mb, settings.tts_cache_memory_mb,
+                             renderer=tts_pool.render if tts_pool else render_wav)
+    else:
+        tts_pool = tts_cache = None
+
+    if settings.needs_whisper and settings.transcript_cache != "off":
+        tier = None
+        if settings.transcript_cache == "disk":
+            tier = DiskTier(settings.transcript_cache_dir, settings.transcript_cache_disk_mb * 1024 * 1024)
+        elif settings.transcript_cache == "mongo":
+            tier = MongoTier(lambda: db.transcript_cache if db is not None else None)
+        transcript_cache = TranscriptCache(settings.transcript_cache_entries, settings.transcript_cache_ttl, tier)
+    else:
+        transcript_cache = None
+
+    if settings.enabled("jobs") and settings.needs_whisper:
+        board = JobBoard(settings.job_store) if settings.job_store else None
+        job_queue = JobQueue(settings.job_workers, settings.job_max_queued, settings.job_ttl, board)
+    else:
+        job_queue = None
+
+    if settings.enabled("storage") and settings.local_store:
+        local_store = LocalStore(settings.local_store_path)
+        store_syncer = Syncer(local_store, connected_db, settings.sync_batch_size, settings.sync_interval)
+    else:
+        local_store = store_syncer = None
+    return flask_app
+
+def start_services():
+    """Connect Mongo, start model warm-up, spawn the TTS workers, the job runners and the store syncer.
+    Returns the warm-up thread so callers can wait for readiness.
+    """
+    # Init Mongo first so storage endpoints work immediately
+    if settings.enabled("storage") or settings.enabled("risk") or settings.transcript_cache == "mongo":
+        init_mongo()
+    # Load the risk and Whisper models in the background
+    warmup = start_model_warmup()
+    # Spawn the TTS engine workers
+    if tts_pool is not None:
+        tts_pool.start()
+    if job_queue is not None:
+        job_queue.start()
+    if store_syncer is not None:
+        store_syncer.start()
+    return warmup
+
+app = create_app(settings)
+
+def main(default_profile: Optional[str] = None):
+    global app
+    parser = argparse.ArgumentParser(description="Dyslexia Screening Tool Backend")
+    parser.add_argument('--profile', type=str, default=default_profile, help='central, kiosk or lite (config.py)')
+    parser.add_argument('--model', dest='whisper_model', type=str, help='Whisper model size (tiny/base/small/medium/...)')
+    parser.add_argument('--device', type=str, help='auto, cpu or cuda')
+    parser.add_argument('--compute-dtype', type=str, help='auto, fp32, fp16 or int8 (CPU)')
+    parser.add_argument('--threads', dest='torch_threads', type=int, help='torch intra-op threads')
+    parser.add_argument('--features', type=str, help='Comma-separated feature modules, or "all"')
+    parser.add_argument('--port', type=int, help='Port to listen on')
+    args = vars(parser.parse_args())
+    profile = args.pop('profile')
+    app = create_app(load_settings(profile=profile, **args))
+    start_services()
+
     logger.info("🚀 Starting Dyslexia Screening Tool Backend...")
-    logger.info("📝 Using Whisper medium model for transcription")
-    logger.info("🌐 Server will run on http://localhost:5000")
-    
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    logger.info(f"📝 Using Whisper {settings.whisper_model} model ({settings.profile} profile, "
+                f"features: {', '.join(sorted(settings.features))})")
+    logger.info(f"🌐 Server will run on http://localhost:{settings.port}")
+
+    app.run(host=settings.host, port=settings.port, debug=False)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+In-memory audio decoding for uploaded clips.
+
+Uploads are decoded straight from memory into the 16 kHz mono float32 buffer
+Whisper expects, without writing them to disk first:
+- PCM WAV is parsed natively with the ``wave`` module
+- everything else (webm/ogg from MediaRecorder, mp3, ...) is piped through
+  ffmpeg stdin -> stdout
+
+MP4/M4A files that keep their index at the end of the file cannot be demuxed
+from a pipe, so those alone fall back to a uniquely named temporary file.
+"""
+
+import io
+import os
+import subprocess
+import tempfile
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def _ffmpeg_cmd(source: str, sr: int):
+    return [
+        "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-threads", "0",
+        "-i", source,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sr),
+        "pipe:1",
+    ]
+
+
+def _run_ffmpeg(cmd, data: bytes = None) -> np.ndarray:
+    try:
+        proc = subprocess.run(cmd, input=data, capture_output=True, check=True)
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg is not installed or not on PATH")
+    except subprocess.CalledProcessError as e:
+        message = e.stderr.decode(errors="ignore").strip().splitlines()
+        raise ValueError(f"Failed to decode audio: {message[-1] if message else 'ffmpeg error'}")
+    return np.frombuffer(proc.stdout, np.int16).astype(np.float32) / 32768.0
+
+
+def _decode_wav(data: bytes, sr: int):
+    """Decode 16-bit PCM WAV without ffmpeg; returns None for other encodings"""
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            if wav.getsampwidth() != 2:
+                return None
+            channels = wav.getnchannels()
+            rate = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+    audio = np.frombuffer(frames, np.int16).astype(np.float32) / 32768.0
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    if rate != sr and len(audio):
+        # Linear resampling is plenty for speech recognition input
+        n_out = int(round(len(audio) * sr / rate))
+        audio = np.interp(
+            np.linspace(0, len(audio) - 1, n_out), np.arange(len(audio)), audio
+        ).astype(np.float32)
+    return audio
+
+
+def _is_mp4(data: bytes) -> bool:
+    return len(data) >= 12 and data[4:8] == b"ftyp"
+
+
+def decode_audio(data: bytes, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """Decode an encoded audio file held in memory to mono float32 at ``sr`` Hz.
+
+    Raises ValueError for empty or undecodable input and RuntimeError when
+    ffmpeg is needed but missing.
+    """
+    if not data:
+        raise ValueError("Audio file is empty")
+
+    if data[:4] == b"RIFF":
+        audio = _decode_wav(data, sr)
+        if audio is not None:
+            return audio
+
+    if not _is_mp4(data):
+        return _run_ffmpeg(_ffmpeg_cmd("pipe:0", sr), data)
+
+    fd, path = tempfile.mkstemp(suffix=".m4a")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return _run_ffmpeg(_ffmpeg_cmd(path, sr))
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def read_upload(file_storage) -> bytes:
+    """Read an uploaded werkzeug FileStorage fully into memory"""
+    return file_storage.stream.read()
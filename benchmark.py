@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for the backend hot paths.
+
+Starts ``app.py`` in-process on a local port (or targets a running server with
+``--url``) and drives each scenario at several concurrency levels from a pool
+of client threads, recording per-request latency over real HTTP.
+
+Fixtures are generated, not downloaded: synthetic 16 kHz WAV clips (voiced
+tone bursts separated by pauses) of configurable lengths. In-process runs
+use mongomock (or a scratch database via ``--mongo-uri``) behind a scratch
+local store with its syncer running, as in production, and, by default, a stub Whisper whose batch
+handlers sleep on a simple cost model. That measures the service overhead
+(upload, decode, batching, JSON) without a GPU. ``--whisper tiny|small|medium``
+loads a real checkpoint instead, e.g. to compare the sizes app.py and app1.py
+serve. TTS uses a stub renderer unless ``--tts real``. Every audio upload is
+made unique, so a transcript cache (in-process it is off unless
+``--transcript-cache``) never turns the audio scenarios into cache hits.
+
+Scenarios: transcribe, pronunciation, tts (cached prompts), tts_miss,
+create, save_result, get, list, complete.
+
+Results (p50/p95/p99/mean latency, throughput, error counts, plus the git
+commit and machine details) are written as JSON so runs can be compared:
+
+  python benchmark.py --concurrency 1,4,16 --requests 200 --out bench/HEAD.json
+  python benchmark.py --whisper small --scenarios transcribe,pronunciation --clip-seconds 2,12
+  python benchmark.py --url http://localhost:5000 --scenarios create,get,list
+  python benchmark.py --compare bench/base.json bench/HEAD.json
+"""
+
+import argparse
+import io
+import itertools
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+DEFAULT_SCENARIOS = "transcribe,pronunciation,tts,tts_miss,create,save_result,get,list,complete"
+CRUD_SCENARIOS = {"create", "save_result", "get", "list", "complete"}
+TTS_WORDS = ["cat", "dog", "sun", "map", "pen", "zop", "blick", "trame", "snig", "floop"]
+
+Request = Tuple[str, str, Optional[bytes], Dict[str, str]]
+
+
+# -----------------------------
+# Fixtures
+# -----------------------------
+
+def synthetic_wav(seconds: float, seed: int = 0) -> bytes:
+    """Mono 16-bit WAV of speech-like tone bursts (~300 ms) and short pauses"""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    audio = np.zeros(n, dtype=np.float32)
+    pos = int(0.2 * SAMPLE_RATE)
+    while pos < n:
+        length = min(int(rng.uniform(0.2, 0.4) * SAMPLE_RATE), n - pos)
+        t = np.arange(length) / SAMPLE_RATE
+        f0 = rng.uniform(110, 220)
+        burst = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in (1, 2, 3))
+        audio[pos:pos + length] = 0.3 * burst * np.hanning(length)
+        pos += length + int(rng.uniform(0.08, 0.3) * SAMPLE_RATE)
+    audio += 0.003 * rng.standard_normal(n).astype(np.float32)
+    pcm = (np.clip(audio, -1, 1) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def unique_clip(wav: bytes, n: int) -> bytes:
+    """``wav`` with its last three samples set to the bytes of ``n``: inaudible, but a new cache key"""
+    data = bytearray(wav)
+    data[-6:] = np.array([(n >> shift) & 0xFF for shift in (0, 8, 16)], dtype="<i2").tobytes()
+    return bytes(data)
+
+
+def multipart(fields: Dict[str, str], files: Dict[str, Tuple[str, bytes, str]]) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, data, content_type) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode() + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+# -----------------------------
+# Stub backends (in-process runs)
+# -----------------------------
+
+class StubWhisper:
+    """Batch handlers that cost ``batch_ms + item_ms * len(batch)`` of sleep"""
+
+    def __init__(self, batch_ms: float = 40.0, item_ms: float = 10.0):
+        self.batch_ms = batch_ms
+        self.item_ms = item_ms
+
+    def _sleep(self, n: int):
+        time.sleep((self.batch_ms + self.item_ms * n) / 1000.0)
+
+    def transcribe_batch(self, model, payloads: List[Any]) -> List[Dict[str, Any]]:
+        self._sleep(len(payloads))
+        return [{"text": " the cat sat on the mat", "language": "en", "avg_logprob": -0.2,
+                 "no_speech_prob": 0.01} for _ in payloads]
+
+    def pronunciation_batch(self, model, payloads: List[Any]) -> List[Dict[str, Any]]:
+        self._sleep(len(payloads))
+        return [{"score": 1, "best": target, "confidence": 0.9, "no_speech_prob": 0.01,
+                 "candidates": {target: 0.9}, "target_logprob": -0.3, "below_floor": False}
+                for _, target, *_ in payloads]
+
+
+def stub_tts_renderer(render_ms: float):
+    silence = synthetic_wav(0.5)
+
+    def render(text, rate=None, volume=None, voice=None):
+        time.sleep(render_ms / 1000.0)
+        return silence
+    return render
+
+
+class _SerializedCursor:
+    """mongomock cursor whose evaluation happens under the database lock"""
+
+    def __init__(self, cursor, lock):
+        self._cursor = cursor
+        self._lock = lock
+
+    def __getattr__(self, name):
+        method = getattr(self._cursor, name)
+
+        def chained(*a, **kw):
+            with self._lock:
+                result = method(*a, **kw)
+            return _SerializedCursor(result, self._lock) if result is self._cursor else result
+        return chained
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._cursor))
+
+
+class _SerializedCollection:
+    """mongomock is not thread-safe; run every collection call under one lock"""
+
+    def __init__(self, collection, lock):
+        self._collection = collection
+        self._lock = lock
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+        if not callable(method):
+            return method
+
+        def call(*a, **kw):
+            with self._lock:
+                result = method(*a, **kw)
+            return _SerializedCursor(result, self._lock) if name == "find" else result
+        return call
+
+
+class _SerializedDatabase:
+    def __init__(self, database):
+        self._database = database
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name):
+        return _SerializedCollection(getattr(self._database, name), self._lock)
+
+    __getitem__ = __getattr__
+
+
+def setup_inprocess(args) -> str:
+    """Configure app.py with the requested backends and serve it on a free port"""
+    import app as backend
+    from inference import InferenceScheduler
+    from tts_cache import TTSCache
+    from werkzeug.serving import make_server
+
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        # A scratch database on a real server, dropped and re-indexed per run
+        client = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=3000)
+        client.drop_database("dyscover_bench")
+        backend.db = client["dyscover_bench"]
+    else:
+        import mongomock
+        backend.db = _SerializedDatabase(mongomock.MongoClient()[backend.settings.mongo_db])
+    backend.ensure_indexes()
+
+    if backend.local_store is not None:
+        from local_store import LocalStore, Syncer
+        # A scratch store replayed into the benchmark database, never the repo's shared one
+        backend.local_store = LocalStore(os.path.join(tempfile.mkdtemp(prefix="bench_store_"), "writes.db"))
+        backend.store_syncer = Syncer(backend.local_store, lambda: backend.db,
+                                      backend.settings.sync_batch_size, backend.settings.sync_interval)
+        backend.store_syncer.start()
+
+    if args.whisper == "stub":
+        stub = StubWhisper(args.stub_batch_ms, args.stub_item_ms)
+        scheduler = InferenceScheduler(None, backend.settings.max_batch_size, backend.settings.max_batch_wait_ms)
+        scheduler.register("transcribe", stub.transcribe_batch)
+        scheduler.register("pronunciation", stub.pronunciation_batch)
+    else:
+        from model_loader import load_whisper
+        from pronunciation import score_pronunciation_batch
+
+        started = time.perf_counter()
+        model = load_whisper(args.whisper, device=args.device)
+        print(f"Loaded Whisper {args.whisper} in {time.perf_counter() - started:.1f}s")
+        backend.whisper_model = model
+        scheduler = InferenceScheduler(model, backend.settings.max_batch_size, backend.settings.max_batch_wait_ms)
+        scheduler.register("pronunciation", score_pronunciation_batch)
+    scheduler.start()
+    backend.inference_scheduler = scheduler
+    backend.model_status = "ready"
+    if not args.transcript_cache:
+        # Measure inference, not the cache's hashing and bookkeeping
+        backend.transcript_cache = None
+
+    if args.tts == "stub":
+        backend.tts_cache = TTSCache(directory=tempfile.mkdtemp(prefix="bench_tts_"),
+                                     renderer=stub_tts_renderer(args.stub_tts_ms))
+        # The route checks for pyttsx3 before rendering a miss
+        backend.import_pyttsx3 = lambda: True
+    elif backend.tts_pool is not None:
+        backend.tts_pool.start()
+
+    server = make_server("127.0.0.1", 0, backend.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="bench-server", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+# -----------------------------
+# Scenarios
+# -----------------------------
+
+def call(base: str, method: str, path: str, body: Optional[bytes] = None,
+         headers: Optional[Dict[str, str]] = None, timeout: float = 300.0) -> Tuple[int, bytes]:
+    url = urlsplit(base)
+    conn = HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def seed_assessments(base: str, n: int) -> List[str]:
+    ids = []
+    for i in range(n):
+        status, body = call(base, "POST", "/api/assessments",
+                            json.dumps({"ageGroup": "6-8"}).encode(), {"Content-Type": "application/json"})
+        if status != 200:
+            raise RuntimeError(f"Could not seed assessments (HTTP {status}): {body[:200]!r}")
+        ids.append(json.loads(body)["assessmentId"])
+    return ids
+
+
+def build_scenarios(base: str, args) -> Dict[str, Callable[[int], Request]]:
+    clips = [synthetic_wav(s, seed=i) for i, s in enumerate(args.clip_seconds)]
+    word_clip = synthetic_wav(0.8, seed=99)
+    ids: List[str] = []
+    selected = set(args.scenarios)
+    if selected & (CRUD_SCENARIOS - {"create"}):
+        ids = seed_assessments(base, args.seed_assessments)
+    json_headers = {"Content-Type": "application/json"}
+    run_id = uuid.uuid4().hex[:8]
+    # Every upload differs, so the transcript cache (keyed by the bytes) never answers
+    uploads = itertools.count(int(run_id, 16))
+
+    def transcribe(i):
+        clip = unique_clip(clips[i % len(clips)], next(uploads))
+        body, content_type = multipart({}, {"audio": ("clip.wav", clip, "audio/wav")})
+        return "POST", "/transcribe", body, {"Content-Type": content_type}
+
+    def pronunciation(i):
+        word = TTS_WORDS[i % len(TTS_WORDS)]
+        clip = unique_clip(word_clip, next(uploads))
+        body, content_type = multipart({"target": word}, {"audio": ("word.wav", clip, "audio/wav")})
+        return "POST", "/check_pronunciation", body, {"Content-Type": content_type}
+
+    def tts(i):
+        return "GET", f"/tts_offline?text={quote(TTS_WORDS[i % len(TTS_WORDS)])}", None, {}
+
+    if "tts" in selected:
+        # Measure the cached path: every prompt is rendered once up front
+        for word in TTS_WORDS:
+            call(base, *tts(TTS_WORDS.index(word)))
+    misses = itertools.count()
+
+    def tts_miss(i):
+        # Never repeats, even across concurrency levels
+        return "GET", f"/tts_offline?text={quote(f'word {run_id} {next(misses)}')}", None, {}
+
+    def create(i):
+        return "POST", "/api/assessments", json.dumps({"ageGroup": "6-8"}).encode(), json_headers
+
+    def save_result(i):
+        payload = {"type": "phoneme", "payload": {"score": i % 10, "total": 10}}
+        return "POST", f"/api/assessments/{ids[i % len(ids)]}/results", json.dumps(payload).encode(), json_headers
+
+    def get(i):
+        return "GET", f"/api/assessments/{ids[i % len(ids)]}", None, {}
+
+    def list_(i):
+        return "GET", "/api/assessments?limit=20", None, {}
+
+    def complete(i):
+        return "POST", f"/api/assessments/{ids[i % len(ids)]}/complete", None, {}
+
+    scenarios = {
+        "transcribe": transcribe, "pronunciation": pronunciation, "tts": tts, "tts_miss": tts_miss,
+        "create": create, "save_result": save_result, "get": get, "list": list_, "complete": complete,
+    }
+    return {name: scenarios[name] for name in args.scenarios}
+
+
+# -----------------------------
+# Runner
+# -----------------------------
+
+def percentile(sorted_ms: List[float], q: float) -> Optional[float]:
+    if not sorted_ms:
+        return None
+    return round(float(np.percentile(sorted_ms, q)), 3)
+
+
+def run_level(base: str, make_request: Callable[[int], Request], concurrency: int, requests: int,
+              warmup: int) -> Dict[str, Any]:
+    for i in range(warmup):
+        call(base, *make_request(i))
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    lock = threading.Lock()
+    counter = iter(range(warmup, warmup + requests))
+
+    def client():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            method, path, body, headers = make_request(i)
+            started = time.perf_counter()
+            try:
+                status, _ = call(base, method, path, body, headers)
+                key = str(status)
+            except Exception as e:
+                key = type(e).__name__
+            elapsed = (time.perf_counter() - started) * 1000.0
+            with lock:
+                latencies.append(elapsed)
+                statuses[key] = statuses.get(key, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(n for status, n in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "status": statuses,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "mean_ms": round(float(np.mean(latencies)), 3) if latencies else None,
+        "max_ms": round(latencies[-1], 3) if latencies else None,
+        "throughput_rps": round(len(latencies) / wall, 3) if wall > 0 else None,
+        "wall_s": round(wall, 3),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def environment(args) -> Dict[str, Any]:
+    env = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "target": args.url or "in-process",
+        "whisper": None if args.url else args.whisper,
+        "tts": None if args.url else args.tts,
+        "database": None if args.url else ("mongodb" if args.mongo_uri else "mongomock"),
+        "clip_seconds": args.clip_seconds,
+    }
+    if not args.url and args.whisper != "stub":
+        import torch
+        env["torch"] = torch.__version__
+        env["torch_threads"] = torch.get_num_threads()
+        env["device"] = args.device or ("cuda" if torch.cuda.is_available() else "cpu")
+    return env
+
+
+def compare(base_path: str, head_path: str, threshold: float) -> int:
+    """Print per-scenario deltas; non-zero exit if any p95/throughput regressed"""
+    with open(base_path, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(head_path, encoding="utf-8") as f:
+        head = json.load(f)
+    index = {(r["scenario"], r["concurrency"]): r for r in base["results"]}
+    regressed = 0
+    print(f"{'scenario':<14}{'conc':>5}{'p50 ms':>18}{'p95 ms':>18}{'rps':>18}")
+    for r in head["results"]:
+        old = index.get((r["scenario"], r["concurrency"]))
+        if old is None:
+            continue
+
+        def delta(key, higher_is_better=False):
+            nonlocal regressed
+            a, b = old.get(key), r.get(key)
+            if not a or b is None:
+                return f"{'n/a':>18}"
+            change = (b - a) / a
+            worse = change < -threshold if higher_is_better else change > threshold
+            if worse and key != "p50_ms":
+                regressed += 1
+            return f"{b:>9.1f} ({change:+.0%}){'!' if worse else ' '}"
+
+        print(f"{r['scenario']:<14}{r['concurrency']:>5}{delta('p50_ms')}{delta('p95_ms')}"
+              f"{delta('throughput_rps', higher_is_better=True)}")
+    print(f"{base.get('environment', {}).get('commit')} -> {head.get('environment', {}).get('commit')}: "
+          f"{regressed} regression(s) beyond {threshold:.0%}")
+    return 1 if regressed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the backend hot paths")
+    parser.add_argument('--url', type=str, help='Benchmark a running server instead of an in-process app')
+    parser.add_argument('--scenarios', type=lambda s: [x for x in s.split(',') if x], default=DEFAULT_SCENARIOS.split(','))
+    parser.add_argument('--concurrency', type=lambda s: [int(x) for x in s.split(',')], default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=100, help='Requests per scenario and concurrency level')
+    parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests before each level')
+    parser.add_argument('--clip-seconds', type=lambda s: [float(x) for x in s.split(',')], default=[3.0, 10.0],
+                        help='Synthetic clip lengths for /transcribe (cycled)')
+    parser.add_argument('--whisper', type=str, default='stub', help='stub, or a Whisper model name (tiny/base/small/medium)')
+    parser.add_argument('--device', type=str, default=None, help='Device for a real Whisper model')
+    parser.add_argument('--stub-batch-ms', type=float, default=40.0, help='Stub Whisper cost per batch')
+    parser.add_argument('--stub-item-ms', type=float, default=10.0, help='Stub Whisper cost per clip in a batch')
+    parser.add_argument('--tts', choices=['stub', 'real'], default='stub')
+    parser.add_argument('--transcript-cache', action='store_true',
+                        help='Keep the in-process transcript cache (uploads are unique, so it only adds its overhead)')
+    parser.add_argument('--stub-tts-ms', type=float, default=150.0, help='Stub TTS render time')
+    parser.add_argument('--mongo-uri', type=str, help='Use a scratch database on this MongoDB server instead of mongomock')
+    parser.add_argument('--seed-assessments', type=int, default=200, help='Assessments created for CRUD scenarios')
+    parser.add_argument('--out', type=str, help='Write JSON results here (default: stdout only)')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'HEAD'), help='Compare two result files and exit')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Relative change counted as a regression')
+    args = parser.parse_args()
+
+    if args.compare:
+        return compare(*args.compare, args.threshold)
+
+    unknown = set(args.scenarios) - set(DEFAULT_SCENARIOS.split(','))
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # Per-request route logging would dominate the measurements
+    logging.disable(logging.INFO)
+    base = args.url.rstrip('/') if args.url else setup_inprocess(args)
+    scenarios = build_scenarios(base, args)
+
+    results = []
+    for name, make_request in scenarios.items():
+        for concurrency in args.concurrency:
+            row = dict(scenario=name, **run_level(base, make_request, concurrency, args.requests, args.warmup))
+            results.append(row)
+            print(f"{name:<14} c={concurrency:<3} p50={row['p50_ms']}ms p95={row['p95_ms']}ms "
+                  f"p99={row['p99_ms']}ms rps={row['throughput_rps']} errors={row['errors']}")
+
+    report = {"environment": environment(args), "results": results}
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results written to {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
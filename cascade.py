@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Confidence cascade: decode with a small Whisper first, escalate to the large one.
+
+``CascadeScheduler`` wraps two ``InferenceScheduler``s, one per model, and
+offers the same ``submit``/``wait``/``transcribe`` interface, so the routes
+don't know whether they talk to one model or two. Every job goes to the small
+model; its result is accepted unless it is uncertain, in which case the same
+payload is re-run on the large model and that answer is returned instead.
+
+A result is uncertain when
+
+- transcripts (``transcribe``, ``words``): Whisper's ``avg_logprob`` is below
+  ``min_logprob`` or its ``no_speech_prob`` is above ``max_no_speech``
+- pronunciation scores: the target's posterior is within ``margin`` of the
+  clip's pass threshold (a borderline 0/1 decision), or ``no_speech_prob``
+  is above ``max_no_speech``
+
+Both schedulers keep their own thread and batches, so escalated clips batch
+with each other on the large model while clear answers never touch it.
+When the large model cannot take a job (full queue, stopped scheduler) the
+small model's answer is kept. Results carry ``model`` and ``escalated``;
+escalations, and how often the two models disagreed on an escalated clip
+(different normalised transcript or different pronunciation score), are
+counted per kind for /metrics.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from inference import INTERACTIVE, LANES, InferenceScheduler, QueueFull
+from metrics import Counter
+from reading import normalize_words
+
+logger = logging.getLogger(__name__)
+
+MIN_LOGPROB = -0.5
+MAX_NO_SPEECH = 0.4
+CONFIDENCE_MARGIN = 0.2
+
+CASCADE_CLIPS = Counter("dyscover_cascade_clips_total",
+                        "Cascade decisions per job: accepted from the small model, escalated, "
+                        "or kept because the large model's queue was full", ["kind", "decision"])
+CASCADE_DISAGREEMENTS = Counter("dyscover_cascade_disagreements_total",
+                                "Escalated jobs where the large model's answer differed", ["kind"])
+
+
+def uncertain(kind: str, payload: Any, result: Dict[str, Any], min_logprob: float = MIN_LOGPROB,
+              max_no_speech: float = MAX_NO_SPEECH, margin: float = CONFIDENCE_MARGIN) -> bool:
+    """True when the small model's ``result`` should be re-decoded by the large model"""
+    no_speech = result.get("no_speech_prob")
+    if no_speech is not None and no_speech > max_no_speech:
+        return True
+    if kind == "pronunciation":
+        min_confidence = payload[3]
+        return abs(result["confidence"] - min_confidence) < margin
+    logprob = result.get("avg_logprob")
+    return logprob is None or logprob < min_logprob
+
+
+def disagree(kind: str, first: Dict[str, Any], second: Dict[str, Any]) -> bool:
+    if kind == "pronunciation":
+        return first.get("score") != second.get("score")
+    return normalize_words(first.get("text", "")) != normalize_words(second.get("text", ""))
+
+
+class CascadeScheduler:
+    """Two-model drop-in for InferenceScheduler (small first, large on low confidence)"""
+
+    def __init__(self, first: InferenceScheduler, second: InferenceScheduler, names=("small", "medium"),
+                 min_logprob: float = MIN_LOGPROB, max_no_speech: float = MAX_NO_SPEECH,
+                 margin: float = CONFIDENCE_MARGIN):
+        self.first = first
+        self.second = second
+        self.names = names
+        self.min_logprob = min_logprob
+        self.max_no_speech = max_no_speech
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    wait = staticmethod(InferenceScheduler.wait)
+
+    @property
+    def model(self):
+        return self.second.model
+
+    def register(self, kind: str, handler):
+        self.first.register(kind, handler)
+        self.second.register(kind, handler)
+
+    def start(self):
+        self.first.start()
+        self.second.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self.first.stop(timeout)
+        self.second.stop(timeout)
+
+    @property
+    def queue_depth(self) -> int:
+        return self.first.queue_depth + self.second.queue_depth
+
+    def lane_depths(self) -> Dict[str, int]:
+        first, second = self.first.lane_depths(), self.second.lane_depths()
+        return {lane: first[lane] + second[lane] for lane in LANES}
+
+    def retry_after(self, lane: str = INTERACTIVE) -> int:
+        return self.first.retry_after(lane)
+
+    def _count(self, kind: str, key: str):
+        with self._lock:
+            counts = self._counts.setdefault(kind, {"clips": 0, "escalated": 0, "disagreed": 0})
+            counts[key] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per kind: clips, escalations, disagreements and their rates"""
+        with self._lock:
+            out = {}
+            for kind, c in self._counts.items():
+                out[kind] = {
+                    **c,
+                    "escalation_rate": round(c["escalated"] / c["clips"], 4) if c["clips"] else None,
+                    "disagreement_rate": round(c["disagreed"] / c["escalated"], 4) if c["escalated"] else None,
+                }
+            return out
+
+    def submit(self, kind: str, payload: Any, lane: str = INTERACTIVE) -> Future:
+        """Queue a job on the small model; the Future resolves to the accepted result"""
+        outer: Future = Future()
+        inner = self.first.submit(kind, payload, lane)
+        stages = [inner]
+
+        def cancel_stages(future: Future):
+            # A caller that gives up cancels whichever stage is still queued
+            if future.cancelled():
+                for stage in stages:
+                    stage.cancel()
+
+        outer.add_done_callback(cancel_stages)
+
+        def settle(future: Future, result_of: str, first_result: Optional[Dict[str, Any]] = None):
+            if future.cancelled():
+                outer.cancel()
+                return
+            try:
+                error = future.exception()
+                if error is not None:
+                    outer.set_exception(error)
+                    return
+                result = dict(future.result(), model=result_of, escalated=first_result is not None)
+                if first_result is not None and disagree(kind, first_result, result):
+                    CASCADE_DISAGREEMENTS.inc(kind=kind)
+                    self._count(kind, "disagreed")
+                outer.set_result(result)
+            except InvalidStateError:
+                # The caller cancelled while this stage was running
+                pass
+
+        def first_done(future: Future):
+            if future.cancelled() or future.exception() is not None or outer.done():
+                settle(future, self.names[0])
+                return
+            result = future.result()
+            self._count(kind, "clips")
+            if not uncertain(kind, payload, result, self.min_logprob, self.max_no_speech, self.margin):
+                CASCADE_CLIPS.inc(kind=kind, decision="accepted")
+                settle(future, self.names[0])
+                return
+            try:
+                second = self.second.submit(kind, payload, lane)
+            except QueueFull:
+                # Better the small model's answer now than a 429
+                CASCADE_CLIPS.inc(kind=kind, decision="kept")
+                settle(future, self.names[0])
+                return
+            except Exception as e:
+                # Stopped scheduler or bad payload: an exception raised in this
+                # done-callback would be swallowed and leave ``outer`` pending
+                logger.error(f"Cascade escalation of {kind} failed, keeping the small model's answer: {e}")
+                CASCADE_CLIPS.inc(kind=kind, decision="kept")
+                settle(future, self.names[0])
+                return
+            CASCADE_CLIPS.inc(kind=kind, decision="escalated")
+            self._count(kind, "escalated")
+            stages.append(second)
+            second.add_done_callback(lambda f: settle(f, self.names[1], result))
+
+        inner.add_done_callback(first_done)
+        return outer
+
+    def transcribe(self, audio: np.ndarray, timeout: Optional[float] = None, lane: str = INTERACTIVE,
+                   **options) -> Dict[str, Any]:
+        """Blocking helper: transcribe a 16 kHz float32 clip"""
+        audio = np.asarray(audio, dtype=np.float32)
+        return self.wait(self.submit("transcribe", (audio, options), lane), timeout)
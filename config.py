@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Backend configuration.
+
+One ``Settings`` object describes a deployment: which Whisper model it serves,
+on which device and compute dtype, how many CPU threads torch may use, the
+batching limits, and which feature modules (storage, risk, transcribe,
+pronunciation, tts, metrics, jobs) are mounted. ``app.create_app(settings)`` builds
+the server from it, so a kiosk and a central server run the same code with
+different settings instead of different scripts.
+
+Values are resolved in order: dataclass defaults < profile < environment
+variables < explicit overrides. Profiles (``DYSCOVER_PROFILE``):
+
+- central: Whisper medium, every feature (the default; what app.py served)
+- kiosk:   Whisper small on CPU, audio + TTS only, small batches
+- lite:    Whisper small, GPU when available, /transcribe only (what app1.py served)
+
+``compute_dtype`` int8 serves a dynamically quantized model on CPU (see
+model_loader.quantize_int8), e.g. ``DYSCOVER_PROFILE=kiosk WHISPER_COMPUTE_DTYPE=int8``.
+``cascade_model`` puts a smaller model in front of ``whisper_model`` (see
+cascade.py), e.g. ``WHISPER_CASCADE_MODEL=small`` on the central profile.
+"""
+
+import os
+from dataclasses import dataclass, field, fields, replace
+from typing import Any, Dict, FrozenSet, Optional
+
+FEATURES = frozenset({"storage", "risk", "transcribe", "pronunciation", "tts", "metrics", "jobs"})
+DEVICES = ("auto", "cpu", "cuda")
+COMPUTE_DTYPES = ("auto", "fp32", "fp16", "int8")
+TRANSCRIPT_CACHE_TIERS = ("off", "memory", "disk", "mongo")
+
+# Optional[str] settings: an empty environment variable means "unset"
+OPTIONAL_FIELDS = (
+    "mmap_cache", "cascade_model", "job_store", "transcript_cache_dir", "tts_cache_dir",
+    "xgb_model_path", "xgb_label_encoder_path", "local_store_path",
+)
+
+
+@dataclass(frozen=True)
+class Settings:
+    profile: str = "central"
+
+    # Whisper model
+    whisper_model: str = "medium"
+    device: str = "auto"
+    compute_dtype: str = "auto"
+    mmap_cache: Optional[str] = None
+    warmup: bool = True
+
+    # Confidence cascade (cascade.py): decode with cascade_model first and
+    # re-run uncertain clips on whisper_model; None serves whisper_model only
+    cascade_model: Optional[str] = None
+    cascade_min_logprob: float = -0.5
+    cascade_max_no_speech: float = 0.4
+    cascade_margin: float = 0.2
+
+    # CPU threading (0 = leave torch's default)
+    torch_threads: int = 0
+    interop_threads: int = 0
+
+    # Micro-batching
+    max_batch_size: int = 8
+    max_batch_wait_ms: float = 15.0
+    request_timeout: float = 300.0
+
+    # Priority lanes: speech up to interactive_max_seconds goes ahead of
+    # longer reads; each scheduler lane holds at most max_queue_depth jobs
+    # (0 = unbounded) before requests get 429
+    interactive_max_seconds: float = 10.0
+    max_queue_depth: int = 64
+
+    # Asynchronous job API (/api/jobs): runner threads and queued jobs per lane
+    job_workers: int = 2
+    job_max_queued: int = 256
+    job_ttl: int = 600
+    # SQLite file mirroring job states so any worker process can answer a
+    # poll (serve.py sets one when it runs several workers); None = in-memory
+    job_store: Optional[str] = None
+
+    # Energy VAD before inference (trim silence, reject silent clips)
+    vad: bool = True
+
+    # Audio-route results keyed by audio content (transcript_cache.py); the
+    # disk tier lives in transcript_cache_dir (None = .transcript_cache)
+    transcript_cache: str = "memory"
+    transcript_cache_entries: int = 2048
+    transcript_cache_ttl: int = 86400
+    transcript_cache_dir: Optional[str] = None
+    transcript_cache_disk_mb: int = 64
+
+    # Pronunciation fast path
+    pronunciation_fast_path: bool = True
+    pronunciation_min_confidence: float = 0.5
+    # Mean per-token log-probability the target itself must reach (pronunciation.py)
+    pronunciation_min_logprob: float = -1.0
+
+    # TTS (tts_cache_dir None = .tts_cache)
+    tts_workers: int = 2
+    tts_timeout: float = 30.0
+    tts_cache_max_age: int = 86400
+    tts_cache_dir: Optional[str] = None
+    tts_cache_disk_mb: int = 256
+    tts_cache_memory_mb: int = 32
+
+    # Storage / risk
+    mongo_uri: str = "mongodb://localhost:27017"
+    mongo_db: str = "dyscover"
+    risk_batch_size: int = 5000
+    bulk_max_items: int = 1000
+    export_batch_size: int = 5000
+    rollup_batch_size: int = 5000
+    # None = analysis/xgb_medium_*, then the original analysis/xgb_model.json
+    xgb_model_path: Optional[str] = None
+    xgb_label_encoder_path: Optional[str] = None
+
+    # Offline-first storage writes (local_store.py): commit to a local SQLite
+    # file and replay to Mongo in the background, sync_batch_size ops at a time
+    local_store: bool = True
+    local_store_path: Optional[str] = None
+    sync_batch_size: int = 500
+    sync_interval: float = 2.0
+
+    features: FrozenSet[str] = field(default_factory=lambda: FEATURES)
+
+    host: str = "0.0.0.0"
+    port: int = 5000
+
+    def enabled(self, feature: str) -> bool:
+        return feature in self.features
+
+    @property
+    def needs_whisper(self) -> bool:
+        return bool(self.features & {"transcribe", "pronunciation"})
+
+    def resolved_device(self) -> str:
+        if self.device != "auto":
+            return self.device
+        if self.compute_dtype == "int8":
+            # Dynamic int8 quantization only has CPU kernels
+            return "cpu"
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+
+    def describe(self) -> Dict[str, Any]:
+        """JSON-friendly view for /health and logs (no credentials)"""
+        return {
+            "profile": self.profile,
+            "whisper_model": self.whisper_model,
+            "device": self.device,
+            "compute_dtype": self.compute_dtype,
+            "cascade_model": self.cascade_model,
+            "torch_threads": self.torch_threads or None,
+            "max_batch_size": self.max_batch_size,
+            "features": sorted(self.features),
+        }
+
+
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "central": {},
+    "kiosk": {
+        "whisper_model": "small",
+        "device": "cpu",
+        "max_batch_size": 4,
+        "tts_workers": 1,
+        "transcript_cache": "disk",
+        "features": frozenset({"transcribe", "pronunciation", "tts", "metrics", "jobs"}),
+    },
+    "lite": {
+        "whisper_model": "small",
+        "features": frozenset({"transcribe"}),
+    },
+}
+
+# Settings field -> environment variable
+ENV_VARS = {
+    "whisper_model": "WHISPER_MODEL",
+    "device": "WHISPER_DEVICE",
+    "compute_dtype": "WHISPER_COMPUTE_DTYPE",
+    "mmap_cache": "WHISPER_MMAP_CACHE",
+    "warmup": "WHISPER_WARMUP",
+    "cascade_model": "WHISPER_CASCADE_MODEL",
+    "cascade_min_logprob": "CASCADE_MIN_LOGPROB",
+    "cascade_max_no_speech": "CASCADE_MAX_NO_SPEECH",
+    "cascade_margin": "CASCADE_MARGIN",
+    "torch_threads": "TORCH_THREADS",
+    "interop_threads": "TORCH_INTEROP_THREADS",
+    "max_batch_size": "WHISPER_MAX_BATCH_SIZE",
+    "max_batch_wait_ms": "WHISPER_MAX_BATCH_WAIT_MS",
+    "request_timeout": "WHISPER_REQUEST_TIMEOUT",
+    "interactive_max_seconds": "WHISPER_INTERACTIVE_MAX_SECONDS",
+    "max_queue_depth": "WHISPER_MAX_QUEUE_DEPTH",
+    "job_workers": "JOB_WORKERS",
+    "job_max_queued": "JOB_MAX_QUEUED",
+    "job_ttl": "JOB_TTL",
+    "job_store": "JOB_STORE",
+    "vad": "WHISPER_VAD",
+    "transcript_cache": "TRANSCRIPT_CACHE",
+    "transcript_cache_entries": "TRANSCRIPT_CACHE_ENTRIES",
+    "transcript_cache_ttl": "TRANSCRIPT_CACHE_TTL",
+    "transcript_cache_dir": "TRANSCRIPT_CACHE_DIR",
+    "transcript_cache_disk_mb": "TRANSCRIPT_CACHE_DISK_MB",
+    "pronunciation_fast_path": "PRONUNCIATION_FAST_PATH",
+    "pronunciation_min_confidence": "PRONUNCIATION_MIN_CONFIDENCE",
+    "pronunciation_min_logprob": "PRONUNCIATION_MIN_LOGPROB",
+    "tts_workers": "TTS_WORKERS",
+    "tts_timeout": "TTS_TIMEOUT",
+    "tts_cache_max_age": "TTS_CACHE_MAX_AGE",
+    "tts_cache_dir": "TTS_CACHE_DIR",
+    "tts_cache_disk_mb": "TTS_CACHE_DISK_MB",
+    "tts_cache_memory_mb": "TTS_CACHE_MEMORY_MB",
+    "mongo_uri": "MONGO_URI",
+    "mongo_db": "MONGO_DB",
+    "risk_batch_size": "RISK_BATCH_SIZE",
+    "bulk_max_items": "BULK_MAX_ITEMS",
+    "export_batch_size": "EXPORT_BATCH_SIZE",
+    "rollup_batch_size": "ROLLUP_BATCH_SIZE",
+    "xgb_model_path": "XGB_MODEL_PATH",
+    "xgb_label_encoder_path": "XGB_LABEL_ENCODER_PATH",
+    "local_store": "LOCAL_STORE",
+    "local_store_path": "LOCAL_STORE_PATH",
+    "sync_batch_size": "SYNC_BATCH_SIZE",
+    "sync_interval": "SYNC_INTERVAL",
+    "features": "DYSCOVER_FEATURES",
+    "host": "HOST",
+    "port": "PORT",
+}
+
+
+def _parse(name: str, raw: Any, current: Any) -> Any:
+    if not isinstance(raw, str):
+        return frozenset(raw) if name == "features" else raw
+    raw = raw.strip()
+    if name == "features":
+        if raw in ("", "all"):
+            return FEATURES
+        return frozenset(f.strip() for f in raw.split(",") if f.strip())
+    if isinstance(current, bool):
+        return raw.lower() in ("1", "true", "yes", "on")
+    if isinstance(current, int):
+        return int(raw)
+    if isinstance(current, float):
+        return float(raw)
+    if name in OPTIONAL_FIELDS:
+        return raw or None
+    return raw
+
+
+def validate(settings: Settings) -> Settings:
+    unknown = settings.features - FEATURES
+    if unknown:
+        raise ValueError(f"Unknown features: {', '.join(sorted(unknown))} (choose from {', '.join(sorted(FEATURES))})")
+    if settings.device not in DEVICES:
+        raise ValueError(f"device must be one of {DEVICES}")
+    if settings.compute_dtype not in COMPUTE_DTYPES:
+        raise ValueError(f"compute_dtype must be one of {COMPUTE_DTYPES}")
+    if settings.compute_dtype == "int8" and settings.device == "cuda":
+        raise ValueError("compute_dtype int8 is CPU only (use device cpu or auto)")
+    if settings.transcript_cache not in TRANSCRIPT_CACHE_TIERS:
+        raise ValueError(f"transcript_cache must be one of {TRANSCRIPT_CACHE_TIERS}")
+    if settings.cascade_model is not None and settings.cascade_model == settings.whisper_model:
+        raise ValueError("cascade_model must differ from whisper_model (the model clips escalate to)")
+    if settings.max_batch_size < 1:
+        raise ValueError("max_batch_size must be >= 1")
+    for name in ("export_batch_size", "rollup_batch_size"):
+        if getattr(settings, name) < 1:
+            raise ValueError(f"{name} must be >= 1")
+    for name in ("transcript_cache_disk_mb", "tts_cache_disk_mb", "tts_cache_memory_mb"):
+        if getattr(settings, name) < 0:
+            raise ValueError(f"{name} must be >= 0")
+    return settings
+
+
+def load_settings(profile: Optional[str] = None, env: Optional[Dict[str, str]] = None, **overrides) -> Settings:
+    """Build Settings from a profile, the environment and keyword overrides"""
+    env = os.environ if env is None else env
+    profile = profile or env.get("DYSCOVER_PROFILE") or "central"
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile '{profile}' (choose from {', '.join(PROFILES)})")
+
+    settings = replace(Settings(), profile=profile, **PROFILES[profile])
+    values = {}
+    for f in fields(Settings):
+        var = ENV_VARS.get(f.name)
+        if var and env.get(var) is not None:
+            values[f.name] = _parse(f.name, env[var], getattr(settings, f.name))
+    for name, raw in overrides.items():
+        if raw is not None:
+            values[name] = _parse(name, raw, getattr(settings, name))
+    return validate(replace(settings, **values))
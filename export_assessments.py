@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Stream stored assessments out as a training cohort (CSV or Parquet).
+
+The ``assessments`` collection is read through a projected Mongo cursor in
+batches, each document's ``results.*`` is flattened into the feature columns
+``analysis/xgb.py`` trains on, and every batch is written as one CSV chunk or
+one Parquet row group before the next is fetched, so memory stays constant no
+matter how many assessments are exported.
+
+Columns: patient_id, the FEATURE_COLUMNS from risk_model.py, dyslexia_risk
+(the clinician-confirmed label stored as ``confirmedRisk``, empty when not
+recorded), predicted_risk, ageGroup, startedAt, completedAt.
+
+Usage:
+  python export_assessments.py --out cohort.csv
+  python export_assessments.py --format parquet --out cohort.parquet --completed-only
+  python export_assessments.py --out new.csv --since 2025-01-01 --labelled-only
+"""
+
+import argparse
+import csv
+import io
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from risk_model import FEATURE_COLUMNS, FEATURE_PROJECTION, assessment_features
+
+EXPORT_BATCH_SIZE = 5000
+
+EXPORT_COLUMNS = (
+    ["patient_id"] + FEATURE_COLUMNS
+    + ["dyslexia_risk", "predicted_risk", "ageGroup", "startedAt", "completedAt"]
+)
+
+EXPORT_PROJECTION = dict(
+    FEATURE_PROJECTION,
+    confirmedRisk=1, startedAt=1, completedAt=1, **{"risk.level": 1}
+)
+
+
+def export_query(completed_only: bool = False, since: Optional[datetime] = None,
+                 labelled_only: bool = False) -> Dict[str, Any]:
+    """Mongo filter for an export; ``since`` applies to completedAt"""
+    query: Dict[str, Any] = {}
+    if completed_only or since is not None:
+        query["completedAt"] = {"$ne": None}
+        if since is not None:
+            query["completedAt"]["$gt"] = since
+    if labelled_only:
+        query["confirmedRisk"] = {"$nin": [None, ""]}
+    return query
+
+
+def flatten(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """One export row for an assessment document"""
+    row = {"patient_id": str(doc["_id"])}
+    for col, value in zip(FEATURE_COLUMNS, assessment_features(doc)):
+        row[col] = None if value != value else round(value, 4)
+    row["dyslexia_risk"] = doc.get("confirmedRisk") or None
+    row["predicted_risk"] = (doc.get("risk") or {}).get("level")
+    row["ageGroup"] = doc.get("ageGroup")
+    for field in ("startedAt", "completedAt"):
+        value = doc.get(field)
+        row[field] = value.isoformat() if isinstance(value, datetime) else None
+    return row
+
+
+def iter_batches(collection, query: Dict[str, Any], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Yield lists of flattened rows, ``batch_size`` documents at a time"""
+    cursor = collection.find(query, EXPORT_PROJECTION, batch_size=batch_size).sort("_id", 1)
+    batch = []
+    for doc in cursor:
+        batch.append(flatten(doc))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_csv(batches: Iterator[List[Dict[str, Any]]]) -> Iterator[str]:
+    """CSV text chunks: the header, then one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, lineterminator="\n")
+    writer.writeheader()
+    yield buffer.getvalue()
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    fields = [pa.field("patient_id", pa.string())]
+    fields += [pa.field(col, pa.float64()) for col in FEATURE_COLUMNS]
+    fields += [pa.field(col, pa.string()) for col in EXPORT_COLUMNS[len(FEATURE_COLUMNS) + 1:]]
+    return pa.schema(fields)
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back in chunks"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_parquet(batches: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    """Parquet file bytes, one row group per batch, streamed as they are written"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        for batch in batches:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_to_file(collection, out_path: str, fmt: str = "csv", query: Optional[Dict[str, Any]] = None,
+                   batch_size: int = EXPORT_BATCH_SIZE) -> int:
+    """Write an export to ``out_path``; returns the number of rows written"""
+    count = 0
+
+    def counted():
+        nonlocal count
+        for batch in iter_batches(collection, query or {}, batch_size):
+            count += len(batch)
+            yield batch
+
+    if fmt == "parquet":
+        with open(out_path, "wb") as f:
+            for chunk in iter_parquet(counted()):
+                f.write(chunk)
+    else:
+        with open(out_path, "w", encoding="utf-8", newline="") as f:
+            for chunk in iter_csv(counted()):
+                f.write(chunk)
+    return count
+
+
+def main():
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    from config import load_settings
+
+    load_dotenv()
+    settings = load_settings()
+    parser = argparse.ArgumentParser(description="Export stored assessments as a training cohort")
+    parser.add_argument('--out', type=str, required=True, help='Output file path')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default=None,
+                        help='Output format (default: from the file extension)')
+    parser.add_argument('--completed-only', action='store_true', help='Only completed assessments')
+    parser.add_argument('--labelled-only', action='store_true', help='Only assessments with a confirmed label')
+    parser.add_argument('--since', type=str, help='Only assessments completed after this ISO date')
+    parser.add_argument('--batch-size', type=int, default=settings.export_batch_size, help='Documents per batch/row group')
+    args = parser.parse_args()
+
+    fmt = args.format or ("parquet" if args.out.endswith(".parquet") else "csv")
+    since = datetime.fromisoformat(args.since) if args.since else None
+    client = MongoClient(settings.mongo_uri, serverSelectionTimeoutMS=3000)
+    collection = client[settings.mongo_db].assessments
+    query = export_query(args.completed_only, since, args.labelled_only)
+    count = export_to_file(collection, args.out, fmt, query, args.batch_size)
+    print(f"✅ Exported {count} assessments to {args.out} ({fmt})")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Micro-batching inference scheduler for the shared Whisper model.
+
+Flask request threads never touch the model directly. They submit a job and
+block on a Future while a single worker thread, which owns the model, gathers
+pending jobs into micro-batches (up to ``max_batch_size`` jobs, waiting at most
+``max_wait_ms`` for stragglers) and runs each batch through Whisper's batched
+log-mel / decoder path.
+
+Only one thread drives a given model: Whisper installs kv-cache hooks on the
+decoder while it decodes, so two concurrent decodes on the same module would
+corrupt each other. Throughput comes from batching instead, which lets torch
+spread one larger forward pass over all CPU cores.
+
+Jobs are queued in priority lanes: short interactive clips (pronunciation
+checks, single words) in ``interactive`` and reading passages in ``bulk``.
+The next batch always comes from the highest non-empty lane, so a phoneme
+test never waits behind the chunks of a long read that arrived first (only
+behind the one batch already running). Each lane may be capped at
+``max_queue_depth`` jobs; ``submit`` then raises ``QueueFull`` with an
+estimated Retry-After instead of letting latency grow without bound.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Whisper works on 16 kHz audio in 30 second windows
+SAMPLE_RATE = 16000
+WINDOW_SAMPLES = 30 * SAMPLE_RATE
+
+# Priority lanes, highest first
+INTERACTIVE, BULK = "interactive", "bulk"
+LANES = (INTERACTIVE, BULK)
+
+BatchHandler = Callable[[Any, List[Any]], List[Any]]
+
+BATCH_SECONDS = Histogram("dyscover_inference_batch_seconds", "Model time per inference batch", ["kind"])
+BATCH_SIZE = Histogram("dyscover_inference_batch_size", "Jobs per inference batch", ["kind"],
+                       buckets=(1, 2, 4, 8, 16, 32, 64))
+QUEUE_WAIT_SECONDS = Histogram("dyscover_inference_queue_wait_seconds",
+                               "Time a job waits in the scheduler queue before its batch starts", ["kind", "lane"])
+
+
+class QueueFull(Exception):
+    """A priority lane is at its queue-depth limit; retry after ``retry_after`` seconds"""
+
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(f"{lane} queue is full, retry in {retry_after}s")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+def model_device(model) -> str:
+    """Return the device type ("cpu"/"cuda") the model weights live on"""
+    try:
+        return next(model.parameters()).device.type
+    except Exception:
+        return "cpu"
+
+
+def use_fp16(model) -> bool:
+    """fp16 decoding per the model's configured ``compute_dtype`` (CUDA only)"""
+    if model_device(model) != "cuda":
+        return False
+    return getattr(model, "compute_dtype", "auto") in ("auto", "fp16")
+
+
+def segment_confidence(segments: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Duration-weighted ``avg_logprob`` and ``no_speech_prob`` over ``model.transcribe`` segments"""
+    weights = [max(s.get("end", 0.0) - s.get("start", 0.0), 1e-3) for s in segments]
+    if not segments:
+        return {}
+    total = sum(weights)
+    return {
+        "avg_logprob": sum(w * s.get("avg_logprob", 0.0) for w, s in zip(weights, segments)) / total,
+        "no_speech_prob": sum(w * s.get("no_speech_prob", 0.0) for w, s in zip(weights, segments)) / total,
+    }
+
+
+def transcribe_batch(model, payloads: List[Any]) -> List[Dict[str, Any]]:
+    """Transcribe a batch of (audio, options) payloads.
+
+    Clips that fit in one 30 s window are padded, stacked into a single
+    (batch, n_mels, frames) mel tensor and decoded together. Longer clips
+    (e.g. reading passages) need Whisper's sliding-window loop and go through
+    ``model.transcribe`` one at a time.
+    """
+    import torch
+    import whisper
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(payloads)
+    fp16 = use_fp16(model)
+
+    # Group short clips by decode options so each group is one decode call
+    groups: Dict[tuple, List[int]] = {}
+    for i, (audio, options) in enumerate(payloads):
+        if audio.shape[-1] > WINDOW_SAMPLES:
+            result = model.transcribe(audio, fp16=fp16, **options)
+            results[i] = {
+                "text": (result.get("text") or "").strip(),
+                "segments": result.get("segments") or [],
+                "language": result.get("language"),
+                **segment_confidence(result.get("segments") or []),
+            }
+            continue
+        key = tuple(sorted(options.items()))
+        groups.setdefault(key, []).append(i)
+
+    for key, indices in groups.items():
+        options = dict(key)
+        mels = [
+            whisper.log_mel_spectrogram(
+                whisper.pad_or_trim(payloads[i][0]), n_mels=model.dims.n_mels
+            )
+            for i in indices
+        ]
+        mel = torch.stack(mels).to(next(model.parameters()).device)
+        decode_options = whisper.DecodingOptions(
+            language=options.get("language"),
+            task=options.get("task", "transcribe"),
+            without_timestamps=True,
+            fp16=fp16,
+        )
+        decoded = whisper.decode(model, mel, decode_options)
+        for i, res in zip(indices, decoded):
+            results[i] = {
+                "text": res.text.strip(),
+                "language": res.language,
+                "avg_logprob": float(res.avg_logprob),
+                "no_speech_prob": float(res.no_speech_prob),
+            }
+
+    return results
+
+
+class InferenceScheduler:
+    """Collects inference jobs into micro-batches and runs them on one thread.
+
+    Each job has a ``kind`` ("transcribe", ...) mapped to a batch handler
+    ``handler(model, payloads) -> results`` and a priority ``lane``. A batch
+    only ever holds jobs of a single kind from a single lane; other jobs wait
+    for the next round, higher lanes first and in arrival order within a lane.
+    """
+
+    def __init__(self, model, max_batch_size: int = 8, max_wait_ms: float = 15.0, max_queue_depth: int = 0):
+        self.model = model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        # Per lane; 0 = unbounded
+        self.max_queue_depth = max(0, int(max_queue_depth))
+        self._handlers: Dict[str, BatchHandler] = {"transcribe": transcribe_batch}
+        self._pending: Dict[str, deque] = {lane: deque() for lane in LANES}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        # Moving average of model seconds per batch, for Retry-After estimates
+        self._batch_seconds = 1.0
+
+    def register(self, kind: str, handler: BatchHandler):
+        """Register a batch handler for a new job kind"""
+        self._handlers[kind] = handler
+
+    @property
+    def queue_depth(self) -> int:
+        with self._cond:
+            return sum(len(q) for q in self._pending.values())
+
+    def lane_depths(self) -> Dict[str, int]:
+        with self._cond:
+            return {lane: len(q) for lane, q in self._pending.items()}
+
+    def retry_after(self, lane: str = INTERACTIVE) -> int:
+        """Estimated seconds until a job queued now in ``lane`` would start"""
+        with self._cond:
+            ahead = sum(len(self._pending[l]) for l in LANES[:LANES.index(lane) + 1])
+        return max(1, math.ceil((ahead / self.max_batch_size + 1) * self._batch_seconds))
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="whisper-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Inference scheduler started (max_batch_size={self.max_batch_size}, "
+            f"max_wait_ms={self.max_wait * 1000:.0f})"
+        )
+
+    def stop(self, timeout: Optional[float] = None):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, kind: str, payload: Any, lane: str = INTERACTIVE) -> Future:
+        """Queue a job in ``lane`` and return a Future that resolves to its result.
+        Raises QueueFull when the lane is at ``max_queue_depth``.
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown inference job kind: {kind}")
+        if lane not in self._pending:
+            raise ValueError(f"Unknown priority lane: {lane}")
+        future: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Inference scheduler is stopped")
+            if self.max_queue_depth and len(self._pending[lane]) >= self.max_queue_depth:
+                raise QueueFull(lane, self.retry_after(lane))
+            self._pending[lane].append((kind, payload, future, time.perf_counter()))
+            self._cond.notify()
+        return future
+
+    def transcribe(self, audio: np.ndarray, timeout: Optional[float] = None, lane: str = INTERACTIVE,
+                   **options) -> Dict[str, Any]:
+        """Blocking helper: transcribe a 16 kHz float32 clip"""
+        audio = np.asarray(audio, dtype=np.float32)
+        return self.wait(self.submit("transcribe", (audio, options), lane), timeout)
+
+    @staticmethod
+    def wait(future: Future, timeout: Optional[float] = None):
+        """Wait for a job; a caller that gives up cancels it if still queued"""
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def _next_batch(self):
+        with self._cond:
+            while not any(self._pending.values()) and not self._closed:
+                self._cond.wait()
+            lane = next((lane for lane in LANES if self._pending[lane]), None)
+            if lane is None:
+                return None, None, []
+
+            pending = self._pending[lane]
+            kind, payload, future, submitted = pending.popleft()
+            batch = [(payload, future, submitted)]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                # Pull every queued job of the same kind, keeping the rest in order
+                kept = deque()
+                while pending and len(batch) < self.max_batch_size:
+                    job = pending.popleft()
+                    if job[0] == kind:
+                        batch.append(job[1:])
+                    else:
+                        kept.append(job)
+                kept.extend(pending)
+                pending = self._pending[lane] = kept
+
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.max_batch_size or remaining <= 0 or self._closed:
+                    break
+                # Stop gathering stragglers once a higher lane has work
+                if any(self._pending[l] for l in LANES[:LANES.index(lane)]):
+                    break
+                self._cond.wait(remaining)
+            return kind, lane, batch
+
+    def _run(self):
+        while True:
+            kind, lane, batch = self._next_batch()
+            if kind is None:
+                return
+            # Skip jobs whose callers already gave up
+            batch = [(p, f, t) for p, f, t in batch if f.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            for _, _, submitted in batch:
+                QUEUE_WAIT_SECONDS.observe(started - submitted, kind=kind, lane=lane)
+            BATCH_SIZE.observe(len(batch), kind=kind)
+            try:
+                results = self._handlers[kind](self.model, [p for p, _, _ in batch])
+            except Exception as e:
+                logger.error(f"Inference batch failed ({kind}, size={len(batch)}): {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            finally:
+                elapsed = time.perf_counter() - started
+                BATCH_SECONDS.observe(elapsed, kind=kind)
+                self._batch_seconds = 0.8 * self._batch_seconds + 0.2 * elapsed
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+            logger.info(
+                f"Inference batch done: kind={kind} lane={lane} size={len(batch)} "
+                f"in {elapsed:.2f}s"
+            )
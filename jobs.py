@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Asynchronous audio jobs with priority lanes.
+
+A long reading-passage upload to ``/transcribe`` holds its Flask worker for
+the whole Whisper run. ``POST /api/jobs`` instead reads the upload, queues a
+job and answers 202 with a job id right away; the client polls (or long-polls
+with ``?wait=``) ``GET /api/jobs/<id>`` for the result.
+
+Every lane (``inference.LANES``) has its own queue and its own runner
+threads, so pronunciation clips never wait for a runner that is busy with a
+long read, and the runners submit their model work to the scheduler in the
+same lane (a ``priority`` override included), so they also go first at the
+model. A lane holding
+``max_queued`` jobs rejects new ones with ``QueueFull`` (429 + Retry-After).
+
+Finished jobs are kept for ``ttl`` seconds and then dropped.
+
+A job runs in the process that accepted the upload. With several serve.py
+workers behind one socket a poll can reach any of them, so a ``JobBoard``
+(a SQLite file all workers open) mirrors each job's state and result; a
+worker that does not hold the job answers the poll from the board.
+"""
+
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from inference import LANES, QueueFull
+from metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+Result = Tuple[Dict[str, Any], int]
+
+JOB_WAIT_SECONDS = Histogram("dyscover_job_queue_seconds", "Time a job waits for a runner", ["lane"])
+JOB_RUN_SECONDS = Histogram("dyscover_job_run_seconds", "Time a runner spends on a job", ["kind", "lane"])
+JOBS_REJECTED = Counter("dyscover_jobs_rejected_total", "Jobs refused because their lane was full", ["lane"])
+
+# How often a long-poll for a job held by another worker re-reads the board
+BOARD_POLL_SECONDS = 0.25
+# Board rows only move forward, whichever thread's write lands last
+STAGES = {QUEUED: 0, RUNNING: 1, DONE: 2, FAILED: 2}
+
+BOARD_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    lane TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage INTEGER NOT NULL,
+    result TEXT,
+    result_status INTEGER,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished);
+"""
+
+
+class Job:
+    def __init__(self, kind: str, lane: str, compute: Callable[[], Result]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.lane = lane
+        self.compute = compute
+        self.status = QUEUED
+        self.result: Optional[Dict[str, Any]] = None
+        self.result_status: Optional[int] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.done = threading.Event()
+        # True for a read-only copy from the JobBoard (the job runs in another worker)
+        self.remote = False
+
+    @classmethod
+    def from_row(cls, row) -> "Job":
+        job_id, kind, lane, status, _, result, result_status, error, created, started, finished = row
+        job = cls(kind, lane, None)
+        job.id, job.status, job.error = job_id, status, error
+        job.result = json.loads(result) if result is not None else None
+        job.result_status = result_status
+        job.created, job.started, job.finished = created, started, finished
+        job.remote = True
+        if status in (DONE, FAILED):
+            job.done.set()
+        return job
+
+    def describe(self, position: Optional[int] = None) -> Dict[str, Any]:
+        """JSON view for the job API"""
+        out: Dict[str, Any] = {"jobId": self.id, "type": self.kind, "lane": self.lane, "status": self.status}
+        if position is not None:
+            out["position"] = position
+        if self.status == DONE:
+            out["result"] = self.result
+            out["resultStatus"] = self.result_status
+        elif self.status == FAILED:
+            out["error"] = self.error
+        if self.finished is not None and self.started is not None:
+            out["runSeconds"] = round(self.finished - self.started, 3)
+        return out
+
+
+class JobBoard:
+    """Job states in a SQLite file shared by every worker process"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        # A throwaway connection: one left open here would be inherited by forked workers
+        conn = sqlite3.connect(path, timeout=10.0)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(BOARD_SCHEMA)
+        finally:
+            conn.close()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            # Jobs are transient: losing the last commit to a power cut is fine
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def publish(self, job: Job):
+        result = json.dumps(job.result) if job.result is not None else None
+        self._conn().execute(
+            "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET status = excluded.status, stage = excluded.stage, "
+            "result = excluded.result, result_status = excluded.result_status, error = excluded.error, "
+            "started = excluded.started, finished = excluded.finished WHERE excluded.stage >= jobs.stage",
+            (job.id, job.kind, job.lane, job.status, STAGES[job.status], result, job.result_status,
+             job.error, job.created, job.started, job.finished))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    def expire(self, cutoff: float):
+        self._conn().execute("DELETE FROM jobs WHERE finished < ?", (cutoff,))
+
+
+class JobQueue:
+    """Queued audio jobs, ``workers`` runner threads per priority lane"""
+
+    def __init__(self, workers: int = 2, max_queued: int = 256, ttl: float = 600.0,
+                 board: Optional[JobBoard] = None):
+        self.workers = max(1, int(workers))
+        # Per lane; 0 = unbounded
+        self.max_queued = max(0, int(max_queued))
+        self.ttl = float(ttl)
+        self.board = board
+        self._jobs: Dict[str, Job] = {}
+        self._queues: Dict[str, deque] = {lane: deque() for lane in LANES}
+        self._cond = threading.Condition()
+        self._threads = []
+        self._closed = False
+        # Moving average of runner seconds per job, for Retry-After estimates
+        self._job_seconds = {lane: 5.0 for lane in LANES}
+
+    def start(self):
+        if self._threads:
+            return
+        self._closed = False
+        for lane in LANES:
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, args=(lane,), name=f"job-{lane}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.info(f"Job runners started ({self.workers} per lane, max_queued={self.max_queued or 'unbounded'})")
+
+    def stop(self, timeout: Optional[float] = None):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def depths(self) -> Dict[str, int]:
+        with self._cond:
+            return {lane: len(q) for lane, q in self._queues.items()}
+
+    def retry_after(self, lane: str) -> int:
+        with self._cond:
+            queued = len(self._queues[lane])
+        return max(1, math.ceil(queued / self.workers * self._job_seconds[lane]))
+
+    def submit(self, kind: str, lane: str, compute: Callable[[], Result]) -> Job:
+        """Queue ``compute() -> (body, status)``; raises QueueFull when ``lane`` is full"""
+        if lane not in self._queues:
+            raise ValueError(f"Unknown priority lane: {lane}")
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Job queue is stopped")
+            self._expire()
+            if self.max_queued and len(self._queues[lane]) >= self.max_queued:
+                JOBS_REJECTED.inc(lane=lane)
+                raise QueueFull(lane, self.retry_after(lane))
+            job = Job(kind, lane, compute)
+            self._jobs[job.id] = job
+            self._queues[lane].append(job)
+            self._cond.notify_all()
+        self._publish(job)
+        if self.board is not None:
+            self._board_call(self.board.expire, time.time() - self.ttl)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """The job, or a read-only copy from the board when another worker holds it"""
+        with self._cond:
+            self._expire()
+            job = self._jobs.get(job_id)
+        if job is None and self.board is not None:
+            job = self._board_call(self.board.get, job_id)
+        return job
+
+    def position(self, job: Job) -> Optional[int]:
+        """Jobs ahead of ``job`` in its lane (None once it has started)"""
+        with self._cond:
+            try:
+                return self._queues[job.lane].index(job)
+            except ValueError:
+                return None
+
+    def wait(self, job: Job, timeout: float) -> Job:
+        """``job`` once it finishes or ``timeout`` passes (a fresh copy for remote jobs)"""
+        if not job.remote:
+            job.done.wait(max(0.0, timeout))
+            return job
+        deadline = time.monotonic() + timeout
+        while not job.done.is_set() and time.monotonic() < deadline:
+            time.sleep(min(BOARD_POLL_SECONDS, max(0.0, deadline - time.monotonic())))
+            job = self._board_call(self.board.get, job.id) or job
+        return job
+
+    def _board_call(self, fn, *args):
+        try:
+            return fn(*args)
+        except sqlite3.Error as e:
+            logger.warning(f"Job board {fn.__name__} failed: {e}")
+            return None
+
+    def _publish(self, job: Job):
+        if self.board is not None:
+            self._board_call(self.board.publish, job)
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        expired = [i for i, j in self._jobs.items() if j.finished is not None and j.finished < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _run(self, lane: str):
+        queue = self._queues[lane]
+        while True:
+            with self._cond:
+                while not queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                job = queue.popleft()
+                job.status = RUNNING
+                job.started = time.time()
+            self._publish(job)
+            JOB_WAIT_SECONDS.observe(job.started - job.created, lane=lane)
+            try:
+                job.result, job.result_status = job.compute()
+                job.status = DONE
+            except Exception as e:
+                logger.error(f"Job {job.id} ({job.kind}) failed: {e}")
+                job.error = "Internal server error"
+                job.status = FAILED
+            finally:
+                job.finished = time.time()
+                job.compute = None
+                elapsed = job.finished - job.started
+                JOB_RUN_SECONDS.observe(elapsed, kind=job.kind, lane=lane)
+                self._job_seconds[lane] = 0.8 * self._job_seconds[lane] + 0.2 * elapsed
+                self._publish(job)
+                job.done.set()
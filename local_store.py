@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Offline-first write store for the storage routes.
+
+A school's connection to MongoDB can be slow or down, and every storage
+write used to wait on a round trip to it (or answer 503 and lose the
+child's result). With a local store the routes instead commit each write to
+a SQLite database in WAL mode (one local fsync) and answer; a background
+``Syncer`` replays the queued writes to Mongo in batches.
+
+Writes are recorded as ops: ``create`` (a new assessment, with an ObjectId
+minted locally), ``result`` (results.<type>, stamped with ``savedAt`` when
+it was received) and ``complete``. Replay is idempotent, so an op that is
+sent twice (a crash between the Mongo write and the local commit, or an
+overlapping replay) changes nothing the second time:
+
+- create: ``$setOnInsert`` upsert on the local id
+- result: last writer wins on ``savedAt``; the ``$set`` is conditional on
+  the stored result being older, so a newer result written elsewhere is kept
+- complete: ``$set`` of the recorded completion time
+
+Ops for an assessment Mongo does not have (and no queued create) are moved
+to ``rejected`` with the reason. Replays update the analytics rollups from
+the projected pre-images, like the synchronous routes.
+
+Several processes (serve.py workers) can share one store file: a syncer
+claims whole assessments under a lease (every pending op of each, none of
+which another syncer holds), so one assessment's ops are always replayed in
+order by a single syncer and never concurrently.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from bson import ObjectId, json_util
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from metrics import Counter
+from rollups import ROLLUP_PROJECTION, ROLLUP_TESTS, apply_changes, rollup_changes, with_result
+
+logger = logging.getLogger(__name__)
+
+# Default file; deployments set LOCAL_STORE_PATH (config.Settings)
+LOCAL_STORE_PATH = str(Path(__file__).resolve().parent / ".local_store" / "writes.db")
+
+CREATE, RESULT, COMPLETE = "create", "result", "complete"
+PENDING, REJECTED = "pending", "rejected"
+
+# Pre-images need the stored savedAt of each result for last-writer-wins
+SYNC_PROJECTION = dict(ROLLUP_PROJECTION, **{f"results.{t}.savedAt": 1 for t in ROLLUP_TESTS})
+
+# Duplicate key: two upserts raced; retrying finds the document
+RETRYABLE_WRITE_ERRORS = {11000}
+
+SYNC_OPS = Counter("dyscover_sync_ops_total", "Queued storage writes replayed to MongoDB by outcome", ["outcome"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ops (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    op_id TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    assessment_id TEXT NOT NULL,
+    body TEXT NOT NULL,
+    created REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS ops_status_seq ON ops (status, seq);
+CREATE INDEX IF NOT EXISTS ops_assessment ON ops (assessment_id, seq);
+CREATE TABLE IF NOT EXISTS known (
+    assessment_id TEXT PRIMARY KEY,
+    created REAL NOT NULL
+);
+"""
+
+
+@dataclass
+class Op:
+    seq: int
+    op_id: str
+    kind: str
+    assessment_id: str
+    body: Dict[str, Any]
+    attempts: int = 0
+
+
+class LocalStore:
+    """Durable queue of storage writes in a SQLite (WAL) file"""
+
+    def __init__(self, path: Optional[str] = None):
+        path = path or LOCAL_STORE_PATH
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        # A throwaway connection: one left open here would be inherited by forked workers
+        conn = sqlite3.connect(path, timeout=10.0)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread (and per process after a fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # fsync the WAL on every commit: an accepted write survives a power cut
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, ops: Iterable[Tuple[str, str, Dict[str, Any]]]) -> List[str]:
+        """Record ``(kind, assessment_id, body)`` ops in one transaction; returns their op ids"""
+        now = time.time()
+        rows = [(uuid.uuid4().hex, kind, assessment_id, json_util.dumps(body), now)
+                for kind, assessment_id, body in ops]
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO ops (op_id, kind, assessment_id, body, created) VALUES (?, ?, ?, ?, ?)", rows)
+            conn.executemany(
+                "INSERT OR IGNORE INTO known (assessment_id, created) VALUES (?, ?)",
+                [(assessment_id, now) for _, kind, assessment_id, _, _ in rows if kind == CREATE])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return [row[0] for row in rows]
+
+    def remember(self, assessment_ids: Iterable[str]):
+        """Mark assessments as existing, so later writes for them skip the Mongo check"""
+        now = time.time()
+        self._conn().executemany("INSERT OR IGNORE INTO known (assessment_id, created) VALUES (?, ?)",
+                                 [(i, now) for i in assessment_ids])
+
+    def known(self, assessment_ids: Iterable[str]) -> Set[str]:
+        ids = list(set(assessment_ids))
+        if not ids:
+            return set()
+        marks = ",".join("?" * len(ids))
+        rows = self._conn().execute(f"SELECT assessment_id FROM known WHERE assessment_id IN ({marks})", ids)
+        return {row[0] for row in rows}
+
+    def claim(self, limit: int, lease: float = 60.0) -> List[Op]:
+        """Lease about ``limit`` pending ops to this syncer, whole assessments at a time.
+
+        An assessment with an op leased by another syncer is skipped entirely:
+        replaying its later ops here first would find no document (the create
+        is still in flight) or apply results out of order.
+        """
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            assessments = conn.execute(
+                "SELECT assessment_id, COUNT(*) FROM ops WHERE status = ? GROUP BY assessment_id "
+                "HAVING MAX(lease_until) < ? ORDER BY MIN(seq) LIMIT ?", (PENDING, now, limit)).fetchall()
+            ids, count = [], 0
+            for assessment_id, ops in assessments:
+                if ids and count + ops > limit:
+                    break
+                ids.append(assessment_id)
+                count += ops
+            marks = ",".join("?" * len(ids))
+            rows = conn.execute(
+                "SELECT seq, op_id, kind, assessment_id, body, attempts FROM ops "
+                f"WHERE status = ? AND assessment_id IN ({marks}) ORDER BY seq", (PENDING, *ids)).fetchall()
+            conn.executemany("UPDATE ops SET lease_until = ? WHERE seq = ?", [(now + lease, r[0]) for r in rows])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return [Op(seq, op_id, kind, aid, json_util.loads(body), attempts)
+                for seq, op_id, kind, aid, body, attempts in rows]
+
+    def settle(self, synced: Iterable[str], rejected: Dict[str, str], retry: Iterable[str] = (),
+               error: Optional[str] = None):
+        """Drop synced ops, park rejected ones and release the rest for another attempt"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("DELETE FROM ops WHERE op_id = ?", [(i,) for i in synced])
+            conn.executemany("UPDATE ops SET status = ?, error = ?, lease_until = 0 WHERE op_id = ?",
+                             [(REJECTED, reason, i) for i, reason in rejected.items()])
+            conn.executemany("UPDATE ops SET attempts = attempts + 1, error = ?, lease_until = 0 WHERE op_id = ?",
+                             [(error, i) for i in retry])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def pending_ops(self, assessment_id: str) -> List[Op]:
+        rows = self._conn().execute(
+            "SELECT seq, op_id, kind, assessment_id, body, attempts FROM ops "
+            "WHERE assessment_id = ? AND status = ? ORDER BY seq", (assessment_id, PENDING))
+        return [Op(seq, op_id, kind, aid, json_util.loads(body), attempts)
+                for seq, op_id, kind, aid, body, attempts in rows]
+
+    def overlay(self, assessment_id: str, doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """``doc`` (None when Mongo has none) with this assessment's unsynced writes applied"""
+        for op in self.pending_ops(assessment_id):
+            if op.kind == CREATE:
+                doc = doc or op.body["doc"]
+            elif doc is None:
+                continue
+            elif op.kind == RESULT:
+                current = ((doc.get("results") or {}).get(op.body["type"]) or {}).get("savedAt")
+                if current is None or current <= op.body["payload"]["savedAt"]:
+                    doc = with_result(doc, op.body["type"], op.body["payload"])
+            elif op.kind == COMPLETE:
+                doc = dict(doc, completedAt=op.body["completedAt"])
+        return doc
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._conn()
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM ops GROUP BY status").fetchall())
+        oldest = conn.execute("SELECT MIN(created) FROM ops WHERE status = ?", (PENDING,)).fetchone()[0]
+        return {
+            "pending": counts.get(PENDING, 0),
+            "rejected": counts.get(REJECTED, 0),
+            "oldest_pending_seconds": round(time.time() - oldest, 1) if oldest else 0.0,
+        }
+
+
+def replay(database, ops: List[Op]) -> Tuple[List[str], Dict[str, str], List[str]]:
+    """Apply ``ops`` (in seq order) to Mongo in one ordered bulk write.
+
+    Returns (synced, rejected {op_id: reason}, retry) op ids. Connection
+    errors propagate; the caller releases the whole batch.
+    """
+    ids = list({ObjectId(op.assessment_id) for op in ops})
+    before = {d["_id"]: d for d in database.assessments.find({"_id": {"$in": ids}}, SYNC_PROJECTION)}
+    states = dict(before)
+    writes: List[UpdateOne] = []
+    # Per op: the bulk index of its write (None when nothing needs writing) and the state it leaves
+    plan: List[Tuple[Op, Optional[int], Any]] = []
+    rejected: Dict[str, str] = {}
+    for op in ops:
+        _id = ObjectId(op.assessment_id)
+        state = states.get(_id)
+        write = None
+        if op.kind == CREATE:
+            if state is None:
+                doc = {k: v for k, v in op.body["doc"].items() if k != "_id"}
+                write = UpdateOne({"_id": _id}, {"$setOnInsert": doc}, upsert=True)
+                state = dict(doc, _id=_id)
+        elif state is None:
+            rejected[op.op_id] = "assessment not found"
+        elif op.kind == RESULT:
+            test_type, payload = op.body["type"], op.body["payload"]
+            saved_at = payload["savedAt"]
+            current = ((state.get("results") or {}).get(test_type) or {}).get("savedAt")
+            if current is None or current <= saved_at:
+                field = f"results.{test_type}"
+                write = UpdateOne(
+                    {"_id": _id, "$or": [{f"{field}.savedAt": {"$exists": False}},
+                                         {f"{field}.savedAt": {"$lte": saved_at}}]},
+                    {"$set": {field: payload}},
+                )
+                state = with_result(state, test_type, payload)
+        elif op.kind == COMPLETE:
+            write = UpdateOne({"_id": _id}, {"$set": {"completedAt": op.body["completedAt"]}})
+            state = dict(state, completedAt=op.body["completedAt"])
+        if state is not None:
+            states[_id] = state
+        if write is not None:
+            plan.append((op, len(writes), state))
+            writes.append(write)
+        else:
+            plan.append((op, None, state))
+
+    # With ordered writes everything before the first failure landed
+    failed_at, failure = len(writes), None
+    if writes:
+        try:
+            database.assessments.bulk_write(writes, ordered=True)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors") or [{}]
+            failed_at, failure = errors[0].get("index", 0), errors[0]
+
+    synced, retry, after = [], [], {}
+    for position, (op, index, state) in enumerate(plan):
+        if index is not None and index >= failed_at:
+            if index == failed_at and failure.get("code") not in RETRYABLE_WRITE_ERRORS:
+                rejected[op.op_id] = failure.get("errmsg", "write error")
+            else:
+                retry.append(op.op_id)
+            # Later ops were planned on top of this write
+            retry.extend(o.op_id for o, _, _ in plan[position + 1:] if o.op_id not in rejected)
+            break
+        if op.op_id in rejected:
+            continue
+        synced.append(op.op_id)
+        if state is not None:
+            after[ObjectId(op.assessment_id)] = state
+
+    changes = []
+    for _id, state in after.items():
+        if state is not before.get(_id):
+            changes.extend(rollup_changes(before.get(_id), state))
+    apply_changes(database.rollups, changes)
+    return synced, rejected, retry
+
+
+class Syncer:
+    """Background thread replaying the local store to Mongo in batches"""
+
+    def __init__(self, store: LocalStore, database: Callable[[], Any], batch_size: int = 500,
+                 interval: float = 2.0, max_backoff: float = 60.0):
+        self.store = store
+        # Callable so a Mongo that was down at startup can be reconnected later
+        self.database = database
+        self.batch_size = max(1, int(batch_size))
+        self.interval = float(interval)
+        self.max_backoff = float(max_backoff)
+        self.last_error: Optional[str] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="local-store-sync", daemon=True)
+        self._thread.start()
+        logger.info(f"Local store sync started ({self.store.path}, batch_size={self.batch_size})")
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def sync_once(self) -> int:
+        """Replay one batch; returns the number of ops settled"""
+        database = self.database()
+        if database is None:
+            raise ConnectionError("database not available")
+        ops = self.store.claim(self.batch_size)
+        if not ops:
+            return 0
+        try:
+            synced, rejected, retry = replay(database, ops)
+        except Exception as e:
+            self.store.settle([], {}, [op.op_id for op in ops], error=str(e))
+            raise
+        self.store.settle(synced, rejected, retry, error="retry after a failed write" if retry else None)
+        SYNC_OPS.inc(len(synced), outcome="synced")
+        if rejected:
+            SYNC_OPS.inc(len(rejected), outcome="rejected")
+            logger.warning(f"Local store sync rejected {len(rejected)} ops: {sorted(set(rejected.values()))}")
+        if retry:
+            SYNC_OPS.inc(len(retry), outcome="retry")
+        self.last_error = None
+        return len(synced) + len(rejected)
+
+    def _run(self):
+        backoff = self.interval
+        while not self._stop.is_set():
+            try:
+                settled = self.sync_once()
+                backoff = self.interval
+            except Exception as e:
+                if self.last_error != str(e):
+                    logger.error(f"❌ Local store sync failed (will retry): {e}")
+                self.last_error = str(e)
+                settled = 0
+                backoff = min(backoff * 2, self.max_backoff)
+            if settled:
+                continue
+            self._wake.wait(backoff)
+            self._wake.clear()
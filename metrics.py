@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Minimal Prometheus-style metrics for the backend.
+
+Counters, histograms and callback gauges register themselves in a
+process-wide REGISTRY; ``render()`` produces the Prometheus text exposition
+format for the ``/metrics`` endpoint. Metric objects are cheap and
+thread-safe (one lock per metric), so request threads and the inference
+scheduler can record from anywhere without going through Flask.
+
+- Counter: monotonically increasing value per label set
+- Histogram: cumulative buckets + sum + count per label set; ``time()``
+  is a context manager that observes the elapsed seconds
+- Callback: value(s) read at scrape time (queue depth, cache statistics)
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+# Seconds; spans a cached CRUD call up to a long reading passage on CPU
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric"):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), registry: Optional[Registry] = REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = []
+        for key, state in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, ('le', _number(bound)))} {_number(cumulative)}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(state[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {_number(state[-1])}")
+        return lines
+
+
+class Callback(_Metric):
+    """Value(s) computed at scrape time.
+
+    ``fn`` returns a number, or a dict of label-value tuples to numbers when
+    ``labelnames`` is given; ``None`` values and errors are skipped.
+    """
+
+    def __init__(self, name: str, help: str, fn: Callable[[], object], labelnames: Iterable[str] = (),
+                 kind: str = "gauge", registry: Optional[Registry] = REGISTRY):
+        self.fn = fn
+        self.kind = kind
+        super().__init__(name, help, labelnames, registry)
+
+    def samples(self) -> List[str]:
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        return [
+            f"{self.name}{_labels(self.labelnames, k if isinstance(k, tuple) else (k,))} {_number(v)}"
+            for k, v in items if v is not None
+        ]
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo CommandListener timing every command by name"""
+
+    def __init__(self, registry: Optional[Registry] = REGISTRY):
+        self.seconds = Histogram("dyscover_mongo_command_seconds", "MongoDB command latency",
+                                 ["command"], registry=registry)
+        self.failures = Counter("dyscover_mongo_command_failures_total", "Failed MongoDB commands",
+                                ["command"], registry=registry)
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.seconds.observe(event.duration_micros / 1e6, command=event.command_name)
+
+    def failed(self, event):
+        self.seconds.observe(event.duration_micros / 1e6, command=event.command_name)
+        self.failures.inc(command=event.command_name)
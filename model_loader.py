@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Whisper model loading with an optional memory-mapped weight cache.
+
+``whisper.load_model`` reads the whole checkpoint into memory and then builds
+a randomly initialised model before copying the weights in. When
+``mmap_cache`` (``WHISPER_MMAP_CACHE``) points at a directory, checkpoints are kept there and
+loaded with ``torch.load(mmap=True)`` instead: the model skeleton is built on
+the meta device and the memory-mapped tensors are assigned directly, so the
+weights are paged in from the OS page cache on first use. Replicas on the same
+host share those pages, which makes a newly started replica ready in seconds.
+
+``quantize_int8`` converts a loaded model for CPU serving: every Linear layer
+(attention projections and MLPs, nearly all of Whisper's weights) is replaced
+by a dynamically quantized int8 Linear. Weights are stored as int8 and
+activations are quantized per batch at run time, so decoding runs on int8
+matmul kernels with roughly a quarter of the Linear weight memory. The model
+keeps Whisper's API, so the batch handlers and ``model.transcribe`` work
+unchanged. See quantization_report.py for the accuracy/speed trade-off on the
+reading passages.
+"""
+
+import logging
+import os
+import warnings
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+def _checkpoint_path(name: str, cache_dir: str) -> str:
+    import whisper
+
+    if os.path.isfile(name):
+        return name
+    if name not in whisper._MODELS:
+        raise RuntimeError(f"Model {name} not found; available models = {whisper.available_models()}")
+    os.makedirs(cache_dir, exist_ok=True)
+    # _download verifies the checksum and reuses an existing file
+    return whisper._download(whisper._MODELS[name], cache_dir, False)
+
+
+def _load_mmap(name: str, cache_dir: str):
+    import numpy as np
+    import torch
+    import whisper
+    from whisper.model import AudioEncoder, ModelDimensions, TextDecoder, Whisper
+
+    path = _checkpoint_path(name, cache_dir)
+    checkpoint = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    dims = ModelDimensions(**checkpoint["dims"])
+
+    # Mirror Whisper.__init__, but build encoder/decoder on the meta device so
+    # no weights are allocated or randomly initialised
+    model = Whisper.__new__(Whisper)
+    torch.nn.Module.__init__(model)
+    model.dims = dims
+    with torch.device("meta"):
+        model.encoder = AudioEncoder(
+            dims.n_mels, dims.n_audio_ctx, dims.n_audio_state, dims.n_audio_head, dims.n_audio_layer
+        )
+        model.decoder = TextDecoder(
+            dims.n_vocab, dims.n_text_ctx, dims.n_text_state, dims.n_text_head, dims.n_text_layer
+        )
+    model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+
+    # Non-persistent buffers are not in the checkpoint; rebuild them on CPU
+    mask = torch.empty(dims.n_text_ctx, dims.n_text_ctx).fill_(-np.inf).triu_(1)
+    model.decoder.register_buffer("mask", mask, persistent=False)
+    all_heads = torch.zeros(dims.n_text_layer, dims.n_text_head, dtype=torch.bool)
+    all_heads[dims.n_text_layer // 2:] = True
+    model.register_buffer("alignment_heads", all_heads.to_sparse(), persistent=False)
+    if name in whisper._ALIGNMENT_HEADS:
+        model.set_alignment_heads(whisper._ALIGNMENT_HEADS[name])
+
+    leftover = [n for n, t in list(model.named_parameters()) + list(model.named_buffers()) if t.is_meta]
+    if leftover:
+        raise RuntimeError(f"checkpoint did not cover: {', '.join(leftover[:5])}")
+    return model
+
+
+def load_whisper(name: str, device: Optional[str] = None, mmap_cache: Optional[str] = None):
+    """Load a Whisper model, memory-mapping the weights when a cache dir is set"""
+    import torch
+    import whisper
+
+    if device is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    if mmap_cache:
+        try:
+            model = _load_mmap(name, mmap_cache)
+            logger.info(f"Loaded Whisper '{name}' from memory-mapped cache {mmap_cache}")
+            return model.to(device)
+        except Exception as e:
+            logger.warning(f"Memory-mapped load failed ({e}); falling back to whisper.load_model")
+
+    return whisper.load_model(name, device=device)
+
+
+def quantize_int8(model):
+    """Dynamically quantize Whisper's Linear layers to int8 (CPU only, in place)"""
+    import torch
+    from torch import nn
+    from whisper.model import Linear
+
+    model = model.cpu().float()
+    # whisper.model.Linear only adds a cast to the input dtype, which is a
+    # no-op in fp32; quantize_dynamic only swaps exact nn.Linear modules
+    for module in model.modules():
+        if type(module) is Linear:
+            module.__class__ = nn.Linear
+    with warnings.catch_warnings():
+        # torch.ao.quantization is deprecated in favour of torchao
+        warnings.simplefilter("ignore", DeprecationWarning)
+        torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model.eval()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Fast-path pronunciation scoring for single-word targets.
+
+Instead of an open-vocabulary ``transcribe()`` followed by a token match, the
+clip is encoded once and the decoder is run in a single teacher-forced pass
+over a handful of candidate transcripts: the target word plus a few
+confusable alternatives (onset/vowel swaps, dropped sounds). The candidate
+log-likelihoods are normalised into a posterior; the target's share of it is
+the confidence, and the clip scores 1 when the target is the most likely
+candidate with enough confidence and the clip is not silence.
+
+The posterior is relative to a closed set, so a clearly different word (the
+child says "dog" for "cat") can still leave the target on top. The target's
+own likelihood is therefore also checked against an absolute floor: the
+mean per-token log-probability of its best spelling variant must reach
+``min_logprob`` (Whisper's own failed-decode threshold is -1.0). A clip the
+posterior accepts but the floor does not is flagged ``below_floor``, and the
+route re-checks it with a free transcription and a token match.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from inference import use_fp16
+
+# Target words the constrained scorer can handle
+SINGLE_WORD_RE = re.compile(r"^[a-z][a-z']*$")
+
+# Phonetically close letter groups used to build confusable alternatives
+_ONSET_SWAPS = {
+    "b": ["p", "d"], "p": ["b", "t"], "d": ["t", "b"], "t": ["d", "k"],
+    "k": ["g", "t"], "c": ["g", "t"], "g": ["k", "d"], "f": ["v", "th"],
+    "v": ["f", "b"], "s": ["z", "sh"], "z": ["s"], "m": ["n"], "n": ["m"],
+    "l": ["r", "w"], "r": ["w", "l"], "w": ["r"], "j": ["g", "ch"],
+    "h": [""], "y": ["l"],
+}
+_VOWEL_SWAPS = {"a": ["e", "u"], "e": ["i", "a"], "i": ["e", "ee"], "o": ["u", "a"], "u": ["o", "a"]}
+
+DEFAULT_MAX_ALTERNATIVES = 6
+DEFAULT_MIN_CONFIDENCE = 0.5
+DEFAULT_MIN_LOGPROB = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+
+def is_single_word(target: str) -> bool:
+    return bool(SINGLE_WORD_RE.match(target or ""))
+
+
+def confusable_alternatives(target: str, limit: int = DEFAULT_MAX_ALTERNATIVES) -> List[str]:
+    """Build a small set of near-miss pronunciations for ``target``"""
+    word = target.lower()
+    candidates = []
+    # Swap the onset consonant (bat -> pat, dat)
+    for swap in _ONSET_SWAPS.get(word[0], []):
+        candidates.append(swap + word[1:])
+    # Swap the first vowel (bat -> bet, but)
+    for i, ch in enumerate(word):
+        if ch in _VOWEL_SWAPS:
+            candidates.extend(word[:i] + v + word[i + 1:] for v in _VOWEL_SWAPS[ch])
+            break
+    # Dropped final / initial sounds (bat -> ba, at)
+    if len(word) > 2:
+        candidates.append(word[:-1])
+        candidates.append(word[1:])
+
+    alternatives = []
+    for cand in candidates:
+        if cand and cand != word and cand not in alternatives:
+            alternatives.append(cand)
+    return alternatives[:limit]
+
+
+def _variants(word: str) -> List[str]:
+    # Whisper usually capitalises and punctuates a lone word (" Cat.")
+    return [f" {word}", f" {word.capitalize()}", f" {word}.", f" {word.capitalize()}."]
+
+
+def _score_clip(model, tokenizer, audio_features, target: str, alternatives: List[str]) -> Dict[str, Any]:
+    import torch
+
+    words = [target] + [a for a in alternatives if a != target]
+    prefix = list(tokenizer.sot_sequence_including_notimestamps)
+    rows, owners = [], []
+    for w_idx, word in enumerate(words):
+        for text in _variants(word):
+            rows.append(prefix + tokenizer.encode(text) + [tokenizer.eot])
+            owners.append(w_idx)
+
+    # Pad with EOT; causal attention means padding never affects real positions
+    length = max(len(r) for r in rows)
+    tokens = torch.full((len(rows), length), tokenizer.eot, dtype=torch.long)
+    for i, r in enumerate(rows):
+        tokens[i, :len(r)] = torch.tensor(r)
+    tokens = tokens.to(audio_features.device)
+
+    # One teacher-forced decoder pass over every candidate sequence
+    features = audio_features.unsqueeze(0).expand(len(rows), -1, -1)
+    logits = model.decoder(tokens, features).float()
+    logprobs = torch.log_softmax(logits, dim=-1)
+
+    no_speech_prob = float(logits[0, 0].softmax(dim=-1)[tokenizer.no_speech])
+
+    seq_scores, token_means = [], []
+    for i, r in enumerate(rows):
+        positions = torch.arange(len(prefix) - 1, len(r) - 1, device=logprobs.device)
+        targets = tokens[i, len(prefix):len(r)]
+        total = float(logprobs[i, positions, targets].sum())
+        seq_scores.append(total)
+        token_means.append(total / len(targets))
+
+    # Candidate likelihood = log-sum-exp over its spelling variants
+    word_scores = np.full(len(words), -np.inf)
+    for owner, s in zip(owners, seq_scores):
+        word_scores[owner] = np.logaddexp(word_scores[owner], s)
+    posterior = np.exp(word_scores - word_scores.max())
+    posterior /= posterior.sum()
+
+    best = int(np.argmax(posterior))
+    # Absolute fit of the target itself: its best spelling variant, per token
+    target_logprob = max(m for owner, m in zip(owners, token_means) if owner == 0)
+    return {
+        "best": words[best],
+        "confidence": float(posterior[0]),
+        "target_logprob": round(target_logprob, 4),
+        "no_speech_prob": no_speech_prob,
+        "candidates": {w: round(float(p), 4) for w, p in zip(words, posterior)},
+    }
+
+
+def score_pronunciation_batch(model, payloads: List[Any]) -> List[Dict[str, Any]]:
+    """Batch handler for the inference scheduler.
+
+    Each payload is ``(audio, target, alternatives, min_confidence, min_logprob)``. The
+    encoder runs once over the whole batch; each clip then gets a single
+    decoder pass over its candidate set.
+    """
+    import torch
+    import whisper
+    from whisper.tokenizer import get_tokenizer
+
+    device = next(model.parameters()).device
+    tokenizer = get_tokenizer(
+        model.is_multilingual,
+        num_languages=getattr(model, "num_languages", 99),
+        language="en",
+        task="transcribe",
+    )
+
+    mel = torch.stack([
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels=model.dims.n_mels)
+        for audio, *_ in payloads
+    ]).to(device)
+    if use_fp16(model):
+        mel = mel.half()
+
+    results = []
+    with torch.no_grad():
+        audio_features = model.embed_audio(mel)
+        for features, (_, target, alternatives, min_confidence, min_logprob) in zip(audio_features, payloads):
+            scored = _score_clip(model, tokenizer, features, target, alternatives)
+            accepted = (
+                scored["best"] == target
+                and scored["confidence"] >= min_confidence
+                and scored["no_speech_prob"] < NO_SPEECH_THRESHOLD
+            )
+            scored["below_floor"] = accepted and scored["target_logprob"] < min_logprob
+            scored["score"] = int(accepted and not scored["below_floor"])
+            results.append(scored)
+    return results
+
+
+def parse_alternatives(raw: Optional[str], target: str) -> List[str]:
+    """Client-supplied comma-separated alternatives, or generated confusables"""
+    if raw:
+        words = [w.strip().lower() for w in raw.split(",")]
+        words = [w for w in words if is_single_word(w) and w != target]
+        if words:
+            return words[:DEFAULT_MAX_ALTERNATIVES * 2]
+    return confusable_alternatives(target)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Accuracy vs speed of the int8 CPU Whisper backend on the reading passages.
+
+Transcribes every passage of the reading test (``CTOPP Test/app/reading``)
+with the fp32 model and with the same checkpoint quantized by
+``model_loader.quantize_int8``, both on CPU, and reports per backend:
+
+- WER against the passage text (lower-cased, punctuation stripped)
+- WER of the int8 transcript against the fp32 one (how often quantization
+  changes the output at all)
+- real-time factor (decode seconds / audio seconds) and load time
+- serialized model size
+
+Audio comes from ``--audio-dir`` when given: WAV/WebM/MP4 recordings named
+``<group>-<n>.<ext>`` (e.g. ``9-12-3.wav`` for the third 9-12 passage).
+Otherwise each passage is synthesized with pyttsx3, which is clean speech and
+so only a lower bound on the WER gap; real recordings of children reading are
+what the decision should rest on.
+
+  python quantization_report.py --model small --threads 4
+  python quantization_report.py --model medium --audio-dir recordings/ --out bench/int8.json
+"""
+
+import argparse
+import io
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from audio_io import decode_audio
+from config import load_settings
+from inference import SAMPLE_RATE
+from model_loader import load_whisper, quantize_int8
+from reading import normalize_words, word_errors
+
+READING_PAGE = Path(__file__).resolve().parent / "CTOPP Test" / "app" / "reading" / "page.js"
+BACKENDS = ("fp32", "int8")
+
+
+def reading_passages(page: Path = READING_PAGE) -> List[Tuple[str, str]]:
+    """(id, text) for every passage the reading test can pick, e.g. ("6-8-1", ...)"""
+    source = page.read_text(encoding="utf-8")
+    passages = []
+    for group in ("6_8", "9_12"):
+        block = re.search(rf"const passage_{group} = \[(.*?)\]", source, re.S)
+        if block:
+            texts = re.findall(r'"([^"]+)"', block.group(1))
+            passages += [(f"{group.replace('_', '-')}-{i}", t) for i, t in enumerate(texts, 1)]
+    return passages
+
+
+def load_audio(passage_id: str, text: str, audio_dir: Optional[Path]) -> np.ndarray:
+    if audio_dir is not None:
+        matches = sorted(audio_dir.glob(f"{passage_id}.*"))
+        if not matches:
+            raise FileNotFoundError(f"No recording for passage {passage_id} in {audio_dir}")
+        return decode_audio(matches[0].read_bytes())
+    from tts_cache import render_wav
+    return decode_audio(render_wav(text))
+
+
+def model_size_mb(model) -> float:
+    import torch
+
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return round(buffer.tell() / 1e6, 1)
+
+
+def run_backend(backend: str, args, clips: List[Dict[str, Any]]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    model = load_whisper(args.model, device="cpu", mmap_cache=args.mmap_cache)
+    if backend == "int8":
+        model = quantize_int8(model)
+    load_seconds = time.perf_counter() - started
+
+    # Untimed pass so one-off allocations don't land on the first passage
+    model.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), fp16=False, language="en", temperature=0.0)
+
+    rows = []
+    for clip in clips:
+        started = time.perf_counter()
+        result = model.transcribe(clip["audio"], fp16=False, language="en", temperature=0.0)
+        elapsed = time.perf_counter() - started
+        text = (result.get("text") or "").strip()
+        reference = normalize_words(clip["text"])
+        rows.append({
+            "passage": clip["id"],
+            "audio_seconds": round(clip["seconds"], 2),
+            "decode_seconds": round(elapsed, 3),
+            "rtf": round(elapsed / clip["seconds"], 4),
+            "errors": word_errors(reference, normalize_words(text)),
+            "words": len(reference),
+            "text": text,
+        })
+    total_errors = sum(r["errors"] for r in rows)
+    total_words = sum(r["words"] for r in rows)
+    decode = sum(r["decode_seconds"] for r in rows)
+    audio = sum(r["audio_seconds"] for r in rows)
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 2),
+        "size_mb": model_size_mb(model),
+        "wer": round(total_errors / total_words, 4) if total_words else None,
+        "rtf": round(decode / audio, 4) if audio else None,
+        "decode_seconds": round(decode, 2),
+        "passages": rows,
+    }
+
+
+def agreement(fp32: Dict[str, Any], int8: Dict[str, Any]) -> Optional[float]:
+    """WER of the int8 transcripts measured against the fp32 ones"""
+    errors = words = 0
+    for a, b in zip(fp32["passages"], int8["passages"]):
+        reference = normalize_words(a["text"])
+        errors += word_errors(reference, normalize_words(b["text"]))
+        words += len(reference)
+    return round(errors / words, 4) if words else None
+
+
+def markdown(report: Dict[str, Any]) -> str:
+    env = report["environment"]
+    lines = [
+        f"## Whisper {env['model']} on CPU: fp32 vs int8",
+        "",
+        f"{env['passages']} reading passages ({env['audio']}), {env['threads']} torch threads, "
+        f"torch {env['torch']}, {env['cpus']} CPUs",
+        "",
+        "| Backend | WER | RTF | Decode s | Load s | Size MB |",
+        "|---------|-----|-----|----------|--------|---------|",
+    ]
+    for r in report["backends"]:
+        lines.append(f"| {r['backend']} | {r['wer']:.2%} | {r['rtf']:.3f} | {r['decode_seconds']} | "
+                     f"{r['load_seconds']} | {r['size_mb']} |")
+    summary = report["summary"]
+    lines += [
+        "",
+        f"- Speed-up: {summary['speedup']}x",
+        f"- WER change: {summary['wer_delta']:+.2%}",
+        f"- int8 transcripts vs fp32: {summary['int8_vs_fp32_wer']:.2%} word differences",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fp32 and int8 Whisper on the reading passages")
+    parser.add_argument('--model', type=str, default='small', help='Whisper model name or checkpoint path')
+    parser.add_argument('--audio-dir', type=Path, help='Recordings named <group>-<n>.<ext> (default: synthesize with pyttsx3)')
+    parser.add_argument('--threads', type=int, default=0, help='torch threads (0 = torch default)')
+    parser.add_argument('--mmap-cache', type=str, default=load_settings().mmap_cache)
+    parser.add_argument('--out', type=str, help='Write the JSON report here (a .md summary is written next to it)')
+    args = parser.parse_args()
+
+    import torch
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    clips = []
+    for passage_id, text in reading_passages():
+        audio = load_audio(passage_id, text, args.audio_dir)
+        clips.append({"id": passage_id, "text": text, "audio": audio, "seconds": len(audio) / SAMPLE_RATE})
+    print(f"Loaded {len(clips)} passages ({sum(c['seconds'] for c in clips):.0f}s of audio)")
+
+    backends = []
+    for backend in BACKENDS:
+        result = run_backend(backend, args, clips)
+        backends.append(result)
+        print(f"{backend}: WER={result['wer']} RTF={result['rtf']} load={result['load_seconds']}s "
+              f"size={result['size_mb']}MB")
+
+    fp32, int8 = backends
+    report = {
+        "environment": {
+            "model": args.model,
+            "passages": len(clips),
+            "audio": str(args.audio_dir) if args.audio_dir else "pyttsx3",
+            "threads": torch.get_num_threads(),
+            "torch": torch.__version__,
+            "cpus": os.cpu_count(),
+        },
+        "backends": backends,
+        "summary": {
+            "speedup": round(fp32["decode_seconds"] / int8["decode_seconds"], 2) if int8["decode_seconds"] else None,
+            "wer_delta": round(int8["wer"] - fp32["wer"], 4),
+            "int8_vs_fp32_wer": agreement(fp32, int8),
+        },
+    }
+    print(markdown(report))
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        with open(os.path.splitext(args.out)[0] + ".md", "w", encoding="utf-8") as f:
+            f.write(markdown(report))
+        print(f"✅ Report written to {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Reading-test scoring helpers.
+
+Passages and transcripts are compared word by word after normalisation
+(lower-cased, punctuation stripped, curly apostrophes folded).
+
+- ``words_correct``: passage words matched in order by the transcript (LCS
+  length). For a partial transcript that is simply the passage prefix read
+  so far, so the streaming endpoint can use it while the child is reading.
+- ``align``: word-level edit-distance alignment of a finished reading into
+  correct words, substitutions, omissions and insertions. The DP matrix is
+  filled one passage word (row) at a time with numpy: the diagonal and
+  vertical moves are elementwise, and the left-to-right insertion chain
+  ``D[j] = min(D[j], D[j-1] + c)`` is a running minimum of ``D[j] - j*c``
+  (``np.minimum.accumulate``) shifted back by ``j*c``. That is O(n) numpy row
+  operations instead of O(n * m) Python steps, so long passages stay fast.
+- ``analyze_reading``: WPM, WCPM, error lists and long pauses from Whisper
+  word timestamps (``transcribe_words_batch`` is the scheduler handler that
+  produces them).
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from inference import segment_confidence, use_fp16
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+# A gap between two words at least this long counts as a long pause
+LONG_PAUSE_SECONDS = 2.0
+
+CORRECT, SUBSTITUTION, OMISSION, INSERTION = "correct", "substitution", "omission", "insertion"
+
+
+def normalize_words(text: str) -> List[str]:
+    return WORD_RE.findall((text or "").lower().replace("’", "'"))
+
+
+def words_correct(reference: List[str], hypothesis: List[str]) -> int:
+    """Number of passage words matched in order by the transcript (LCS length)"""
+    if not reference or not hypothesis:
+        return 0
+    previous = [0] * (len(hypothesis) + 1)
+    for ref in reference:
+        current = [0]
+        for j, hyp in enumerate(hypothesis, 1):
+            current.append(previous[j - 1] + 1 if ref == hyp else max(previous[j], current[j - 1]))
+        previous = current
+    return previous[-1]
+
+
+def _word_ids(reference: List[str], hypothesis: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    vocab: Dict[str, int] = {}
+    ref = np.array([vocab.setdefault(w, len(vocab)) for w in reference], dtype=np.int64)
+    hyp = np.array([vocab.setdefault(w, len(vocab)) for w in hypothesis], dtype=np.int64)
+    return ref, hyp
+
+
+def _alignment_costs(reference: List[str], hypothesis: List[str]) -> Tuple[np.ndarray, int]:
+    """(len(reference) + 1, len(hypothesis) + 1) DP matrix of alignment costs.
+
+    Every edit costs ``unit`` and every correct word -1, with ``unit`` larger
+    than any possible number of matches: among the minimum-edit alignments the
+    one with the most correct words wins (a repeated word is an insertion, not
+    a chain of substitutions).
+    """
+    ref, hyp = _word_ids(reference, hypothesis)
+    unit = len(ref) + len(hyp) + 1
+    steps = np.arange(len(hyp) + 1, dtype=np.int64) * unit
+    cost = np.empty((len(ref) + 1, len(hyp) + 1), dtype=np.int64)
+    cost[0] = steps
+    for i, word in enumerate(ref, 1):
+        row = np.empty_like(steps)
+        row[0] = i * unit
+        # Match / substitution from the diagonal, omission from above
+        row[1:] = np.minimum(cost[i - 1, :-1] + np.where(hyp == word, -1, unit), cost[i - 1, 1:] + unit)
+        # Insertions: row[j] = min_k<=j (row[k] + (j - k) * unit)
+        cost[i] = np.minimum.accumulate(row - steps) + steps
+    return cost, unit
+
+
+def word_errors(reference: List[str], hypothesis: List[str]) -> int:
+    """Word-level edit distance (substitutions + omissions + insertions)"""
+    cost, unit = _alignment_costs(reference, hypothesis)
+    return int(-(-cost[-1, -1] // unit))
+
+
+def align(reference: List[str], hypothesis: List[str]) -> List[Tuple[str, Optional[int], Optional[int]]]:
+    """Minimum-edit alignment as ``(op, reference_index, hypothesis_index)`` in reading order"""
+    cost, unit = _alignment_costs(reference, hypothesis)
+    ops = []
+    i, j = len(reference), len(hypothesis)
+    while i > 0 or j > 0:
+        same = i > 0 and j > 0 and reference[i - 1] == hypothesis[j - 1]
+        if i > 0 and j > 0 and cost[i, j] == cost[i - 1, j - 1] + (-1 if same else unit):
+            ops.append((CORRECT if same else SUBSTITUTION, i - 1, j - 1))
+            i, j = i - 1, j - 1
+        elif i > 0 and cost[i, j] == cost[i - 1, j] + unit:
+            ops.append((OMISSION, i - 1, None))
+            i -= 1
+        else:
+            ops.append((INSERTION, None, j - 1))
+            j -= 1
+    ops.reverse()
+    return ops
+
+
+def timed_words(segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Normalised words with Whisper's start/end times ("ice-cream" -> two words)"""
+    words = []
+    for segment in segments:
+        for word in segment.get("words") or []:
+            for token in normalize_words(word.get("word", "")):
+                words.append({
+                    "word": token,
+                    "start": float(word["start"]),
+                    "end": float(word["end"]),
+                    "probability": round(float(word.get("probability", 0.0)), 4),
+                })
+    return words
+
+
+def long_pauses(words: List[Dict[str, Any]], threshold: float = LONG_PAUSE_SECONDS) -> List[Dict[str, Any]]:
+    pauses = []
+    for before, after in zip(words, words[1:]):
+        gap = after["start"] - before["end"]
+        if gap >= threshold:
+            pauses.append({
+                "after": before["word"],
+                "before": after["word"],
+                "start": round(before["end"], 2),
+                "seconds": round(gap, 2),
+            })
+    return pauses
+
+
+def analyze_reading(passage: str, words: List[Dict[str, Any]], duration: Optional[float] = None,
+                    pause_threshold: float = LONG_PAUSE_SECONDS) -> Dict[str, Any]:
+    """Fluency measures for one reading of ``passage`` from timed words.
+
+    Reading time runs from the first word's start to the last word's end
+    (falling back to ``duration``), so leading and trailing silence does not
+    lower the rates.
+    """
+    reference = normalize_words(passage)
+    hypothesis = [w["word"] for w in words]
+
+    substitutions, omissions, insertions = [], [], []
+    correct = 0
+    for op, r, h in align(reference, hypothesis):
+        if op == CORRECT:
+            correct += 1
+        elif op == SUBSTITUTION:
+            substitutions.append({"expected": reference[r], "read": hypothesis[h], "index": r,
+                                  "at": round(words[h]["start"], 2)})
+        elif op == OMISSION:
+            omissions.append({"expected": reference[r], "index": r})
+        else:
+            insertions.append({"read": hypothesis[h], "at": round(words[h]["start"], 2)})
+
+    if words:
+        seconds = max(words[-1]["end"] - words[0]["start"], 0.0)
+    else:
+        seconds = duration or 0.0
+    minutes = seconds / 60
+    return {
+        "passageWords": len(reference),
+        "wordsRead": len(hypothesis),
+        "wordsCorrect": correct,
+        "accuracy": round(correct / len(reference), 4) if reference else None,
+        "readingSeconds": round(seconds, 2),
+        "wpm": round(len(hypothesis) / minutes, 2) if minutes else None,
+        "wcpm": round(correct / minutes, 2) if minutes else None,
+        "errorCount": len(substitutions) + len(omissions) + len(insertions),
+        "substitutions": substitutions,
+        "omissions": omissions,
+        "insertions": insertions,
+        "longPauses": long_pauses(words, pause_threshold),
+    }
+
+
+def transcribe_words_batch(model, payloads: List[Any]) -> List[Dict[str, Any]]:
+    """Batch handler for the inference scheduler: transcripts with word timestamps.
+
+    Each payload is ``(audio, options)``. Word timing needs Whisper's
+    cross-attention alignment pass, which ``model.transcribe`` only runs per
+    clip, so the batch is processed one clip at a time.
+    """
+    fp16 = use_fp16(model)
+    results = []
+    for audio, options in payloads:
+        result = model.transcribe(audio, fp16=fp16, word_timestamps=True, **options)
+        results.append({
+            "text": (result.get("text") or "").strip(),
+            "words": timed_words(result.get("segments") or []),
+            "language": result.get("language"),
+            **segment_confidence(result.get("segments") or []),
+        })
+    return results
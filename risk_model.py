@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Dyslexia risk classification with the trained XGBoost model.
+
+Loads the booster and label encoder written by ``analysis/xgb.py`` once and
+scores assessments in vectorised batches: features for many assessments are
+stacked into one NumPy matrix and classified with a single ``predict_proba``
+call.
+
+Stored assessment results are mapped onto the training features
+(``analysis/xgb.py``) on the same scales as the training dataset:
+- phoneme_score, nonsense_score: fraction correct scaled to 0-3
+- pattern_score: pretest fraction correct scaled to 0-10
+- reading_wpm: words per minute from the reading test
+- questionnaire_score: questionnaire points scaled to 0-20
+Missing tests become NaN, which XGBoost treats as missing values.
+"""
+
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parent
+ANALYSIS_DIR = ROOT / "analysis"
+
+FEATURE_COLUMNS = [
+    "phoneme_score", "pattern_score", "nonsense_score",
+    "reading_wpm", "questionnaire_score"
+]
+
+# Questionnaire maximum points per age group (see utils/riskCalculator.js)
+QUESTIONNAIRE_MAX_POINTS = {"3-5": 36, "6-8": 40, "9-12": 40}
+
+# Only the fields feature extraction needs, so list scans skip raw payloads
+FEATURE_PROJECTION = {
+    "ageGroup": 1,
+    "results.phoneme.score": 1, "results.phoneme.total": 1,
+    "results.pretest.score": 1, "results.pretest.total": 1,
+    "results.nonsense.score": 1, "results.nonsense.total": 1,
+    "results.reading.wpm": 1,
+    "results.questionnaire.score": 1, "results.questionnaire.group": 1,
+}
+
+
+def _default_path(*names: str) -> Path:
+    for name in names:
+        path = ANALYSIS_DIR / name
+        if path.exists():
+            return path
+    return ANALYSIS_DIR / names[0]
+
+
+def _fraction(result: Optional[Dict[str, Any]], scale: float) -> float:
+    try:
+        score = float(result["score"])
+        total = float(result["total"])
+    except (KeyError, TypeError, ValueError):
+        return np.nan
+    return scale * score / total if total > 0 else np.nan
+
+
+def assessment_features(doc: Dict[str, Any]) -> List[float]:
+    """Map a stored assessment document onto FEATURE_COLUMNS"""
+    results = doc.get("results") or {}
+    reading = results.get("reading") or {}
+    questionnaire = results.get("questionnaire") or {}
+
+    try:
+        wpm = float(reading["wpm"])
+    except (KeyError, TypeError, ValueError):
+        wpm = np.nan
+
+    try:
+        group = questionnaire.get("group") or doc.get("ageGroup")
+        max_points = QUESTIONNAIRE_MAX_POINTS.get(group, 40)
+        q_score = 20.0 * min(float(questionnaire["score"]), max_points) / max_points
+    except (KeyError, TypeError, ValueError):
+        q_score = np.nan
+
+    return [
+        _fraction(results.get("phoneme"), 3.0),
+        _fraction(results.get("pretest"), 10.0),
+        _fraction(results.get("nonsense"), 3.0),
+        wpm,
+        q_score,
+    ]
+
+
+def features_from_mapping(values: Dict[str, Any]) -> List[float]:
+    """Read FEATURE_COLUMNS from a plain {feature: value} mapping"""
+    row = []
+    for col in FEATURE_COLUMNS:
+        try:
+            row.append(float(values[col]))
+        except (KeyError, TypeError, ValueError):
+            row.append(np.nan)
+    return row
+
+
+class RiskModel:
+    """Loaded XGBoost classifier plus the class names it predicts"""
+
+    def __init__(self, model_path: Optional[str] = None, encoder_path: Optional[str] = None):
+        self.model_path = Path(model_path) if model_path else _default_path(
+            "xgb_medium_model.json", "xgb_model.json"
+        )
+        self.encoder_path = Path(encoder_path) if encoder_path else _default_path(
+            "xgb_medium_label_encoder.npy", "label_encoder.npy"
+        )
+        self.classifier = None
+        self.classes: List[str] = []
+        self.version: Optional[str] = None
+
+    def load(self):
+        try:
+            import xgboost as xgb
+        except Exception:
+            raise RuntimeError("xgboost is not installed")
+        classifier = xgb.XGBClassifier()
+        classifier.load_model(str(self.model_path))
+        classes = [str(c) for c in np.load(self.encoder_path, allow_pickle=True)]
+        with open(self.model_path, "rb") as f:
+            version = hashlib.sha256(f.read()).hexdigest()[:12]
+        self.classifier, self.classes, self.version = classifier, classes, version
+        return self
+
+    def predict_matrix(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities for an (n, len(FEATURE_COLUMNS)) matrix"""
+        X = np.asarray(X, dtype=np.float32).reshape(-1, len(FEATURE_COLUMNS))
+        if len(X) == 0:
+            return np.zeros((0, len(self.classes)), dtype=np.float32)
+        return self.classifier.predict_proba(X)
+
+    def describe(self, proba: np.ndarray) -> List[Dict[str, Any]]:
+        """Turn a probability matrix into per-row {level, probabilities} dicts"""
+        best = np.argmax(proba, axis=1)
+        return [
+            {
+                "level": self.classes[b],
+                "probabilities": {c: round(float(p), 4) for c, p in zip(self.classes, row)},
+                "modelVersion": self.version,
+            }
+            for b, row in zip(best, proba)
+        ]
+
+    def predict_records(self, rows: Iterable[List[float]]) -> List[Dict[str, Any]]:
+        X = np.array(list(rows), dtype=np.float32).reshape(-1, len(FEATURE_COLUMNS))
+        return self.describe(self.predict_matrix(X))
+
+
+def load_risk_model(model_path: Optional[str] = None, encoder_path: Optional[str] = None) -> Optional[RiskModel]:
+    """Load the model at ``model_path`` / ``encoder_path`` (XGB_MODEL_PATH / XGB_LABEL_ENCODER_PATH)"""
+    try:
+        model = RiskModel(model_path, encoder_path).load()
+        logger.info(f"✅ XGBoost model loaded successfully! ({model.model_path.name}, version={model.version})")
+        return model
+    except Exception as e:
+        logger.error(f"❌ Failed to load XGBoost model: {e}")
+        return None
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Cohort analytics rollups, maintained incrementally next to ``assessments``.
+
+Dashboards want assessments per school, week, age group and risk level,
+completion rates and average scores per test type. Aggregating the whole
+``assessments`` collection on every dashboard load gets slower with every
+assessment stored, so the counts live pre-aggregated in a ``rollups``
+collection with one document per bucket::
+
+    {_id, school, week, ageGroup, risk, assessments, completed,
+     results: {<type>: {count, scored, scoreSum}}, updatedAt}
+
+``week`` is the Monday (UTC midnight) of the week the assessment started.
+Scores are averaged on a common scale: fraction correct for phoneme, pretest
+and nonsense, fraction of the age group's maximum points for the
+questionnaire, and words per minute for reading.
+
+The storage routes keep the buckets current: each write reads the projected
+pre-image of the assessment (``ROLLUP_PROJECTION``), and ``rollup_changes``
+turns (before, after) into ``$inc`` upserts: deltas within one bucket, or a
+move between buckets when the risk level changes. Analytics queries read
+only buckets, so their cost depends on the date range and the number of
+schools, not on how many assessments are stored.
+
+A failed rollup write is logged and never fails the assessment write; the
+backfill rebuilds every bucket from ``assessments`` in batches into a
+scratch collection and swaps it in with one rename.
+
+Usage:
+  python rollups.py --rebuild
+  python rollups.py --rebuild --batch-size 2000
+"""
+
+import argparse
+import json
+import logging
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import ASCENDING, UpdateOne
+
+from risk_model import QUESTIONNAIRE_MAX_POINTS
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_BATCH_SIZE = 5000
+
+DIMENSIONS = ("school", "week", "ageGroup", "risk")
+
+# Tests scored as score/total; reading and the questionnaire are handled separately
+FRACTION_TESTS = ("phoneme", "pretest", "nonsense")
+ROLLUP_TESTS = FRACTION_TESTS + ("questionnaire", "reading")
+
+# Everything a bucket and its counters depend on, and nothing else
+ROLLUP_PROJECTION = dict(
+    {"school": 1, "ageGroup": 1, "startedAt": 1, "completedAt": 1, "risk.level": 1},
+    **{f"results.{t}.{f}": 1 for t in FRACTION_TESTS for f in ("score", "total")},
+    **{"results.reading.wpm": 1, "results.questionnaire.score": 1, "results.questionnaire.group": 1},
+)
+
+ROLLUP_INDEXES = [
+    ([("week", ASCENDING), ("school", ASCENDING)], "week_school"),
+]
+
+
+def ensure_rollup_indexes(collection):
+    for keys, name in ROLLUP_INDEXES:
+        collection.create_index(keys, name=name, background=True)
+
+
+def week_start(value: Optional[datetime]) -> Optional[datetime]:
+    """Monday 00:00 of the week containing ``value``"""
+    if not isinstance(value, datetime):
+        return None
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+    return day - timedelta(days=day.weekday())
+
+
+def score_value(test_type: str, result: Dict[str, Any], age_group: Optional[str] = None) -> Optional[float]:
+    """A test result on its rollup scale, or None when it carries no usable score"""
+    try:
+        if test_type == "reading":
+            return float(result["wpm"])
+        if test_type == "questionnaire":
+            max_points = QUESTIONNAIRE_MAX_POINTS.get(result.get("group") or age_group, 40)
+            return min(float(result["score"]), max_points) / max_points
+        total = float(result["total"])
+        return float(result["score"]) / total if total > 0 else None
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def bucket_of(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "school": doc.get("school") or None,
+        "week": week_start(doc.get("startedAt")),
+        "ageGroup": doc.get("ageGroup") or None,
+        "risk": (doc.get("risk") or {}).get("level"),
+    }
+
+
+def bucket_id(bucket: Dict[str, Any]) -> str:
+    week = bucket["week"].date().isoformat() if bucket["week"] else None
+    return json.dumps([bucket["school"], week, bucket["ageGroup"], bucket["risk"]], separators=(",", ":"))
+
+
+def counters(doc: Dict[str, Any]) -> Dict[str, float]:
+    """One assessment's contribution to its bucket, as dotted ``$inc`` fields"""
+    out: Dict[str, float] = {"assessments": 1, "completed": int(doc.get("completedAt") is not None)}
+    results = doc.get("results") or {}
+    for test_type in ROLLUP_TESTS:
+        result = results.get(test_type)
+        if not isinstance(result, dict):
+            continue
+        out[f"results.{test_type}.count"] = 1
+        value = score_value(test_type, result, doc.get("ageGroup"))
+        if value is not None:
+            out[f"results.{test_type}.scored"] = 1
+            out[f"results.{test_type}.scoreSum"] = value
+    return out
+
+
+def _inc(bucket: Dict[str, Any], incs: Dict[str, float], now: datetime) -> UpdateOne:
+    return UpdateOne(
+        {"_id": bucket_id(bucket)},
+        {"$inc": incs, "$set": {"updatedAt": now}, "$setOnInsert": bucket},
+        upsert=True,
+    )
+
+
+def rollup_changes(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> List[UpdateOne]:
+    """Upserts that move the rollups from ``before`` to ``after`` (None = no document)"""
+    now = datetime.utcnow()
+    old = (bucket_of(before), counters(before)) if before is not None else None
+    new = (bucket_of(after), counters(after)) if after is not None else None
+    if old and new and old[0] == new[0]:
+        bucket, old_counts, new_counts = new[0], old[1], new[1]
+        incs = {k: new_counts.get(k, 0) - old_counts.get(k, 0) for k in set(old_counts) | set(new_counts)}
+        incs = {k: v for k, v in incs.items() if v}
+        return [_inc(bucket, incs, now)] if incs else []
+    ops = []
+    if old:
+        ops.append(_inc(old[0], {k: -v for k, v in old[1].items()}, now))
+    if new:
+        ops.append(_inc(new[0], new[1], now))
+    return ops
+
+
+def apply_changes(collection, ops: Sequence[UpdateOne]) -> bool:
+    """Write rollup upserts; failures are logged, not raised (the backfill repairs drift)"""
+    if not ops:
+        return True
+    try:
+        collection.bulk_write(list(ops), ordered=False)
+        return True
+    except Exception as e:
+        logger.error(f"❌ Rollup update failed ({len(ops)} bucket writes): {e}")
+        return False
+
+
+def with_result(doc: Dict[str, Any], test_type: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """``doc`` after ``results.<test_type>`` is set to ``payload``"""
+    results = dict(doc.get("results") or {})
+    results[test_type] = payload
+    return dict(doc, results=results)
+
+
+def rebuild(assessments, database, target: str = "rollups", batch_size: int = ROLLUP_BATCH_SIZE) -> Tuple[int, int]:
+    """Recompute every bucket from ``assessments`` and swap them in; returns (assessments, buckets).
+
+    Assessments are streamed ``batch_size`` at a time and summed in memory
+    (one small dict per bucket), buckets are written to ``<target>_rebuild``
+    in batches and renamed over ``target`` at the end, so dashboards never see
+    a half-built collection. Rollup writes that land while the rebuild runs
+    are lost in the swap; run it when the sites are idle, or again afterwards.
+    """
+    buckets: Dict[str, Dict[str, Any]] = {}
+    scanned = 0
+    for doc in assessments.find({}, ROLLUP_PROJECTION, batch_size=batch_size):
+        scanned += 1
+        bucket = bucket_of(doc)
+        entry = buckets.setdefault(bucket_id(bucket), {"bucket": bucket, "counts": {}})
+        for key, value in counters(doc).items():
+            entry["counts"][key] = entry["counts"].get(key, 0) + value
+
+    scratch = database[f"{target}_rebuild"]
+    scratch.drop()
+    now = datetime.utcnow()
+    batch = []
+    for _id, entry in buckets.items():
+        batch.append(dict(_expand(entry["counts"]), _id=_id, updatedAt=now, **entry["bucket"]))
+        if len(batch) >= batch_size:
+            scratch.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        scratch.insert_many(batch, ordered=False)
+    ensure_rollup_indexes(scratch)
+    if buckets:
+        scratch.rename(target, dropTarget=True)
+    else:
+        database[target].delete_many({})
+    return scanned, len(buckets)
+
+
+def _expand(flat: Dict[str, float]) -> Dict[str, Any]:
+    """{"results.phoneme.count": 1} -> {"results": {"phoneme": {"count": 1}}}"""
+    out: Dict[str, Any] = {}
+    for key, value in flat.items():
+        *path, leaf = key.split(".")
+        node = out
+        for part in path:
+            node = node.setdefault(part, {})
+        node[leaf] = value
+    return out
+
+
+def rollup_query(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 **filters: Optional[str]) -> Dict[str, Any]:
+    """Bucket filter: weeks in [start, end) plus exact matches on the other dimensions"""
+    query: Dict[str, Any] = {k: v for k, v in filters.items() if k in DIMENSIONS and v is not None}
+    weeks = {}
+    if start is not None:
+        weeks["$gte"] = week_start(start)
+    if end is not None:
+        weeks["$lt"] = end
+    if weeks:
+        query["week"] = weeks
+    return query
+
+
+def summarize(buckets: Iterable[Dict[str, Any]], group_by: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    """Merge buckets into one row per ``group_by`` combination, with rates and averages"""
+    groups: Dict[tuple, Dict[str, Any]] = {}
+    for bucket in buckets:
+        key = tuple(bucket.get(d) for d in group_by)
+        row = groups.setdefault(key, {"assessments": 0, "completed": 0, "results": {}})
+        row["assessments"] += bucket.get("assessments", 0)
+        row["completed"] += bucket.get("completed", 0)
+        for test_type, stats in (bucket.get("results") or {}).items():
+            totals = row["results"].setdefault(test_type, {"count": 0, "scored": 0, "scoreSum": 0.0})
+            for field in totals:
+                totals[field] += stats.get(field, 0)
+
+    rows = []
+    for key in sorted(groups, key=lambda k: [(v is None, v) for v in k]):
+        row = groups[key]
+        out = {d: (v.date().isoformat() if isinstance(v, datetime) else v) for d, v in zip(group_by, key)}
+        out["assessments"] = row["assessments"]
+        out["completed"] = row["completed"]
+        out["completionRate"] = round(row["completed"] / row["assessments"], 4) if row["assessments"] > 0 else None
+        out["results"] = {
+            test_type: {
+                "count": stats["count"],
+                "averageScore": round(stats["scoreSum"] / stats["scored"], 4) if stats["scored"] > 0 else None,
+            }
+            for test_type, stats in sorted(row["results"].items())
+            if stats["count"] > 0
+        }
+        rows.append(out)
+    return rows
+
+
+def main():
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    from config import load_settings
+
+    load_dotenv()
+    settings = load_settings()
+    parser = argparse.ArgumentParser(description="Maintain the cohort analytics rollups")
+    parser.add_argument('--rebuild', action='store_true', help='Recompute every bucket from the assessments')
+    parser.add_argument('--batch-size', type=int, default=settings.rollup_batch_size, help='Documents per read/write batch')
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.error("nothing to do (use --rebuild)")
+
+    client = MongoClient(settings.mongo_uri, serverSelectionTimeoutMS=3000)
+    database = client[settings.mongo_db]
+    scanned, buckets = rebuild(database.assessments, database, batch_size=args.batch_size)
+    print(f"✅ Rebuilt {buckets} rollup buckets from {scanned} assessments")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
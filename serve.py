@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Production serving: one preloaded model, several forked worker processes.
+
+``python app.py`` runs the Flask development server in one process, and
+starting N copies of it loads N copies of the Whisper weights. This script
+instead:
+
+1. builds the app (``create_app``) and loads the Whisper and risk models in
+   the parent (``preload_models``): weights only, no inference and no threads
+2. ``gc.freeze()``s everything allocated so far, so the collector never
+   writes to those objects' pages after the fork
+3. opens the listening socket and forks ``--workers`` children; the weights
+   are shared copy-on-write (tensor storage is never written by inference)
+4. in each child: pins the process to its own slice of the CPU cores, sets
+   ``torch.set_num_threads`` to the slice size and the interop pool to 1
+   thread, rebuilds the app with those settings and calls
+   ``start_services()``. The inference scheduler, Mongo client, TTS workers
+   and job runners are created there, after the fork, and each child serves
+   the shared socket with a threaded WSGI server (WebSockets included)
+
+The parent only supervises: it restarts workers that die (forking again from
+the preloaded parent, so a restart costs no model load) and forwards SIGTERM
+/ SIGINT. CUDA cannot be used across a fork; with a GPU device each worker
+loads its own copy after forking (``--no-preload`` forces that on CPU too,
+for comparison).
+
+Each worker holds its own in-process state. Where that matters:
+
+- async jobs (``/api/jobs``): a job runs in the worker that accepted it, but
+  the poll may reach another one, so with more than one worker the job
+  states are mirrored in a shared SQLite file (``job_store``, a temporary
+  file per server unless ``JOB_STORE`` is set) and any worker can answer
+- the transcript cache and the TTS cache keep one memory tier per worker;
+  a repeated upload only hits if it reaches the same worker, unless the
+  shared second tier is on (``TRANSCRIPT_CACHE=disk`` or ``mongo``; the TTS
+  disk cache always is)
+- ``/metrics`` counters, histograms and gauges live in each worker's memory:
+  a scrape is answered by whichever worker accepts the connection, so it
+  shows that one process only (request counts, cache hit rates, lane depths)
+- the local store (``local_store.py``) is one SQLite file for all workers
+
+``--startup-report`` benchmarks start-up: it waits until every worker has
+finished warm-up, records load and ready times plus each process' RSS, PSS
+(proportional share, the real footprint) and shared/private memory from
+``/proc/<pid>/smaps_rollup``, writes JSON (and a .md summary) and exits.
+Measured reports are in ``bench/serve-preload.md`` and
+``bench/serve-no-preload.md``.
+
+  python serve.py --workers 4
+  DYSCOVER_PROFILE=kiosk python serve.py --workers 2 --port 8000
+  python serve.py --workers 4 --startup-report bench/serve-preload.json
+  python serve.py --workers 4 --no-preload --startup-report bench/serve-no-preload.json
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import select
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import replace
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("serve")
+
+# A worker that exits sooner than this after starting is restarted with a delay
+MIN_WORKER_LIFETIME = 5.0
+RESTART_DELAY = 1.0
+SMAPS_FIELDS = {"Rss": "rss_mb", "Pss": "pss_mb", "Shared_Clean": "shared_clean_mb",
+                "Shared_Dirty": "shared_dirty_mb", "Private_Clean": "private_clean_mb",
+                "Private_Dirty": "private_dirty_mb"}
+
+
+def available_cores() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def partition_cores(cores: List[int], workers: int) -> List[List[int]]:
+    """Contiguous slices of ``cores``, one per worker (shared round-robin when cores < workers)"""
+    if len(cores) < workers:
+        return [[cores[i % len(cores)]] for i in range(workers)]
+    per = len(cores) // workers
+    return [cores[i * per:(i + 1) * per] for i in range(workers)]
+
+
+def memory_mb(pid: int) -> Dict[str, float]:
+    """Memory of one process from /proc/<pid>/smaps_rollup (Linux), in MB"""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in SMAPS_FIELDS:
+                    values[SMAPS_FIELDS[key]] = round(int(rest.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return values
+
+
+class Supervisor:
+    def __init__(self, args):
+        self.args = args
+        self.workers: Dict[int, Dict[str, Any]] = {}
+        self.stopping = False
+        self.started = time.perf_counter()
+        self.ready: Dict[int, Dict[str, Any]] = {}
+
+    # -- parent ------------------------------------------------------------
+
+    def prepare(self):
+        import app as backend
+
+        overrides = {k: v for k, v in {"profile": self.args.profile, "whisper_model": self.args.model,
+                                       "port": self.args.port}.items() if v is not None}
+        profile = overrides.pop("profile", None)
+        self.settings = backend.load_settings(profile=profile, **overrides)
+        self.job_store = None
+        if self.args.workers > 1 and self.settings.enabled("jobs") and not self.settings.job_store:
+            # Polls land on any worker, so job states go where every worker can read them
+            self.job_store = os.path.join(tempfile.gettempdir(), f"dyscover-jobs-{os.getpid()}.db")
+            self.settings = replace(self.settings, job_store=self.job_store)
+        backend.create_app(self.settings)
+        self.backend = backend
+
+        self.preload = not self.args.no_preload
+        if self.preload and self.settings.needs_whisper and self.settings.resolved_device() == "cuda":
+            logger.warning("CUDA cannot be shared across fork(); each worker loads its own model")
+            self.preload = False
+
+        self.load_seconds = 0.0
+        if self.preload:
+            started = time.perf_counter()
+            backend.preload_models()
+            self.load_seconds = time.perf_counter() - started
+            logger.info(f"Preloaded models in {self.load_seconds:.1f}s")
+        # Keep the collector away from the preloaded objects' pages in the workers
+        gc.collect()
+        gc.freeze()
+
+        self.sock = socket.create_server((self.settings.host, self.settings.port), backlog=self.args.backlog)
+        self.sock.set_inheritable(True)
+        self.cores = partition_cores(available_cores(), self.args.workers)
+        self.ready_r, self.ready_w = os.pipe()
+        logger.info(f"Listening on http://{self.settings.host}:{self.settings.port} "
+                    f"with {self.args.workers} workers (cores: {self.cores})")
+
+    def spawn(self, index: int):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                code = self.run_worker(index)
+            except SystemExit as e:
+                # SIGTERM in the worker
+                code = e.code if isinstance(e.code, int) else 0
+            except BaseException:
+                logger.exception(f"Worker {index} crashed")
+                code = 1
+            os._exit(code)
+        self.workers[pid] = {"index": index, "started": time.monotonic()}
+        logger.info(f"Worker {index} started (pid {pid})")
+
+    def stop(self, *_):
+        self.stopping = True
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def supervise(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for index in range(self.args.workers):
+            self.spawn(index)
+        report_due = bool(self.args.startup_report)
+        while self.workers:
+            if report_due:
+                self.collect_ready(timeout=1.0)
+                if len(self.ready) == self.args.workers:
+                    self.write_report()
+                    report_due = False
+                    self.stop()
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG if report_due else 0)
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            if pid == 0:
+                continue
+            worker = self.workers.pop(pid, None)
+            if worker is None or self.stopping:
+                continue
+            lifetime = time.monotonic() - worker["started"]
+            logger.warning(f"Worker {worker['index']} (pid {pid}) exited with status {status}; restarting")
+            if lifetime < MIN_WORKER_LIFETIME:
+                time.sleep(RESTART_DELAY)
+            self.spawn(worker["index"])
+        if self.job_store:
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(self.job_store + suffix)
+                except OSError:
+                    pass
+        logger.info("All workers stopped")
+
+    def collect_ready(self, timeout: float):
+        readable, _, _ = select.select([self.ready_r], [], [], timeout)
+        if not readable:
+            return
+        for line in os.read(self.ready_r, 65536).decode().splitlines():
+            message = json.loads(line)
+            self.ready[message["index"]] = message
+
+    def write_report(self):
+        workers = []
+        for message in sorted(self.ready.values(), key=lambda m: m["index"]):
+            workers.append({**message, **memory_mb(message["pid"])})
+        parent = memory_mb(os.getpid())
+        processes = [parent] + workers
+        report = {
+            "environment": {
+                "workers": self.args.workers,
+                "preload": self.preload,
+                "model": self.settings.whisper_model,
+                "cascade_model": self.settings.cascade_model,
+                "compute_dtype": self.settings.compute_dtype,
+                "profile": self.settings.profile,
+                "cpus": len(available_cores()),
+                "python": platform.python_version(),
+            },
+            "parent_load_seconds": round(self.load_seconds, 2),
+            "all_ready_seconds": round(max(w["ready_seconds"] for w in workers), 2),
+            "parent": parent,
+            "workers": workers,
+            "total_rss_mb": round(sum(p.get("rss_mb", 0) for p in processes), 1),
+            "total_pss_mb": round(sum(p.get("pss_mb", 0) for p in processes), 1),
+        }
+        path = self.args.startup_report
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        with open(os.path.splitext(path)[0] + ".md", "w", encoding="utf-8") as f:
+            f.write(markdown(report))
+        print(markdown(report))
+        logger.info(f"✅ Startup report written to {path}")
+
+    # -- worker ------------------------------------------------------------
+
+    def run_worker(self, index: int) -> int:
+        from werkzeug.serving import make_server
+
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        os.close(self.ready_r)
+        cores = self.cores[index]
+        if self.args.pin and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cores)
+        worker_settings = replace(
+            self.settings,
+            torch_threads=self.settings.torch_threads or len(cores),
+            interop_threads=self.settings.interop_threads or 1,
+        )
+        backend = self.backend
+        flask_app = backend.create_app(worker_settings)
+        warmup = backend.start_services()
+
+        def report_ready():
+            warmup.join()
+            message = {"index": index, "pid": os.getpid(), "cores": cores,
+                       "torch_threads": worker_settings.torch_threads,
+                       "model_status": backend.model_status,
+                       "ready_seconds": round(time.perf_counter() - self.started, 2)}
+            os.write(self.ready_w, (json.dumps(message) + "\n").encode())
+            logger.info(f"Worker {index} ready ({backend.model_status}, {len(cores)} cores)")
+
+        threading.Thread(target=report_ready, name="ready-report", daemon=True).start()
+        server = make_server(self.settings.host, self.settings.port, flask_app, threaded=True,
+                             fd=self.sock.fileno())
+        server.serve_forever()
+        return 0
+
+
+def markdown(report: Dict[str, Any]) -> str:
+    env = report["environment"]
+    lines = [
+        f"## serve.py start-up: {env['workers']} workers, Whisper {env['model']}, "
+        f"{'preloaded' if env['preload'] else 'loaded per worker'}",
+        "",
+        f"{env['cpus']} CPUs, profile {env['profile']}, compute dtype {env['compute_dtype']}",
+        "",
+        "| Process | Cores | Ready s | RSS MB | PSS MB | Shared MB | Private MB |",
+        "|---------|-------|---------|--------|--------|-----------|------------|",
+    ]
+    parent = report["parent"]
+
+    def shared(p):
+        return round(p.get("shared_clean_mb", 0) + p.get("shared_dirty_mb", 0), 1)
+
+    def private(p):
+        return round(p.get("private_clean_mb", 0) + p.get("private_dirty_mb", 0), 1)
+
+    lines.append(f"| parent | - | {report['parent_load_seconds']} | {parent.get('rss_mb')} | "
+                 f"{parent.get('pss_mb')} | {shared(parent)} | {private(parent)} |")
+    for w in report["workers"]:
+        lines.append(f"| worker {w['index']} | {','.join(map(str, w['cores']))} | {w['ready_seconds']} | "
+                     f"{w.get('rss_mb')} | {w.get('pss_mb')} | {shared(w)} | {private(w)} |")
+    lines += [
+        "",
+        f"- All workers ready after {report['all_ready_seconds']}s",
+        f"- Total RSS {report['total_rss_mb']} MB, total PSS {report['total_pss_mb']} MB "
+        f"(PSS counts shared pages once)",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the backend with preloaded, forked workers")
+    parser.add_argument('--workers', type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")))
+    parser.add_argument('--profile', type=str, help='central, kiosk or lite (config.py)')
+    parser.add_argument('--model', type=str, help='Whisper model size (overrides the profile)')
+    parser.add_argument('--port', type=int, help='Port to listen on')
+    parser.add_argument('--backlog', type=int, default=128)
+    parser.add_argument('--no-pin', dest='pin', action='store_false', help='Do not pin workers to CPU cores')
+    parser.add_argument('--no-preload', action='store_true', help='Load the models in every worker instead')
+    parser.add_argument('--startup-report', type=str, help='Wait for all workers, write a start-up JSON report and exit')
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be >= 1")
+    if not hasattr(os, "fork"):
+        parser.error("serve.py needs fork(); use app.py on this platform")
+
+    supervisor = Supervisor(args)
+    supervisor.prepare()
+    supervisor.supervise()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Incremental transcription of a reading passage while it is being read.
+
+A ``StreamingSession`` receives audio chunks as they are recorded and
+re-transcribes only the open tail of the stream. Audio before
+``committed_samples`` has been transcribed for the last time and its text is
+frozen; the tail after it is re-decoded every ``step_seconds`` of new audio
+to produce a partial transcript. Once the tail grows past ``window_seconds``
+it is cut at the quietest 20 ms frame in the last ``cut_search_seconds`` (a
+pause between words, so no word is split), transcribed once more and
+committed. Every decode therefore fits in one 30 s Whisper window and takes
+the scheduler's batched path, so partials from several readers share a batch.
+Windows without speech (see vad.py) are not decoded at all. At the end of
+the stream only the open tail is left to decode.
+
+Chunks are either raw PCM (``pcm_s16le`` / ``f32le`` at ``sample_rate``) or
+the pieces of a single MediaRecorder file (``webm``). Container pieces cannot
+be decoded on their own, so for ``webm`` the bytes received so far are
+re-decoded in memory at each step.
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from audio_io import decode_audio
+from inference import SAMPLE_RATE
+from reading import normalize_words, words_correct
+from vad import has_speech, quietest_cut
+
+ENCODINGS = ("webm", "pcm_s16le", "f32le")
+
+STEP_SECONDS = 2.0
+WINDOW_SECONDS = 24.0
+CUT_SEARCH_SECONDS = 4.0
+MIN_TAIL_SECONDS = 0.3
+
+Transcriber = Callable[[np.ndarray], str]
+
+
+class StreamingSession:
+    """Audio and transcript state of one streamed reading"""
+
+    def __init__(self, transcribe: Transcriber, passage: str = "", encoding: str = "webm",
+                 sample_rate: int = SAMPLE_RATE, step_seconds: float = STEP_SECONDS,
+                 window_seconds: float = WINDOW_SECONDS, cut_search_seconds: float = CUT_SEARCH_SECONDS,
+                 skip_silence: bool = True):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"encoding must be one of {ENCODINGS}")
+        if sample_rate <= 0:
+            raise ValueError("sampleRate must be positive")
+        self.transcribe = transcribe
+        self.skip_silence = skip_silence
+        self.passage_words = normalize_words(passage)
+        self.encoding = encoding
+        self.sample_rate = int(sample_rate)
+        self.step = int(step_seconds * SAMPLE_RATE)
+        self.window = int(min(window_seconds, 30.0) * SAMPLE_RATE)
+        self.cut_search = int(min(cut_search_seconds, window_seconds / 2) * SAMPLE_RATE)
+
+        self.audio = np.zeros(0, dtype=np.float32)
+        self._encoded = bytearray()
+        self._decoded_bytes = 0
+        self._chunks: List[np.ndarray] = []
+        self.committed: List[str] = []
+        self.committed_samples = 0
+        self.transcribed_samples = 0
+        self.tail_text = ""
+        self.decode_seconds = 0.0
+
+    @property
+    def seconds(self) -> float:
+        return len(self.audio) / SAMPLE_RATE
+
+    @property
+    def text(self) -> str:
+        return " ".join(t for t in self.committed + [self.tail_text] if t)
+
+    def feed(self, chunk: bytes):
+        """Buffer one received chunk (decoded lazily by ``update``)"""
+        if self.encoding == "webm":
+            self._encoded.extend(chunk)
+        elif self.encoding == "pcm_s16le":
+            usable = len(chunk) - len(chunk) % 2
+            self._chunks.append(np.frombuffer(chunk[:usable], np.int16).astype(np.float32) / 32768.0)
+        else:
+            usable = len(chunk) - len(chunk) % 4
+            self._chunks.append(np.frombuffer(chunk[:usable], np.float32))
+
+    def _decode_pending(self):
+        if self.encoding == "webm":
+            if len(self._encoded) > self._decoded_bytes:
+                try:
+                    self.audio = decode_audio(bytes(self._encoded))
+                    self._decoded_bytes = len(self._encoded)
+                except ValueError:
+                    # The last piece may end mid-frame; wait for more bytes
+                    pass
+            return
+        if not self._chunks:
+            return
+        audio = np.concatenate(self._chunks)
+        self._chunks = []
+        if self.sample_rate != SAMPLE_RATE and len(audio):
+            # Linear resampling, as for uploaded WAV files
+            n_out = int(round(len(audio) * SAMPLE_RATE / self.sample_rate))
+            audio = np.interp(np.linspace(0, len(audio) - 1, n_out), np.arange(len(audio)), audio)
+        self.audio = np.concatenate([self.audio, audio.astype(np.float32)])
+
+    def _transcribe(self, audio: np.ndarray) -> str:
+        # Silence would only come back as hallucinated text
+        if len(audio) < MIN_TAIL_SECONDS * SAMPLE_RATE or (self.skip_silence and not has_speech(audio)):
+            return ""
+        started = time.perf_counter()
+        try:
+            return (self.transcribe(audio) or "").strip()
+        finally:
+            self.decode_seconds += time.perf_counter() - started
+
+    def _commit_full_windows(self):
+        while len(self.audio) - self.committed_samples > self.window:
+            end = self.committed_samples + self.window
+            cut = quietest_cut(self.audio, end - self.cut_search, end)
+            self.committed.append(self._transcribe(self.audio[self.committed_samples:cut]))
+            self.committed_samples = cut
+
+    def _refresh(self):
+        self._commit_full_windows()
+        self.tail_text = self._transcribe(self.audio[self.committed_samples:])
+        self.transcribed_samples = len(self.audio)
+
+    def due(self) -> bool:
+        """True once enough new audio arrived for another partial transcript"""
+        self._decode_pending()
+        return len(self.audio) - self.transcribed_samples >= self.step
+
+    def update(self) -> Dict[str, Any]:
+        """Re-transcribe the open tail and return a partial result"""
+        self._decode_pending()
+        self._refresh()
+        return self.result("partial")
+
+    def finish(self) -> Dict[str, Any]:
+        """Transcribe whatever audio is left and return the final result"""
+        self._decode_pending()
+        if len(self.audio) > self.transcribed_samples or not self.transcribed_samples:
+            self._refresh()
+        return self.result("final")
+
+    def result(self, kind: str) -> Dict[str, Any]:
+        words = normalize_words(self.text)
+        correct = words_correct(self.passage_words, words)
+        message: Dict[str, Optional[Any]] = {
+            "type": kind,
+            "text": self.text,
+            "seconds": round(self.seconds, 2),
+            "wordsRead": len(words),
+            "wordsCorrect": correct,
+            "passageWords": len(self.passage_words),
+        }
+        if kind == "final":
+            minutes = self.seconds / 60
+            message["wpm"] = round(len(words) / minutes, 2) if minutes else None
+            message["wcpm"] = round(correct / minutes, 2) if minutes else None
+            message["decodeSeconds"] = round(self.decode_seconds, 2)
+        return message
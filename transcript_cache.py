@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Result cache for the audio routes, keyed by audio content.
+
+Kiosks on flaky networks retry uploads and the reading page can re-submit
+the same recording; each of those used to run Whisper again. Responses of
+/transcribe, /check_pronunciation and /api/reading/analyze are cached under
+sha256(uploaded bytes, route, model, compute dtype, language, target and
+scoring options), so a duplicate submission is answered without decoding or
+inference.
+
+Tiers:
+- memory: bounded LRU (entries expire after ``ttl`` seconds)
+- optional second tier shared across restarts/replicas: a directory of JSON
+  files (size-capped like the TTS cache) or a MongoDB collection with a TTL
+  index on ``expiresAt``
+
+Concurrent requests for the same key share one computation, so a retry that
+arrives while the original upload is still being transcribed waits for it.
+Only deterministic outcomes are stored (200 and 422 "no speech"); timeouts
+and server errors are not.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from cache import DiskCache, LRUCache
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_CACHE_DIR = str(Path(__file__).resolve().parent / ".transcript_cache")
+TRANSCRIPT_CACHE_DISK_MB = 64
+
+CACHEABLE_STATUS = (200, 422)
+
+Response = Tuple[Dict[str, Any], int]
+
+
+def result_key(audio_bytes: bytes, route: str, model: str, language: Optional[str] = "en",
+               target: Optional[str] = None, **options) -> str:
+    """Content address of one audio request: the bytes plus everything that shapes the answer"""
+    digest = hashlib.sha256(audio_bytes)
+    params = json.dumps([route, model, language, target, sorted(options.items())],
+                        separators=(",", ":"), default=str)
+    digest.update(b"\0" + params.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class MongoTier:
+    """Second tier in a MongoDB collection; expired documents are removed by a TTL index"""
+
+    def __init__(self, collection: Callable[[], Any]):
+        # Callable so the cache can exist before Mongo is connected
+        self._collection = collection
+        self._indexed = False
+
+    def _coll(self):
+        coll = self._collection()
+        if coll is not None and not self._indexed:
+            coll.create_index("expiresAt", name="expiresAt_ttl", expireAfterSeconds=0)
+            self._indexed = True
+        return coll
+
+    def get(self, key: str) -> Optional[Response]:
+        coll = self._coll()
+        if coll is None:
+            return None
+        doc = coll.find_one({"_id": key, "expiresAt": {"$gt": datetime.utcnow()}}, {"body": 1, "status": 1})
+        return (doc["body"], doc["status"]) if doc else None
+
+    def put(self, key: str, response: Response, ttl: float):
+        coll = self._coll()
+        if coll is None:
+            return
+        now = datetime.utcnow()
+        body, status = response
+        coll.replace_one(
+            {"_id": key},
+            {"body": body, "status": status, "createdAt": now, "expiresAt": now + timedelta(seconds=ttl)},
+            upsert=True,
+        )
+
+
+class DiskTier:
+    """Second tier as ``<key>.json`` files holding the response and its expiry"""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = TRANSCRIPT_CACHE_DISK_MB * 1024 * 1024):
+        self.disk = DiskCache(directory or TRANSCRIPT_CACHE_DIR, max_bytes=max_bytes, suffix=".json")
+
+    def get(self, key: str) -> Optional[Response]:
+        data = self.disk.get(key)
+        if data is None:
+            return None
+        try:
+            entry = json.loads(data)
+        except ValueError:
+            return None
+        if entry.get("expiresAt", 0) <= time.time():
+            return None
+        return entry["body"], entry["status"]
+
+    def put(self, key: str, response: Response, ttl: float):
+        body, status = response
+        entry = {"body": body, "status": status, "expiresAt": time.time() + ttl}
+        self.disk.put(key, json.dumps(entry, separators=(",", ":")).encode("utf-8"))
+
+
+class TranscriptCache:
+    def __init__(self, max_entries: int = 2048, ttl: float = 86400, tier: Optional[Any] = None):
+        self.memory = LRUCache(max_entries=max_entries)
+        self.ttl = float(ttl)
+        self.tier = tier
+        self.tier_hits = 0
+        self.computed = 0
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Response]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            expires, response = entry
+            if expires > time.monotonic():
+                return response
+            self.memory.pop(key)
+        if self.tier is None:
+            return None
+        try:
+            response = self.tier.get(key)
+        except Exception as e:
+            logger.warning(f"Transcript cache tier read failed: {e}")
+            return None
+        if response is not None:
+            self.tier_hits += 1
+            self.memory.put(key, (time.monotonic() + self.ttl, response))
+        return response
+
+    def put(self, key: str, response: Response):
+        if response[1] not in CACHEABLE_STATUS:
+            return
+        self.memory.put(key, (time.monotonic() + self.ttl, response))
+        if self.tier is not None:
+            try:
+                self.tier.put(key, response, self.ttl)
+            except Exception as e:
+                logger.warning(f"Transcript cache tier write failed: {e}")
+
+    def get_or_compute(self, key: str, compute: Callable[[], Response]) -> Tuple[Response, bool]:
+        """Cached response for ``key`` or ``compute()``'s; the flag is True on a hit.
+        Concurrent misses for the same key share one computation.
+        """
+        response = self.get(key)
+        if response is not None:
+            return response, True
+
+        with self._inflight_lock:
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._inflight[key] = Future()
+        if not owner:
+            return pending.result(), True
+
+        try:
+            response = compute()
+            self.computed += 1
+            self.put(key, response)
+            pending.set_result(response)
+            return response, False
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def stats(self):
+        memory = self.memory.stats()
+        lookups = memory["hits"] + memory["misses"]
+        hits = memory["hits"] + self.tier_hits
+        return {
+            "memory": memory,
+            "tier_hits": self.tier_hits,
+            "computed": self.computed,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+        }
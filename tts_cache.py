@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for /tts_offline audio.
+
+Rendered WAV bytes are keyed on sha256(text, rate, volume, voice) and kept in
+two tiers: an in-memory LRU (bounded by bytes) in front of a size-capped
+directory on disk. The key doubles as the HTTP ETag, so browsers that already
+hold a prompt get a 304 without any synthesis or file I/O.
+
+Usage (prewarm every word the nonsense-word tests can ask for):
+  python tts_cache.py --prewarm
+  python tts_cache.py --prewarm --words extra1 extra2 --rate 150
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from cache import DiskCache, LRUCache
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parent
+TEST_PAGES_DIR = ROOT / "CTOPP Test" / "app" / "nonsense"
+
+TTS_CACHE_DIR = str(ROOT / ".tts_cache")
+TTS_CACHE_DISK_MB = 256
+TTS_CACHE_MEMORY_MB = 32
+
+TTSParams = Tuple[str, Optional[int], Optional[float], Optional[int]]
+
+# runAndWait() is not thread-safe; serialise in-process rendering
+_render_lock = threading.Lock()
+
+
+def cache_key(text: str, rate: Optional[int], volume: Optional[float], voice: Optional[int]) -> str:
+    """Stable content address for one synthesis request"""
+    if volume is not None:
+        volume = max(0.0, min(1.0, volume))
+    raw = json.dumps([text, rate, volume, voice], separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def render_wav(text: str, rate: Optional[int] = None, volume: Optional[float] = None,
+               voice: Optional[int] = None) -> bytes:
+    """Synthesize ``text`` with a fresh pyttsx3 engine and return WAV bytes.
+    In-process fallback for when the TTS worker pool is disabled.
+    """
+    import pyttsx3
+
+    engine = pyttsx3.init()
+    if rate is not None:
+        engine.setProperty('rate', rate)
+    if volume is not None:
+        engine.setProperty('volume', max(0.0, min(1.0, volume)))
+    if voice is not None:
+        voices = engine.getProperty('voices')
+        if 0 <= voice < len(voices):
+            engine.setProperty('voice', voices[voice].id)
+
+    fd, path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        with _render_lock:
+            engine.save_to_file(text, path)
+            engine.runAndWait()
+        with open(path, "rb") as f:
+            data = f.read()
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+    if not data:
+        raise FileNotFoundError("Failed to synthesize audio")
+    return data
+
+
+class TTSCache:
+    """Memory LRU -> disk -> synthesize lookup for TTS audio"""
+
+    def __init__(self, directory: Optional[str] = None, disk_mb: int = TTS_CACHE_DISK_MB,
+                 memory_mb: int = TTS_CACHE_MEMORY_MB,
+                 renderer: Callable[..., bytes] = render_wav,
+                 batch_renderer: Optional[Callable[[List[TTSParams]], List[bytes]]] = None):
+        self.memory = LRUCache(max_entries=4096, max_bytes=memory_mb * 1024 * 1024)
+        self.disk = DiskCache(directory or TTS_CACHE_DIR, max_bytes=disk_mb * 1024 * 1024, suffix=".wav")
+        self.renderer = renderer
+        self.batch_renderer = batch_renderer
+        self.disk_hits = 0
+        self.renders = 0
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Cached audio for ``key`` from memory or disk, or None"""
+        data = self.memory.get(key)
+        if data is not None:
+            return data
+        data = self.disk.get(key)
+        if data is not None:
+            self.disk_hits += 1
+            self.memory.put(key, data)
+        return data
+
+    def put(self, key: str, data: bytes):
+        self.memory.put(key, data)
+        self.disk.put(key, data)
+
+    def render(self, key: str, text: str, rate: Optional[int] = None, volume: Optional[float] = None,
+               voice: Optional[int] = None) -> bytes:
+        """Synthesize a cache miss and store it in both tiers.
+        Concurrent misses for the same key share one synthesis.
+        """
+        with self._inflight_lock:
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._inflight[key] = Future()
+        if not owner:
+            return pending.result()
+
+        try:
+            data = self.renderer(text, rate, volume, voice)
+            self.renders += 1
+            self.put(key, data)
+            pending.set_result(data)
+            return data
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def get_or_render(self, text: str, rate: Optional[int] = None, volume: Optional[float] = None,
+                      voice: Optional[int] = None) -> Tuple[str, bytes]:
+        key = cache_key(text, rate, volume, voice)
+        data = self.get(key)
+        if data is None:
+            data = self.render(key, text, rate, volume, voice)
+        return key, data
+
+    def prewarm(self, items: Iterable[TTSParams]) -> int:
+        """Render every (text, rate, volume, voice) not already on disk"""
+        missing = [item for item in items if self.disk.get(cache_key(*item)) is None]
+        if self.batch_renderer is not None:
+            for item, data in zip(missing, self.batch_renderer(missing)):
+                self.put(cache_key(*item), data)
+            self.renders += len(missing)
+        else:
+            for item in missing:
+                self.render(cache_key(*item), *item)
+        return len(missing)
+
+    def stats(self):
+        memory = self.memory.stats()
+        lookups = memory["hits"] + memory["misses"]
+        hits = memory["hits"] + self.disk_hits
+        return {
+            "memory": memory,
+            "disk_hits": self.disk_hits,
+            "renders": self.renders,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+        }
+
+
+def test_words(pages_dir: Path = TEST_PAGES_DIR) -> List[str]:
+    """Every word the nonsense-word test pages can ask /tts_offline to speak"""
+    words = set()
+    for page in sorted(pages_dir.rglob("page.js")):
+        source = page.read_text(encoding="utf-8")
+        bank = re.search(r"const BANK = \[(.*?)\]", source, re.S)
+        if bank:
+            words.update(re.findall(r'"([^"]+)"', bank.group(1)))
+        words.update(re.findall(r'correct:\s*"([^"]+)"', source))
+    return sorted(words)
+
+
+def main():
+    from dotenv import load_dotenv
+
+    from config import load_settings
+
+    load_dotenv()
+    settings = load_settings()
+    parser = argparse.ArgumentParser(description="Manage the /tts_offline audio cache")
+    parser.add_argument('--prewarm', action='store_true', help='Render the nonsense-word test prompts')
+    parser.add_argument('--words', nargs='*', default=[], help='Extra words/phrases to render')
+    parser.add_argument('--rate', type=int, help='Speech rate (words per minute)')
+    parser.add_argument('--volume', type=float, help='Volume 0.0–1.0')
+    parser.add_argument('--voice', type=int, help='Voice index')
+    parser.add_argument('--dir', type=str, default=settings.tts_cache_dir or TTS_CACHE_DIR, help='Cache directory')
+    args = parser.parse_args()
+
+    if not args.prewarm:
+        parser.print_help()
+        return
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from tts_pool import TTSWorkerPool
+
+    words = test_words() + [w for w in args.words if w.strip()]
+    pool = TTSWorkerPool(size=1)
+    cache = TTSCache(args.dir, settings.tts_cache_disk_mb, settings.tts_cache_memory_mb,
+                     renderer=pool.render, batch_renderer=pool.render_batch)
+    try:
+        rendered = cache.prewarm([(w, args.rate, args.volume, args.voice) for w in words])
+    finally:
+        pool.stop()
+    print(f"✅ {len(words)} prompts cached in {args.dir} ({rendered} newly rendered)")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
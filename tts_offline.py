@@ -11,11 +11,13 @@ Usage:
   python tts_offline.py --text "Hello there" --out hello.wav
   python tts_offline.py --text "Hello there"           # play directly
   python tts_offline.py --rate 180 --voice 0 --text "Hi"
+  python tts_offline.py --batch baf mip teg --out-dir prompts/   # one runAndWait()
 """
 
 import argparse
+import os
 import sys
-from typing import Optional
+from typing import Dict, Optional, Sequence, Tuple
 
 try:
     import pyttsx3  # pip install pyttsx3
@@ -30,16 +32,46 @@ def list_voices(engine: pyttsx3.Engine):
         print(f"[{i}] id={v.id} name={getattr(v, 'name', '')} lang={getattr(v, 'languages', '')}")
 
 
-def synthesize(text: str, out_path: Optional[str], rate: Optional[int], volume: Optional[float], voice_index: Optional[int]):
-    engine = pyttsx3.init()
-    if rate is not None:
-        engine.setProperty('rate', rate)
-    if volume is not None:
-        engine.setProperty('volume', max(0.0, min(1.0, volume)))
-    if voice_index is not None:
-        voices = engine.getProperty('voices')
-        if 0 <= voice_index < len(voices):
-            engine.setProperty('voice', voices[voice_index].id)
+def engine_defaults(engine: pyttsx3.Engine) -> Dict[str, object]:
+    """Snapshot the engine's initial settings so a reused engine can be reset"""
+    return {
+        'rate': engine.getProperty('rate'),
+        'volume': engine.getProperty('volume'),
+        'voice': engine.getProperty('voice'),
+        'voices': [v.id for v in engine.getProperty('voices')],
+    }
+
+
+def apply_settings(engine: pyttsx3.Engine, defaults: Dict[str, object], rate: Optional[int],
+                   volume: Optional[float], voice_index: Optional[int]):
+    """Set rate/volume/voice, falling back to the defaults for unset values.
+    pyttsx3 queues property changes, so they apply to the utterances after them.
+    """
+    engine.setProperty('rate', rate if rate is not None else defaults['rate'])
+    engine.setProperty('volume', max(0.0, min(1.0, volume)) if volume is not None else defaults['volume'])
+    voices = defaults['voices']
+    if voice_index is not None and 0 <= voice_index < len(voices):
+        engine.setProperty('voice', voices[voice_index])
+    else:
+        engine.setProperty('voice', defaults['voice'])
+
+
+def synthesize_batch(engine: pyttsx3.Engine, defaults: Dict[str, object],
+                     items: Sequence[Tuple[str, Optional[int], Optional[float], Optional[int]]],
+                     out_paths: Sequence[str]):
+    """Render many (text, rate, volume, voice) items in a single runAndWait() cycle"""
+    for (text, rate, volume, voice_index), out_path in zip(items, out_paths):
+        apply_settings(engine, defaults, rate, volume, voice_index)
+        engine.save_to_file(text, out_path)
+    engine.runAndWait()
+
+
+def synthesize(text: str, out_path: Optional[str], rate: Optional[int], volume: Optional[float], voice_index: Optional[int],
+               engine: Optional[pyttsx3.Engine] = None, defaults: Optional[Dict[str, object]] = None):
+    # Reuse a long-lived engine when given one; pass its initial defaults too
+    if engine is None:
+        engine = pyttsx3.init()
+    apply_settings(engine, defaults or engine_defaults(engine), rate, volume, voice_index)
 
     if out_path:
         engine.save_to_file(text, out_path)
@@ -53,8 +85,10 @@ def synthesize(text: str, out_path: Optional[str], rate: Optional[int], volume:
 
 def main():
     parser = argparse.ArgumentParser(description="Offline TTS with pyttsx3 (no API key)")
-    parser.add_argument('--text', type=str, required=True, help='Text to synthesize')
+    parser.add_argument('--text', type=str, help='Text to synthesize')
     parser.add_argument('--out', type=str, help='Output WAV/AIFF file (plays live if omitted)')
+    parser.add_argument('--batch', nargs='+', metavar='TEXT', help='Render several texts in one engine cycle')
+    parser.add_argument('--out-dir', type=str, default='.', help='Output directory for --batch (<text>.wav)')
     parser.add_argument('--rate', type=int, help='Speech rate (words per minute)')
     parser.add_argument('--volume', type=float, help='Volume 0.0–1.0')
     parser.add_argument('--voice', type=int, help='Voice index (use --list-voices to inspect)')
@@ -66,7 +100,18 @@ def main():
         list_voices(engine)
         return
 
-    synthesize(text=args.text, out_path=args.out, rate=args.rate, volume=args.volume, voice_index=args.voice)
+    if args.batch:
+        os.makedirs(args.out_dir, exist_ok=True)
+        items = [(text, args.rate, args.volume, args.voice) for text in args.batch]
+        out_paths = [os.path.join(args.out_dir, f"{text}.wav") for text in args.batch]
+        synthesize_batch(engine, engine_defaults(engine), items, out_paths)
+        print(f"✅ {len(out_paths)} files saved to: {args.out_dir}")
+        return
+
+    if not args.text:
+        parser.error('--text is required (or use --batch/--list-voices)')
+    synthesize(text=args.text, out_path=args.out, rate=args.rate, volume=args.volume, voice_index=args.voice,
+               engine=engine)
 
 
 if __name__ == '__main__':
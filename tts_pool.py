@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Pool of long-lived pyttsx3 worker processes.
+
+pyttsx3 engines are expensive to create and ``runAndWait()`` is not safe to
+call from several Flask threads at once. Each worker process initialises one
+engine at start-up and keeps it for its lifetime. Requests go through a shared
+job queue; every worker has a dispatcher thread that drains up to
+``max_batch`` pending jobs and renders them in a single ``runAndWait()`` cycle,
+so a burst of prompts (a whole class starting the nonsense-word test) costs a
+few engine cycles instead of one per request.
+
+A worker that crashes or overruns ``timeout`` is killed and restarted; the jobs
+it held fail with an error instead of hanging their requests.
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future
+from typing import List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+TTSItem = Tuple[str, Optional[int], Optional[float], Optional[int]]
+
+
+def _worker_main(conn):
+    """Worker process: hold one engine and render batches sent over ``conn``"""
+    import pyttsx3
+    from tts_offline import engine_defaults, synthesize_batch
+
+    engine = pyttsx3.init()
+    defaults = engine_defaults(engine)
+    conn.send(("ready", None))
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        items = message
+        out_dir = tempfile.mkdtemp(prefix="tts_batch_")
+        try:
+            paths = [os.path.join(out_dir, f"{i}.wav") for i in range(len(items))]
+            synthesize_batch(engine, defaults, items, paths)
+            results = []
+            for path in paths:
+                try:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                    results.append(("ok", data) if data else ("error", "Failed to synthesize audio"))
+                except OSError:
+                    results.append(("error", "Failed to synthesize audio"))
+            conn.send(("done", results))
+        except Exception as e:
+            conn.send(("failed", str(e)))
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+
+class _Worker:
+    """Parent-side handle for one worker process"""
+
+    def __init__(self, ctx, index: int):
+        self.ctx = ctx
+        self.index = index
+        self.process = None
+        self.conn = None
+
+    def start(self, timeout: float):
+        parent_conn, child_conn = self.ctx.Pipe()
+        self.process = self.ctx.Process(
+            target=_worker_main, args=(child_conn,), name=f"tts-worker-{self.index}", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        if not self.conn.poll(timeout):
+            self.kill()
+            raise TimeoutError("TTS worker did not start in time")
+        try:
+            status, _ = self.conn.recv()
+        except EOFError:
+            status = None
+        if status != "ready":
+            self.kill()
+            raise RuntimeError("TTS worker failed to start (is a speech engine installed?)")
+
+    def kill(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.kill()
+            self.process.join(5)
+        if self.conn is not None:
+            self.conn.close()
+        self.process = self.conn = None
+
+    def render(self, items: List[TTSItem], timeout: float):
+        self.conn.send(items)
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"TTS worker timed out after {timeout:.0f}s")
+        try:
+            status, payload = self.conn.recv()
+        except EOFError:
+            raise RuntimeError("TTS worker crashed")
+        if status == "failed":
+            raise RuntimeError(f"TTS batch failed: {payload}")
+        return payload
+
+
+class TTSWorkerPool:
+    """Fixed-size pool of TTS worker processes fed from one job queue"""
+
+    def __init__(self, size: int = 2, timeout: float = 30.0, max_batch: int = 16):
+        self.size = max(1, int(size))
+        self.timeout = float(timeout)
+        self.max_batch = max(1, int(max_batch))
+        self._ctx = multiprocessing.get_context("spawn")
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._started = False
+        self._lock = threading.Lock()
+        self.restarts = 0
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            for i in range(self.size):
+                thread = threading.Thread(target=self._dispatch, args=(i,), name=f"tts-dispatch-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.info(f"TTS worker pool started ({self.size} workers, max_batch={self.max_batch})")
+
+    def stop(self):
+        with self._lock:
+            self._started = False
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join(self.timeout)
+        self._threads = []
+
+    @property
+    def queue_depth(self) -> int:
+        return self._jobs.qsize()
+
+    def submit(self, item: TTSItem) -> Future:
+        if not self._started:
+            self.start()
+        future: Future = Future()
+        self._jobs.put((item, future))
+        return future
+
+    def _wait_bound(self) -> float:
+        # Every batch is bounded by `timeout`, so allow one per batch queued ahead
+        return self.timeout * (2 + self.queue_depth // (self.max_batch * self.size))
+
+    def render(self, text: str, rate: Optional[int] = None, volume: Optional[float] = None,
+               voice: Optional[int] = None) -> bytes:
+        """Blocking single render (the TTSCache renderer signature)"""
+        future = self.submit((text, rate, volume, voice))
+        return future.result(self._wait_bound())
+
+    def render_batch(self, items: Sequence[TTSItem]) -> List[bytes]:
+        """Render many items; the dispatchers group them into engine cycles"""
+        futures = [self.submit(item) for item in items]
+        bound = self._wait_bound()
+        return [f.result(bound) for f in futures]
+
+    def _dispatch(self, index: int):
+        worker = _Worker(self._ctx, index)
+        try:
+            # Spawn eagerly so the first request doesn't pay for engine start-up
+            worker.start(self.timeout)
+        except Exception as e:
+            logger.error(f"TTS worker {index} failed to start: {e}")
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                worker.kill()
+                return
+            batch = [job]
+            while len(batch) < self.max_batch:
+                try:
+                    job = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    # Put the stop marker back for after this batch
+                    self._jobs.put(None)
+                    break
+                batch.append(job)
+
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                if worker.process is None or not worker.process.is_alive():
+                    if worker.process is not None:
+                        self.restarts += 1
+                        logger.warning(f"Restarting TTS worker {index}")
+                    worker.kill()
+                    worker.start(self.timeout)
+                results = worker.render([item for item, _ in batch], self.timeout)
+            except Exception as e:
+                logger.error(f"TTS worker {index} error ({len(batch)} jobs): {e}")
+                worker.kill()
+                self.restarts += 1
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), (status, payload) in zip(batch, results):
+                if status == "ok":
+                    future.set_result(payload)
+                else:
+                    future.set_exception(FileNotFoundError(payload))
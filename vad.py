@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Energy-based voice activity detection for uploaded clips.
+
+Whisper pads every input to a 30 s window and decodes all of it, and on
+silent input it tends to hallucinate text ("Thank you."). Before inference
+the audio routes therefore:
+
+- reject clips with no speech at all, without touching the model
+- trim leading and trailing silence
+- split long reads into speech-only chunks of at most 30 s (pauses
+  dropped), which go through the scheduler's batched short-clip path together
+  instead of Whisper's sequential sliding window
+
+Frames of 30 ms are voiced when their RMS level is ``margin_db`` above the
+clip's noise floor (10th percentile), capped at ``margin_db`` below its peak
+so a clip that is speech throughout still passes, and never below
+``floor_db`` so digital silence and a quiet room are rejected. Voiced runs
+separated by less than ``min_silence_ms`` are merged, runs shorter than
+``min_speech_ms`` are dropped and each segment is padded by ``pad_ms`` so
+soft onsets and word endings are kept.
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from inference import SAMPLE_RATE, WINDOW_SAMPLES
+
+FRAME_MS = 30
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+MARGIN_DB = 12.0
+FLOOR_DB = -50.0
+MIN_SPEECH_MS = 120
+MIN_SILENCE_MS = 400
+PAD_MS = 200
+CUT_SEARCH_SECONDS = 4.0
+
+Segment = Tuple[int, int]
+
+
+def frame_levels_db(audio: np.ndarray, frame: int = FRAME_SAMPLES) -> np.ndarray:
+    """RMS level in dBFS of each complete ``frame``-sample frame"""
+    n = len(audio) // frame
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = np.asarray(audio[:n * frame], dtype=np.float32).reshape(n, frame)
+    return 10.0 * np.log10(np.mean(np.square(frames), axis=1) + 1e-10)
+
+
+def speech_segments(audio: np.ndarray, margin_db: float = MARGIN_DB, floor_db: float = FLOOR_DB,
+                    min_speech_ms: int = MIN_SPEECH_MS, min_silence_ms: int = MIN_SILENCE_MS,
+                    pad_ms: int = PAD_MS) -> List[Segment]:
+    """(start, end) sample ranges of speech in a 16 kHz clip, in order"""
+    levels = frame_levels_db(audio)
+    if not len(levels):
+        return []
+    noise, peak = np.percentile(levels, 10), levels.max()
+    threshold = max(floor_db, min(noise + margin_db, peak - margin_db))
+    voiced = np.concatenate([[0], (levels > threshold).astype(np.int8), [0]])
+    edges = np.diff(voiced)
+    runs = list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+    # Merge runs split by short pauses, then drop blips (clicks, breaths)
+    merged: List[List[int]] = []
+    for start, end in runs:
+        if merged and (start - merged[-1][1]) * FRAME_MS < min_silence_ms:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    pad = SAMPLE_RATE * pad_ms // 1000
+    segments: List[Segment] = []
+    for start, end in merged:
+        if (end - start) * FRAME_MS < min_speech_ms:
+            continue
+        start = max(0, int(start) * FRAME_SAMPLES - pad)
+        end = min(len(audio), int(end) * FRAME_SAMPLES + pad)
+        if segments and start <= segments[-1][1]:
+            segments[-1] = (segments[-1][0], end)
+        else:
+            segments.append((start, end))
+    return segments
+
+
+def has_speech(audio: np.ndarray) -> bool:
+    return bool(speech_segments(audio))
+
+
+def speech_bounds(audio: np.ndarray) -> Optional[Segment]:
+    """First speech sample to last speech sample, or None for a silent clip"""
+    segments = speech_segments(audio)
+    if not segments:
+        return None
+    return segments[0][0], segments[-1][1]
+
+
+def quietest_cut(audio: np.ndarray, start: int, end: int, frame: int = SAMPLE_RATE // 50) -> int:
+    """Sample index of the lowest-energy frame between ``start`` and ``end``"""
+    region = audio[start:end]
+    frames = len(region) // frame
+    if frames < 2:
+        return end
+    energy = np.square(region[:frames * frame]).reshape(frames, frame).mean(axis=1)
+    return start + int(np.argmin(energy)) * frame + frame // 2
+
+
+def speech_chunks(audio: np.ndarray, segments: Optional[List[Segment]] = None,
+                  max_samples: int = WINDOW_SAMPLES) -> List[np.ndarray]:
+    """Speech-only audio in pieces of at most ``max_samples`` (one Whisper window).
+
+    Segments are concatenated in order, so the silence between them is
+    dropped; their padding leaves a short natural pause at each join. A new
+    chunk starts when the next segment would not fit, and a single segment
+    longer than a window is cut at its quietest frame near the limit.
+    """
+    if segments is None:
+        segments = speech_segments(audio)
+    search = int(CUT_SEARCH_SECONDS * SAMPLE_RATE)
+    pieces: List[Segment] = []
+    for start, end in segments:
+        while end - start > max_samples:
+            cut = quietest_cut(audio, start + max_samples - search, start + max_samples)
+            pieces.append((start, cut))
+            start = cut
+        pieces.append((start, end))
+
+    chunks: List[np.ndarray] = []
+    current: List[np.ndarray] = []
+    length = 0
+    for start, end in pieces:
+        if current and length + end - start > max_samples:
+            chunks.append(np.concatenate(current))
+            current, length = [], 0
+        current.append(audio[start:end])
+        length += end - start
+    if current:
+        chunks.append(np.concatenate(current))
+    return chunks